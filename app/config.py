@@ -0,0 +1,45 @@
+"""
+ค่าตั้งที่ใช้ร่วมกันทั้งแอป (อ่านจาก environment อย่างเดียว)
+
+ไม่ import DB / models -> เครื่องมือ offline (เช่น python -m app.tools.replay_traces)
+ใช้ได้โดยไม่ต้องมี DATABASE_URL
+"""
+import os
+from datetime import datetime, time as dtime
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# รหัสเครื่องของกล้องที่ต่อกับ server นี้โดยตรง (vision_loop) และค่าเริ่มต้นของ API ที่ไม่ระบุ machine_id
+# ข้อมูลเดิมก่อนมีคอลัมน์ machine_id จะถูกย้ายมาเป็นของเครื่องนี้
+DEFAULT_MACHINE_ID = os.getenv("MACHINE_ID", "default")
+
+# ความยาวกะทำงาน (วินาที) ใช้คิด Availability ทุกจุดในระบบ
+SHIFT_SECONDS = float(os.getenv("SHIFT_SECONDS", 7.5 * 3600))
+
+
+def calc_availability(runtime_sec: int, shift_seconds: float = SHIFT_SECONDS) -> float:
+    """
+    Availability (%) = runtime / ความยาวกะ (ไม่เกิน 100)
+    """
+    return round(min(100.0, runtime_sec / shift_seconds * 100), 2)
+
+
+# --- CONFIG เวลาทำงาน 08:00-17:30 (มีพัก 3 ช่วง) ---
+# นอกเวลางาน vision_loop ไม่อ่านกล้อง แต่ส่ง False ให้ state machine ทุก 1 วินาที (vision/replay.py จำลองตามนี้)
+START_TIME = dtime(8, 0)   # 08:00 น.
+END_TIME = dtime(17, 30)    # 17:30 น.
+BREAKS = [
+    (dtime(10,0), dtime(10,15)),  # พัก 15 นาที
+    (dtime(12,0), dtime(13,0)),   # พักกลางวัน 1 ชม.
+    (dtime(15,0), dtime(15,15))   # พัก 15 นาที
+]
+
+
+def is_working_hours(now: Optional[dtime] = None) -> bool:
+    """อยู่ในเวลางานไหม (ไม่รวมช่วงพัก) / now = เวลา local (ไม่ระบุ = ตอนนี้)"""
+    now = now or datetime.now().time()
+    is_break = any(b_start <= now <= b_end for b_start, b_end in BREAKS)
+    return START_TIME <= now <= END_TIME and not is_break
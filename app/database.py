@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -8,9 +10,76 @@ load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Pool ของ async engine (API อ่านข้อมูล) ต่อ 1 worker
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+
+IS_SQLITE = make_url(SQLALCHEMY_DATABASE_URL).get_backend_name() == "sqlite"
+
+# Embedded mode (edge box 1 กล้อง): DATABASE_URL=sqlite:///data/spark_monitor.db
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",          # reader ไม่ block writer (API อ่านขณะ vision เขียน)
+    "synchronous": "NORMAL",        # WAL + NORMAL: fsync เฉพาะตอน checkpoint
+    "busy_timeout": 5000,           # รอ lock แทนการ error ทันที (ms)
+    "temp_store": "MEMORY",
+    "cache_size": -8000,            # 8 MB ต่อ connection
+    "mmap_size": 64 * 1024 * 1024,
+    "wal_autocheckpoint": 1000,     # pages
+}
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+# SQLite in-memory ใช้ StaticPool (ไม่รับ pool_size / max_overflow / pool_timeout)
+IS_MEMORY_DB = False
+if IS_SQLITE:
+    db_path = make_url(SQLALCHEMY_DATABASE_URL).database
+    IS_MEMORY_DB = not db_path or db_path == ":memory:" or "mode=memory" in SQLALCHEMY_DATABASE_URL
+    if not IS_MEMORY_DB and os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+# Sync engine: vision thread, งานเขียน (downtime start/stop), export, maintenance
+engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def _async_url(url: str):
+    """
+    แปลง DATABASE_URL (psycopg2 / sqlite) เป็น driver แบบ async (asyncpg / aiosqlite)
+    """
+    db_url = make_url(url)
+    backend = db_url.get_backend_name()
+    if backend == "postgresql":
+        query = dict(db_url.query)
+        # asyncpg ไม่รู้จัก sslmode (ใช้ ssl แทน)
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        return db_url.set(drivername="postgresql+asyncpg", query=query)
+    if backend == "sqlite":
+        return db_url.set(drivername="sqlite+aiosqlite")
+    return db_url
+
+# Async engine: read-heavy routers (state, summary, cycles, downtime reads)
+_pool_args = {} if IS_MEMORY_DB else {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+}
+async_engine = create_async_engine(
+    _async_url(SQLALCHEMY_DATABASE_URL),
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    **_pool_args,
+)
+if IS_SQLITE:
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 # Dependency for API
@@ -19,4 +88,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency for async API
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -9,64 +9,60 @@ from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
 # Import local modules
-from .database import engine, Base, SessionLocal
-from .routers import state, cycles, summary, downtime
+from .config import is_working_hours
+from .database import engine, async_engine, Base, SessionLocal, AsyncSessionLocal
+from .migrations import run_migrations
+from .services import retention_service
+from .services.live_status import live_status
+from .routers import state, cycles, summary, downtime, export, ingest, fleet, preview, shadow, health, admin, timeline
 from .vision.spark_detector import SparkDetector
+from .vision.trace_store import TraceWriter, TRACE_ENABLED
+from .vision.preview import preview_hub
+from .vision.shadow import shadow_runner, production_model_path
+from .vision.supervisor import vision_supervisor
+from .vision.sampler import frame_scheduler
 from .state_machine import machine_brain
 
-from datetime import datetime, time as dtime
-
 # 1. Load Config
 load_dotenv()
 
-# 2. Create Database Tables
+# 2. Create Database Tables + upgrade schema เดิม (index / partition)
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+
+# 0 = ไม่รัน maintenance_loop (ใช้ python -m app.tools.maintenance จาก cron แทน)
+MAINTENANCE_INTERVAL_SEC = int(os.getenv("MAINTENANCE_INTERVAL_SEC", 6 * 3600))
 
 # --- BACKGROUND VISION TASK ---
-def vision_loop():
-    print("👁️ Vision Module Started...")
-    
-    # --- CONFIG เวลาทำงาน 08:00-16:00 (มีพัก 3 ช่วง) ---
-    START_TIME = dtime(8, 0)   # 08:00 น.
-    END_TIME = dtime(17, 30)    # 16:30 น.
-    BREAKS = [
-        (dtime(10,0), dtime(10,15)),  # พัก 15 นาที
-        (dtime(12,0), dtime(13,0)),   # พักกลางวัน 1 ชม.
-        (dtime(15,0), dtime(15,15))   # พัก 15 นาที
-    ]
-    # ----------------------
+# เวลาทำงาน / ช่วงพัก: START_TIME, END_TIME, BREAKS ใน config.py
+
+# ไม่มี heartbeat นานเกินนี้ (วินาที) = stage ค้าง -> supervisor เริ่มใหม่
+# (capture ต้องนานกว่าเวลาเปิด RTSP ปกติ ~30 วินาที ตอนกล้องไม่ตอบ)
+CAPTURE_STALL_SEC = float(os.getenv("CAPTURE_STALL_SEC", 45))
+INFERENCE_STALL_SEC = float(os.getenv("INFERENCE_STALL_SEC", 30))
 
+
+def capture_loop(run):
+    """อ่านภาพจากกล้อง -> vision_supervisor.frames (เฟรมล่าสุดเสมอ)"""
     rtsp_source = os.getenv("RTSP_URL", "0")
     if rtsp_source.isdigit(): rtsp_source = int(rtsp_source)
-    
-    detector = SparkDetector()
-    db = SessionLocal()
     cap = None
     
     try:
-        while True:
-            # ดึงเวลาปัจจุบัน
-            now = datetime.now().time()
-            
-            # 🕑 เช็ค: อยู่ในเวลางานไหม? (ไม่รวมช่วงพัก)
-            is_break = any(b_start <= now <= b_end for b_start, b_end in BREAKS)
-            is_working_hours = START_TIME <= now <= END_TIME and not is_break
+        while run.alive():
+            run.beat()
 
             # ---------------------------------------------------------
             # กรณี 1: อยู่นอกเวลางาน (เลิกงานแล้ว หรือ ยังไม่ถึงเวลา)
             # ---------------------------------------------------------
-            if not is_working_hours:
-                # ส่งค่า False เข้าไป เพื่อให้แน่ใจว่าเครื่องจะถูกตัดเป็น STOP (ปิด Cycle สุดท้ายของวัน)
-                machine_brain.update_from_vision(db, False) 
-                
-                # พักยาวๆ หน่อย (ประหยัด CPU) เช็คทุก 1 วินาทีพอ
-                time.sleep(1) 
-                
+            if not is_working_hours():
                 # ถ้ามี connection ค้างอยู่ ปิดทิ้งไปเลย (ประหยัดเน็ต/bandwidth)
                 if cap is not None:
                     cap.release()
                     cap = None
                 
+                # พักยาวๆ หน่อย (ประหยัด CPU) เช็คทุก 1 วินาทีพอ
+                time.sleep(1)
                 continue # ข้าม Loop ไปเลย ไม่ต้องไปอ่านภาพ
             
             # ---------------------------------------------------------
@@ -82,41 +78,106 @@ def vision_loop():
                     continue
 
             ret, frame = cap.read()
+            captured_at = time.time()
             if not ret:
                 cap.release()
                 time.sleep(1)
                 continue
+
+            vision_supervisor.frames.put(frame, captured_at)
+    finally:
+        if cap: cap.release()
+
+
+def inference_loop(run):
+    """AI + state machine จากเฟรมล่าสุด"""
+    detector = SparkDetector(production_model_path())
+    shadow_runner.attach(detector, machine_brain.machine_id, machine_brain.stop_threshold)
+    frame_scheduler.attach(machine_brain, detector)
+    trace = TraceWriter(machine_brain.machine_id) if TRACE_ENABLED else None
+    db = SessionLocal()
+    
+    try:
+        while run.alive():
+            run.beat()
+
+            if not is_working_hours():
+                # ส่งค่า False เข้าไป เพื่อให้แน่ใจว่าเครื่องจะถูกตัดเป็น STOP (ปิด Cycle สุดท้ายของวัน)
+                machine_brain.update_from_vision(db, False) 
+                time.sleep(1)
+                continue
+
+            latest = vision_supervisor.frames.get(timeout=1)
+            if latest is None:
+                continue  # ยังไม่มีภาพใหม่ (กล้องกำลัง reconnect) -> beat แล้วรอต่อ
+            frame, captured_at = latest
             
             # AI Process (เหมือนเดิม)
             frame_resized = cv2.resize(frame, (640, 640))
             result = detector.detect(frame_resized)
+            if not run.alive():
+                break  # ค้างนานจน supervisor เริ่ม thread ใหม่แล้ว -> ห้ามเขียน trace / state ซ้อนกัน
+            sampled = frame_scheduler.sampled
+            if trace:
+                trace.append(captured_at, result["on_conf"], result["off_conf"], result["box_count"], sampled)
+            preview_hub.publish(frame_resized, result["boxes"], captured_at)
+            shadow_runner.offer(captured_at, frame_resized, result, sampled)
             machine_brain.update_from_vision(db, result["spark_detected"])
             
-            time.sleep(0.01)
+            # ความถี่ตามสถานะเครื่อง (vision/sampler.py): เต็มความเร็วเฉพาะช่วงที่อาจเปลี่ยนสถานะ
+            time.sleep(frame_scheduler.next_interval())
 
-    except Exception as e:
-        print(f"🔥 Error: {e}")
     finally:
-        if cap: cap.release()
+        # thread ที่ถูกแทนแล้วไม่ปิด trace / ไม่ flush state (ตัวใหม่เขียนอยู่)
+        if run.alive():
+            if trace: trace.close()
+            machine_brain.flush(db, force=True)
         db.close()
 
 
+def start_vision():
+    print("👁️ Vision Module Started...")
+    vision_supervisor.add_stage("capture", capture_loop, CAPTURE_STALL_SEC)
+    vision_supervisor.add_stage("inference", inference_loop, INFERENCE_STALL_SEC)
+    vision_supervisor.start()
+
+
+# --- BACKGROUND MAINTENANCE TASK ---
+def maintenance_loop():
+    # สร้าง partition เดือนถัดไปล่วงหน้า + rollup/ลบ machine_state ที่เก่ากว่า retention
+    while True:
+        db = SessionLocal()
+        try:
+            deleted = retention_service.run_maintenance(db)
+            if deleted:
+                print(f"🧹 Maintenance: pruned {deleted} machine_state row(s)")
+        except Exception as e:
+            print(f"🔥 Maintenance Error: {e}")
+        finally:
+            db.close()
+        time.sleep(MAINTENANCE_INTERVAL_SEC)
+
+
 # --- LIFESPAN MANAGER (วิธีใหม่ แทน on_event) ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 🟢 Startup: ทำก่อน Server เริ่ม
     print("🚀 System Starting...")
-    t = threading.Thread(target=vision_loop, daemon=True)
-    t.start()
+    start_vision()
+    if MAINTENANCE_INTERVAL_SEC > 0:
+        threading.Thread(target=maintenance_loop, daemon=True).start()
     db = SessionLocal()
     machine_brain.load_today_stats(db)
     db.close()
+    async with AsyncSessionLocal() as adb:
+        await live_status.get(adb, machine_brain.machine_id)
     print("✅ Today stats loaded from database")
     
     yield # จุดที่ Server ทำงานจริง
     
     # 🔴 Shutdown: ทำตอนกดปิด Server
     print("🛑 System Shutting down...")
+    await async_engine.dispose()
 
 # 3. Initialize FastAPI with Lifespan
 app = FastAPI(
@@ -131,6 +192,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # cursor ของ pagination (cycles / downtime history)
 )
 
 # 5. Register Routers
@@ -138,6 +200,14 @@ app.include_router(state, prefix="/api")
 app.include_router(cycles, prefix="/api")
 app.include_router(summary, prefix="/api")
 app.include_router(downtime, prefix="/api")
+app.include_router(export, prefix="/api")
+app.include_router(ingest, prefix="/api")
+app.include_router(fleet, prefix="/api")
+app.include_router(preview, prefix="/api")
+app.include_router(shadow, prefix="/api")
+app.include_router(health, prefix="/api")
+app.include_router(admin, prefix="/api")
+app.include_router(timeline, prefix="/api")
 
 @app.get("/")
 def root():
@@ -0,0 +1,253 @@
+"""
+Schema migrations แบบเบาๆ (ไม่ใช้ Alembic)
+
+- create_all() ยังเป็นตัวสร้างตารางใหม่เหมือนเดิม
+- run_migrations() จะไล่ทำ migration ที่ยังไม่เคยรัน (บันทึกใน schema_migrations)
+  เพื่ออัปเกรด DB เดิมให้ตรงกับ models.py แบบ in-place
+- ทุก migration ต้อง idempotent และรันได้ทั้งบน DB ใหม่ (เพิ่งผ่าน create_all) และ DB เก่า
+"""
+from datetime import date
+from sqlalchemy import text, inspect
+from sqlalchemy.engine import Connection, Engine
+
+from .models import CycleLog, DowntimeLog, MachineState, DailySummary, MachineStateDaily, DEFAULT_MACHINE_ID
+
+# ตาราง log ที่แบ่ง partition รายเดือนตามคอลัมน์ date (PostgreSQL เท่านั้น)
+PARTITIONED_TABLES = [CycleLog.__table__, DowntimeLog.__table__]
+PARTITION_MONTHS_AHEAD = 2
+
+# ค่าคงที่สำหรับ pg_advisory_xact_lock กัน worker หลายตัวรัน migration พร้อมกัน
+_MIGRATION_LOCK_ID = 802611
+
+
+def add_months(d: date, months: int) -> date:
+    month_index = d.year * 12 + (d.month - 1) + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _is_postgres(conn: Connection) -> bool:
+    return conn.dialect.name == "postgresql"
+
+
+def _column_names(conn: Connection, table_name: str) -> set:
+    return {c["name"] for c in inspect(conn).get_columns(table_name)}
+
+
+def _create_model_indexes(conn: Connection, table):
+    """
+    สร้าง index ตาม models.py (ถ้ายังไม่มี)
+    ข้าม index ที่อ้างคอลัมน์ที่ migration ถัดไปจะเพิ่ม (DB เก่าที่ไล่อัปเกรดทีละขั้น)
+    """
+    existing = _column_names(conn, table.name)
+    for index in table.indexes:
+        if all(column.name in existing for column in index.columns):
+            index.create(conn, checkfirst=True)
+
+
+# --- PARTITION HELPERS ---
+def partition_name(table_name: str, month_start: date) -> str:
+    return f"{table_name}_p{month_start.year}{month_start.month:02d}"
+
+
+def is_partitioned(conn: Connection, table_name: str) -> bool:
+    if not _is_postgres(conn):
+        return False
+    relkind = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"),
+        {"name": table_name}
+    ).scalar()
+    return relkind == "p"
+
+
+def create_month_partition(conn: Connection, table_name: str, month_start: date):
+    """
+    สร้าง partition ของเดือนนั้น (ถ้ายังไม่มี)
+    ถ้ามีแถวของเดือนนั้นตกค้างอยู่ใน default partition จะย้ายเข้า partition ใหม่ให้
+    """
+    name = partition_name(table_name, month_start)
+    exists = conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+    if exists:
+        return
+
+    month_end = add_months(month_start, 1)
+    bounds = {"start": month_start, "end": month_end}
+    default_name = f"{table_name}_default"
+    stray = conn.execute(
+        text(f"SELECT count(*) FROM {default_name} WHERE date >= :start AND date < :end"),
+        bounds
+    ).scalar()
+    if stray:
+        conn.execute(text(
+            f"CREATE TEMP TABLE _partition_move AS "
+            f"SELECT * FROM {default_name} WHERE date >= :start AND date < :end"
+        ), bounds)
+        conn.execute(text(f"DELETE FROM {default_name} WHERE date >= :start AND date < :end"), bounds)
+
+    conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {table_name} "
+        f"FOR VALUES FROM ('{month_start.isoformat()}') TO ('{month_end.isoformat()}')"
+    ))
+
+    if stray:
+        conn.execute(text(f"INSERT INTO {table_name} SELECT * FROM _partition_move"))
+        conn.execute(text("DROP TABLE _partition_move"))
+
+
+def ensure_log_partitions(conn: Connection, months_ahead: int = PARTITION_MONTHS_AHEAD):
+    """
+    สร้าง partition ของเดือนปัจจุบัน + ล่วงหน้า N เดือน (เรียกจาก maintenance job)
+    """
+    if not _is_postgres(conn):
+        return
+    this_month = date.today().replace(day=1)
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(conn, table.name):
+            continue
+        for i in range(months_ahead + 1):
+            create_month_partition(conn, table.name, add_months(this_month, i))
+
+
+# --- MIGRATIONS ---
+def _m001_log_indexes(conn: Connection):
+    """composite / partial index ตามรูปแบบ query จริง, date NOT NULL"""
+    # index คอลัมน์เดียวแบบเดิม ถูกแทนด้วย (date, start_time)
+    conn.execute(text("DROP INDEX IF EXISTS ix_cycle_log_date"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_downtime_log_date"))
+
+    for table in (CycleLog.__table__, DowntimeLog.__table__):
+        conn.execute(text(
+            f"UPDATE {table.name} SET date = date(start_time) WHERE date IS NULL"
+        ))
+        if _is_postgres(conn):
+            conn.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN date SET NOT NULL"))
+
+    for table in (CycleLog.__table__, DowntimeLog.__table__, MachineState.__table__):
+        _create_model_indexes(conn, table)
+
+
+def _m002_partition_logs(conn: Connection):
+    """แปลง cycle_log / downtime_log เป็น partitioned table (RANGE รายเดือนตาม date)"""
+    if not _is_postgres(conn):
+        return
+
+    this_month = date.today().replace(day=1)
+    for table in PARTITIONED_TABLES:
+        name = table.name
+        if is_partitioned(conn, name):
+            continue
+        legacy = f"{name}_legacy"
+        sequence = conn.execute(
+            text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": name}
+        ).scalar()
+
+        conn.execute(text(f"ALTER TABLE {name} RENAME TO {legacy}"))
+        conn.execute(text(
+            f"CREATE TABLE {name} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (date)"
+        ))
+        conn.execute(text(f"CREATE TABLE {name}_default PARTITION OF {name} DEFAULT"))
+
+        first_date = conn.execute(text(f"SELECT min(date) FROM {legacy}")).scalar()
+        month = (first_date or this_month).replace(day=1)
+        while month <= add_months(this_month, PARTITION_MONTHS_AHEAD):
+            create_month_partition(conn, name, month)
+            month = add_months(month, 1)
+
+        conn.execute(text(f"INSERT INTO {name} SELECT * FROM {legacy}"))
+        if sequence:
+            conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {name}.id"))
+        conn.execute(text(f"DROP TABLE {legacy}"))
+
+        # PK ของ partitioned table ต้องมี partition key อยู่ด้วย
+        conn.execute(text(f"ALTER TABLE {name} ADD PRIMARY KEY (id, date)"))
+        _create_model_indexes(conn, table)
+
+
+def _m003_keyset_indexes(conn: Connection):
+    """index สำหรับ keyset pagination บน (start_time, id)"""
+    conn.execute(text("DROP INDEX IF EXISTS ix_cycle_log_date_start_time"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_downtime_log_date_start_time"))
+    for table in (CycleLog.__table__, DowntimeLog.__table__):
+        _create_model_indexes(conn, table)
+
+
+def _rebuild_sqlite_table(conn: Connection, table, columns: list):
+    """SQLite แก้ primary key ไม่ได้ -> สร้างตารางใหม่ตาม models.py แล้วคัดลอกข้อมูล"""
+    legacy = f"{table.name}_legacy"
+    conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {legacy}"))
+    # ชื่อ index ใน SQLite เป็น global -> ต้องลบของตารางเดิมก่อนสร้างใหม่
+    for index in inspect(conn).get_indexes(legacy):
+        conn.execute(text(f"DROP INDEX IF EXISTS {index['name']}"))
+    table.create(conn)
+    column_list = ", ".join(columns)
+    conn.execute(text(f"INSERT INTO {table.name} ({column_list}) SELECT {column_list} FROM {legacy}"))
+    conn.execute(text(f"DROP TABLE {legacy}"))
+
+
+def _m004_machine_dimension(conn: Connection):
+    """คอลัมน์ machine_id ในทุกตาราง log/summary (ข้อมูลเดิม = DEFAULT_MACHINE_ID), index นำด้วย machine_id"""
+    for name in ("ix_cycle_log_date_start_time_id", "ix_downtime_log_date_start_time_id",
+                 "ix_downtime_log_active", "ix_downtime_log_closed_date_duration"):
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    default = DEFAULT_MACHINE_ID.replace("'", "''")
+    for table in (MachineState.__table__, CycleLog.__table__, DowntimeLog.__table__):
+        if "machine_id" not in _column_names(conn, table.name):
+            conn.execute(text(
+                f"ALTER TABLE {table.name} ADD COLUMN machine_id VARCHAR(64) NOT NULL DEFAULT '{default}'"
+            ))
+        _create_model_indexes(conn, table)
+
+    # summary รายวัน: primary key (date) -> (machine_id, date)
+    for table in (DailySummary.__table__, MachineStateDaily.__table__):
+        if "machine_id" in _column_names(conn, table.name):
+            continue
+        if _is_postgres(conn):
+            pk_name = inspect(conn).get_pk_constraint(table.name)["name"]
+            conn.execute(text(
+                f"ALTER TABLE {table.name} ADD COLUMN machine_id VARCHAR(64) NOT NULL DEFAULT '{default}'"
+            ))
+            conn.execute(text(f"ALTER TABLE {table.name} DROP CONSTRAINT {pk_name}"))
+            conn.execute(text(f"ALTER TABLE {table.name} ADD PRIMARY KEY (machine_id, date)"))
+            _create_model_indexes(conn, table)
+        else:
+            columns = sorted(_column_names(conn, table.name))
+            _rebuild_sqlite_table(conn, table, columns)
+
+
+MIGRATIONS = [
+    (1, "composite and partial indexes for log tables", _m001_log_indexes),
+    (2, "monthly partitioning for cycle_log / downtime_log", _m002_partition_logs),
+    (3, "keyset pagination indexes on (start_time, id)", _m003_keyset_indexes),
+    (4, "machine_id dimension on log and summary tables", _m004_machine_dimension),
+]
+
+
+def run_migrations(engine: Engine):
+    """
+    รัน migration ที่ค้างอยู่ (ทีละตัว ตัวละ 1 transaction)
+    """
+    with engine.begin() as conn:
+        if _is_postgres(conn):
+            conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _MIGRATION_LOCK_ID})
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, "
+            "name VARCHAR(200), "
+            "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        ))
+
+    for version, name, migrate in MIGRATIONS:
+        with engine.begin() as conn:
+            if _is_postgres(conn):
+                conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _MIGRATION_LOCK_ID})
+            applied = conn.execute(
+                text("SELECT 1 FROM schema_migrations WHERE version = :v"), {"v": version}
+            ).scalar()
+            if applied:
+                continue
+            print(f"🧱 Applying migration {version:03d}: {name}")
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name) VALUES (:v, :n)"),
+                {"v": version, "n": name}
+            )
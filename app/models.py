@@ -1,19 +1,29 @@
-from sqlalchemy import Column, Integer, String, DateTime, Date, Boolean, Float
+from sqlalchemy import Column, Integer, String, DateTime, Date, Boolean, Float, Index, text
 from sqlalchemy.sql import func
+from .config import DEFAULT_MACHINE_ID
 from .database import Base
 
 class MachineState(Base):
     __tablename__ = "machine_state"
+    __table_args__ = (
+        Index("ix_machine_state_machine_timestamp", "machine_id", "timestamp"),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    machine_id = Column(String(64), nullable=False, default=DEFAULT_MACHINE_ID, server_default=DEFAULT_MACHINE_ID)
+    timestamp = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     state = Column(String(10))  # 'RUN', 'STOP'
     current_cycle = Column(Integer, default=0)
     today_runtime_sec = Column(Integer, default=0)
 
 class CycleLog(Base):
     __tablename__ = "cycle_log"
+    __table_args__ = (
+        # /cycles?date=... : WHERE machine_id = ? AND date = ? AND (start_time, id) > cursor ORDER BY start_time, id
+        Index("ix_cycle_log_machine_date_start_time_id", "machine_id", "date", "start_time", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    date = Column(Date, index=True)
+    machine_id = Column(String(64), nullable=False, default=DEFAULT_MACHINE_ID, server_default=DEFAULT_MACHINE_ID)
+    date = Column(Date, nullable=False)  # partition key (ดู migrations.py)
     cycle_no = Column(Integer)
     start_time = Column(DateTime)
     stop_time = Column(DateTime)
@@ -21,18 +31,71 @@ class CycleLog(Base):
 
 class DailySummary(Base):
     __tablename__ = "daily_summary"
-    date = Column(Date, primary_key=True, index=True)
+    machine_id = Column(String(64), primary_key=True, default=DEFAULT_MACHINE_ID, server_default=DEFAULT_MACHINE_ID)
+    date = Column(Date, primary_key=True, index=True)  # index ของ date ใช้กับ query ระดับ fleet
     total_cycles = Column(Integer, default=0)
     total_runtime_sec = Column(Integer, default=0)
     total_downtime_sec = Column(Integer, default=0)
     availability = Column(Float, default=0.0)
 
+class MachineStateDaily(Base):
+    """Rollup รายวันของ machine_state (เก็บไว้แทน raw rows ที่ถูกลบตาม retention)"""
+    __tablename__ = "machine_state_daily"
+    machine_id = Column(String(64), primary_key=True, default=DEFAULT_MACHINE_ID, server_default=DEFAULT_MACHINE_ID)
+    date = Column(Date, primary_key=True)
+    run_transitions = Column(Integer, default=0)
+    stop_transitions = Column(Integer, default=0)
+    first_timestamp = Column(DateTime(timezone=True))
+    last_timestamp = Column(DateTime(timezone=True))
+    max_cycle = Column(Integer, default=0)
+    max_runtime_sec = Column(Integer, default=0)
+
 class DowntimeLog(Base):
     __tablename__ = "downtime_log"
+    __table_args__ = (
+        # history (มีช่วงวันที่) / export daily: WHERE machine_id = ? AND date ... ORDER BY start_time, id
+        Index("ix_downtime_log_machine_date_start_time_id", "machine_id", "date", "start_time", "id"),
+        # history ของเครื่อง (ไม่ระบุวันที่): ORDER BY start_time DESC, id DESC + keyset cursor
+        Index("ix_downtime_log_machine_start_time_id", "machine_id", "start_time", "id"),
+        # history ทั้ง fleet
+        Index("ix_downtime_log_start_time_id", "start_time", "id"),
+        # /downtime/active, /fleet/downtime/active: มีแถว active อย่างมากเครื่องละแถว -> partial index เล็กมาก
+        Index("ix_downtime_log_machine_active", "machine_id",
+              postgresql_where=text("is_active"), sqlite_where=text("is_active")),
+        # /downtime/top-today, summary/today: WHERE machine_id = ? AND date = ? AND NOT is_active ORDER BY duration_sec DESC
+        Index("ix_downtime_log_machine_closed_date_duration", "machine_id", "date", "duration_sec",
+              postgresql_where=text("NOT is_active"), sqlite_where=text("NOT is_active")),
+    )
     id = Column(Integer, primary_key=True, index=True)
+    machine_id = Column(String(64), nullable=False, default=DEFAULT_MACHINE_ID, server_default=DEFAULT_MACHINE_ID)
     start_time = Column(DateTime(timezone=True), server_default=func.now())
     end_time = Column(DateTime(timezone=True), nullable=True)
     downtime_reason = Column(String(50))  # SETUP_DIE, REPAIR, etc.
     duration_sec = Column(Integer, nullable=True)
-    date = Column(Date, index=True)
-    is_active = Column(Boolean, default=True)
\ No newline at end of file
+    date = Column(Date, nullable=False)  # partition key (ดู migrations.py)
+    is_active = Column(Boolean, default=True)
+
+class ArchiveManifest(Base):
+    """เดือนที่ถูกย้ายจาก hot table ไปเก็บเป็น Parquet แล้ว (ดู services/archive_service.py)"""
+    __tablename__ = "archive_manifest"
+    table_name = Column(String(50), primary_key=True)
+    month = Column(Date, primary_key=True)  # วันที่ 1 ของเดือน
+    row_count = Column(Integer, default=0)
+    path = Column(String(255))
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class IngestCheckpoint(Base):
+    """
+    สถานะล่าสุดของ state machine ของเครื่องที่ส่งข้อมูลมาจาก edge node (ดู services/ingest_service.py)
+    commit พร้อมผลของ batch เดียวกัน -> worker ไหนรับ batch ถัดไปก็ทำต่อได้ถูกต้อง
+    """
+    __tablename__ = "ingest_checkpoint"
+    machine_id = Column(String(64), primary_key=True)
+    node_id = Column(String(64), nullable=True)
+    state = Column(String(10), default="STOP")
+    run_start_time = Column(DateTime, nullable=True)
+    last_spark_time = Column(Float, default=0.0)  # epoch seconds (เหมือน MachineStateMachine)
+    last_event_time = Column(DateTime, nullable=True)  # watermark: event ที่เก่ากว่านี้ถือว่าซ้ำ/มาช้า
+    current_cycle = Column(Integer, default=0)
+    today_runtime_sec = Column(Integer, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
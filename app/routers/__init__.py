@@ -1,4 +1,12 @@
 from .state import router as state
 from .cycles import router as cycles
 from .summary import router as summary
-from .downtime import router as downtime
\ No newline at end of file
+from .downtime import router as downtime
+from .export import router as export
+from .ingest import router as ingest
+from .fleet import router as fleet
+from .preview import router as preview
+from .shadow import router as shadow
+from .health import router as health
+from .admin import router as admin
+from .timeline import router as timeline
@@ -0,0 +1,48 @@
+import hmac
+import os
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+
+from ..services import profiler_service
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+# ไม่ตั้ง = ปิด endpoint กลุ่มนี้ทั้งหมด
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def _check_token(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@router.get("/profile", response_class=PlainTextResponse, dependencies=[Depends(_check_token)])
+async def run_profile(
+    seconds: float = Query(10, gt=0, le=profiler_service.PROFILE_MAX_SECONDS, description="ระยะเวลาที่สุ่ม (วินาที)"),
+    interval_ms: float = Query(10, ge=1, le=1000, description="สุ่มทุกกี่ ms"),
+    thread: Optional[str] = Query(None, description="เฉพาะ thread ที่ชื่อมีข้อความนี้ เช่น vision, AnyIO"),
+    idle: bool = Query(False, description="รวม stack ที่กำลังรอ (lock / queue / select)"),
+    lines: bool = Query(False, description="แยกตามบรรทัด"),
+):
+    """
+    สุ่ม stack ของ process ที่รันอยู่ (vision thread + request thread) เป็นเวลา N วินาที
+    คืนไฟล์ collapsed stack สำหรับ flamegraph.pl / speedscope
+    """
+    try:
+        stacks, rounds = await run_in_threadpool(
+            profiler_service.profile, seconds, interval_ms / 1000, thread, idle, lines
+        )
+    except profiler_service.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    filename = f"profile_{datetime.now():%Y%m%d_%H%M%S}.collapsed"
+    return PlainTextResponse(stacks, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Profile-Samples": str(rounds),
+    })
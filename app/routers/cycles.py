@@ -1,21 +1,35 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from datetime import date
 
-from ..database import get_db
+from ..database import get_async_db
+from ..models import DEFAULT_MACHINE_ID
 from ..schemas import CycleSchema
 from ..services import cycle_service
+from ..services.pagination import decode_cursor
 
 router = APIRouter()
 
 @router.get("/cycles", response_model=List[CycleSchema], tags=["History"])
-def get_cycles(
+async def get_cycles(
+    response: Response,
     date: date = Query(..., description="ระบุวันที่ต้องการดูข้อมูล (YYYY-MM-DD)"),
-    db: Session = Depends(get_db)
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="จำนวนต่อหน้า (ไม่ระบุ = ทั้งหมด)"),
+    cursor: Optional[str] = Query(None, description="ค่า X-Next-Cursor จากหน้าก่อนหน้า"),
+    machine_id: str = Query(DEFAULT_MACHINE_ID, max_length=64, description="รหัสเครื่อง"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     ดึงรายการ Cycle ทั้งหมดในวันที่ระบุ
+    ถ้าระบุ limit จะแบ่งหน้า: cursor ของหน้าถัดไปอยู่ใน header X-Next-Cursor
     """
-    cycles = cycle_service.get_cycles_by_date(db, date)
-    return cycles
\ No newline at end of file
+    try:
+        seek = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    cycles, next_cursor = await cycle_service.get_cycles_page(db, date, seek, limit, machine_id)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return cycles
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, extract, asc, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, and_, extract, asc, desc
 from datetime import datetime, date, timedelta, timezone
 from typing import List, Optional
 import io
@@ -27,8 +28,13 @@ def format_duration(seconds: Optional[int]) -> str:
     s = seconds % 60
     return f"{h:02d}:{m:02d}:{s:02d}"
 
-from ..database import get_db
-from ..models import DowntimeLog, DailySummary
+from ..database import get_db, get_async_db
+from ..models import DowntimeLog, DailySummary, DEFAULT_MACHINE_ID
+from ..config import calc_availability
+from ..services import archive_service, downtime_service
+from ..services.live_status import live_status
+from ..services.pagination import decode_cursor
+from ..migrations import add_months
 from ..schemas import (
     DowntimeStartRequest, 
     DowntimeStopRequest, 
@@ -38,11 +44,26 @@ from ..schemas import (
 
 router = APIRouter(prefix="/downtime", tags=["downtime"])
 
+def _with_archived_reasons(db: Session, reasons_data, start_date: date, end_date: date, machine_id: str):
+    """รวมผลสรุปรายสาเหตุจาก hot table กับส่วนที่อยู่ใน Parquet archive (ถ้าช่วงวันที่คาบเกี่ยว)"""
+    cutoff = archive_service.get_hot_cutoff(db, "downtime_log")
+    if not cutoff or start_date >= cutoff:
+        return reasons_data
+    archived = archive_service.downtime_reason_totals(
+        start_date, min(end_date, cutoff - timedelta(days=1)), machine_id=machine_id
+    )
+    return archive_service.merge_reason_totals(reasons_data, archived)
+
 @router.post("/start", response_model=DowntimeLogSchema)
-def start_downtime(request: DowntimeStartRequest, db: Session = Depends(get_db)):
+def start_downtime(
+    request: DowntimeStartRequest,
+    machine_id: str = Query(DEFAULT_MACHINE_ID, max_length=64, description="รหัสเครื่อง"),
+    db: Session = Depends(get_db)
+):
     """เริ่มบันทึก downtime ใหม่"""
-    # ตรวจสอบว่ามี downtime ที่ active อยู่หรือไม่
+    # ตรวจสอบว่าเครื่องนี้มี downtime ที่ active อยู่หรือไม่
     active_downtime = db.query(DowntimeLog).filter(
+        DowntimeLog.machine_id == machine_id,
         DowntimeLog.is_active == True
     ).first()
     
@@ -51,22 +72,30 @@ def start_downtime(request: DowntimeStartRequest, db: Session = Depends(get_db))
     
     # สร้าง downtime log ใหม่
     new_downtime = DowntimeLog(
+        machine_id=machine_id,
         downtime_reason=request.downtime_reason,
+        start_time=datetime.now(timezone.utc),
         date=date.today(),
         is_active=True
     )
     
     db.add(new_downtime)
+    db.flush()
+    live_status.stage_downtime_start(db, new_downtime)
     db.commit()
     db.refresh(new_downtime)
     
     return new_downtime
 
 @router.post("/stop", response_model=DowntimeLogSchema)
-def stop_downtime(db: Session = Depends(get_db)):
+def stop_downtime(
+    machine_id: str = Query(DEFAULT_MACHINE_ID, max_length=64, description="รหัสเครื่อง"),
+    db: Session = Depends(get_db)
+):
     """หยุดบันทึก downtime ปัจจุบัน"""
-    # หา downtime ที่ active อยู่
+    # หา downtime ที่ active อยู่ของเครื่องนี้
     active_downtime = db.query(DowntimeLog).filter(
+        DowntimeLog.machine_id == machine_id,
         DowntimeLog.is_active == True
     ).first()
     
@@ -75,19 +104,22 @@ def stop_downtime(db: Session = Depends(get_db)):
     
     # อัพเดท end_time และคำนวณ duration
     active_downtime.end_time = datetime.now(timezone.utc)
-    duration = (active_downtime.end_time - active_downtime.start_time).total_seconds()
+    start_time = active_downtime.start_time
+    if start_time.tzinfo is None:
+        # SQLite เก็บ datetime แบบไม่มี timezone (บันทึกเป็น UTC)
+        start_time = start_time.replace(tzinfo=timezone.utc)
+    duration = (active_downtime.end_time - start_time).total_seconds()
     active_downtime.duration_sec = int(duration)
     active_downtime.is_active = False
     
     # อัพเดท daily summary
-    summary = db.query(DailySummary).filter(
-        DailySummary.date == active_downtime.date
-    ).first()
+    summary = db.get(DailySummary, (machine_id, active_downtime.date))
     
     if summary:
         summary.total_downtime_sec += active_downtime.duration_sec
     else:
         summary = DailySummary(
+            machine_id=machine_id,
             date=active_downtime.date,
             total_cycles=0,
             total_runtime_sec=0,
@@ -96,8 +128,8 @@ def stop_downtime(db: Session = Depends(get_db)):
         )
         db.add(summary)
     
-    SHIFT_SECONDS = 27000.0
-    summary.availability = round(min(100.0, summary.total_runtime_sec / SHIFT_SECONDS * 100), 2)
+    summary.availability = calc_availability(summary.total_runtime_sec)
+    live_status.stage_downtime_stop(db, active_downtime, summary)
     
     db.commit()
     db.refresh(active_downtime)
@@ -105,39 +137,28 @@ def stop_downtime(db: Session = Depends(get_db)):
     return active_downtime
 
 @router.get("/active", response_model=ActiveDowntimeResponse)
-def get_active_downtime(db: Session = Depends(get_db)):
-    """ดึงข้อมูล downtime ที่กำลัง active อยู่"""
-    active_downtime = db.query(DowntimeLog).filter(
-        DowntimeLog.is_active == True
-    ).first()
+async def get_active_downtime(
+    machine_id: str = Query(DEFAULT_MACHINE_ID, max_length=64, description="รหัสเครื่อง"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """ดึงข้อมูล downtime ที่กำลัง active อยู่ของเครื่อง (ทุกเครื่อง: /fleet/downtime/active)"""
+    # จาก memory (services/live_status.py) query เฉพาะครั้งแรก / เมื่อมีการเขียนจาก worker อื่น
+    live = await live_status.get(db, machine_id)
     
     return {
-        "is_active": active_downtime is not None,
-        "current_downtime": active_downtime
+        "is_active": live.active_downtime is not None,
+        "current_downtime": live.active_downtime
     }
 
 @router.get("/summary/today")
-def get_today_downtime_summary(db: Session = Depends(get_db)):
+async def get_today_downtime_summary(
+    machine_id: str = Query(DEFAULT_MACHINE_ID, max_length=64, description="รหัสเครื่อง"),
+    db: AsyncSession = Depends(get_async_db)
+):
     """ดึงข้อมูลสรุป downtime แต่ละประเภทสำหรับวันนี้"""
-    today = date.today()
-    
-    # Query downtime logs for today grouped by reason
-    from sqlalchemy import func
-    results = db.query(
-        DowntimeLog.downtime_reason,
-        func.sum(DowntimeLog.duration_sec).label("total_duration_sec")
-    ).filter(
-        and_(
-            DowntimeLog.date == today,
-            DowntimeLog.is_active == False,
-            DowntimeLog.duration_sec.isnot(None)
-        )
-    ).group_by(DowntimeLog.downtime_reason).all()
-    
-    # Convert to dictionary
-    summary = {}
-    for result in results:
-        summary[result.downtime_reason] = result.total_duration_sec or 0
+    # downtime ที่จบแล้วของวันนี้ แยกตามสาเหตุ (จาก memory: services/live_status.py)
+    live = await live_status.get(db, machine_id)
+    summary = dict(live.downtime_by_reason)
     
     # Ensure all reasons are present (even if 0)
     for reason_id in REASON_MAP.keys():
@@ -147,38 +168,49 @@ def get_today_downtime_summary(db: Session = Depends(get_db)):
     return summary
 
 @router.get("/history", response_model=List[DowntimeLogSchema])
-def get_downtime_history(
+async def get_downtime_history(
+    response: Response,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="ค่า X-Next-Cursor จากหน้าก่อนหน้า"),
+    machine_id: Optional[str] = Query(DEFAULT_MACHINE_ID, max_length=64, description="รหัสเครื่อง (ว่าง = ทุกเครื่อง)"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """ดึงประวัติ downtime"""
-    query = db.query(DowntimeLog)
-    
-    if start_date:
-        query = query.filter(DowntimeLog.date >= start_date)
-    if end_date:
-        query = query.filter(DowntimeLog.date <= end_date)
-    
-    downtimes = query.order_by(DowntimeLog.start_time.desc()).limit(limit).all()
+    """ดึงประวัติ downtime (ใหม่ -> เก่า) cursor ของหน้าถัดไปอยู่ใน header X-Next-Cursor"""
+    try:
+        seek = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    downtimes, next_cursor = await downtime_service.get_history_page(
+        db, start_date, end_date, seek, limit, machine_id or None
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return downtimes
 
 @router.get("/top-today", response_model=List[DowntimeLogSchema])
-def get_top_downtime_today(db: Session = Depends(get_db)):
+async def get_top_downtime_today(
+    machine_id: str = Query(DEFAULT_MACHINE_ID, max_length=64, description="รหัสเครื่อง"),
+    db: AsyncSession = Depends(get_async_db)
+):
     """ดึง Top 10 Downtime วันนี้ เรียงตามระยะเวลายาวนานที่สุด"""
     today = date.today()
     
-    top_downtimes = db.query(DowntimeLog).filter(
-        and_(
-            DowntimeLog.date == today,
-            DowntimeLog.is_active == False,
-            DowntimeLog.duration_sec.isnot(None)
-        )
-    ).order_by(
-        desc(DowntimeLog.duration_sec),
-        desc(DowntimeLog.start_time)
-    ).limit(10).all()
+    top_downtimes = (await db.scalars(
+        select(DowntimeLog).where(
+            and_(
+                DowntimeLog.machine_id == machine_id,
+                DowntimeLog.date == today,
+                DowntimeLog.is_active == False,
+                DowntimeLog.duration_sec.isnot(None)
+            )
+        ).order_by(
+            desc(DowntimeLog.duration_sec),
+            desc(DowntimeLog.start_time)
+        ).limit(10)
+    )).all()
     
     return top_downtimes
 
@@ -188,6 +220,7 @@ def export_downtime_report(
     year: int,
     month: Optional[int] = None,
     day: Optional[int] = None,
+    machine_id: str = Query(DEFAULT_MACHINE_ID, max_length=64, description="รหัสเครื่อง"),
     db: Session = Depends(get_db)
 ):
     try:
@@ -219,9 +252,16 @@ def export_downtime_report(
             cell.alignment = Alignment(horizontal="center")
         
         downtimes = db.query(DowntimeLog).filter(
+            DowntimeLog.machine_id == machine_id,
             DowntimeLog.date == target_date
         ).order_by(DowntimeLog.start_time.asc()).all()
         
+        cutoff = archive_service.get_hot_cutoff(db, "downtime_log")
+        if cutoff and target_date < cutoff:
+            downtimes = archive_service.load_rows(
+                "downtime_log", target_date, target_date, extra_filter=archive_service.machine_filter(machine_id)
+            ) + downtimes
+        
         for idx, downtime in enumerate(downtimes, start=2):
             ws1.cell(row=idx, column=1, value=idx - 1)
             ws1.cell(row=idx, column=2, value=downtime.start_time.strftime("%H:%M:%S"))
@@ -241,7 +281,7 @@ def export_downtime_report(
             cell.font = header_font
             cell.alignment = Alignment(horizontal="center")
         
-        summary = db.query(DailySummary).filter(DailySummary.date == target_date).first()
+        summary = db.get(DailySummary, (machine_id, target_date))
         cycles = summary.total_cycles if summary else 0
         runtime_sec = summary.total_runtime_sec if summary else 0
         downtime_sec = summary.total_downtime_sec if summary else 0
@@ -273,13 +313,23 @@ def export_downtime_report(
         
         total_downtime_month_sec = 0
         
+        month_start = date(year, month, 1)
+        month_end = add_months(month_start, 1) - timedelta(days=1)
+        # ดึงทั้งเดือนใน query เดียว (ช่วงวันที่ใช้ index ได้ และไม่พึ่ง extract() ของ Postgres)
+        month_summaries = {
+            s.date: s for s in db.query(DailySummary).filter(
+                DailySummary.machine_id == machine_id,
+                DailySummary.date.between(month_start, month_end)
+            ).all()
+        }
+        
         for day_num in range(1, 32):
             try:
                 day_date = date(year, month, day_num)
             except ValueError:
                 continue
             
-            summary = db.query(DailySummary).filter(DailySummary.date == day_date).first()
+            summary = month_summaries.get(day_date)
             cycles = summary.total_cycles if summary else 0
             runtime_sec = summary.total_runtime_sec if summary else 0
             downtime_sec = summary.total_downtime_sec if summary else 0
@@ -311,13 +361,15 @@ def export_downtime_report(
             func.sum(DowntimeLog.duration_sec).label("total_duration_sec")
         ).filter(
             and_(
-                func.extract("year", DowntimeLog.date) == year,
-                func.extract("month", DowntimeLog.date) == month,
+                DowntimeLog.machine_id == machine_id,
+                DowntimeLog.date.between(month_start, month_end),
                 DowntimeLog.is_active == False,
                 DowntimeLog.duration_sec.isnot(None)
             )
         ).group_by(DowntimeLog.downtime_reason).order_by(desc("total_duration_sec")).all()
         
+        reasons_data = _with_archived_reasons(db, reasons_data, month_start, month_end, machine_id)
+        
         for idx, row_data in enumerate(reasons_data, start=2):
             reason_label = REASON_MAP.get(row_data.downtime_reason, row_data.downtime_reason)
             frequency = row_data.frequency
@@ -344,23 +396,30 @@ def export_downtime_report(
             cell.font = header_font
             cell.alignment = Alignment(horizontal="center")
         
-        monthly_summaries = db.query(
-            func.extract("month", DailySummary.date).label("month"),
-            func.coalesce(func.sum(DailySummary.total_cycles), 0).label("total_cycles"),
-            func.coalesce(func.sum(DailySummary.total_runtime_sec), 0).label("total_runtime_sec"),
-            func.coalesce(func.sum(DailySummary.total_downtime_sec), 0).label("total_downtime_sec")
+        year_start = date(year, 1, 1)
+        year_end = date(year, 12, 31)
+        
+        # รวมรายเดือนฝั่ง Python (แถวรายวันไม่เกิน 366 แถว) -> ไม่พึ่ง extract() ที่ต่างกันในแต่ละ DB
+        monthly_totals = {}
+        for day_row in db.query(
+            DailySummary.date,
+            DailySummary.total_cycles,
+            DailySummary.total_runtime_sec,
+            DailySummary.total_downtime_sec
         ).filter(
-            func.extract("year", DailySummary.date) == year
-        ).group_by(func.extract("month", DailySummary.date)).order_by("month").all()
+            DailySummary.machine_id == machine_id,
+            DailySummary.date.between(year_start, year_end)
+        ).all():
+            totals = monthly_totals.setdefault(day_row.date.month, [0, 0, 0])
+            totals[0] += day_row.total_cycles or 0
+            totals[1] += day_row.total_runtime_sec or 0
+            totals[2] += day_row.total_downtime_sec or 0
         
-        total_year_downtime_sec = sum((ms.total_downtime_sec or 0) for ms in monthly_summaries)
+        total_year_downtime_sec = sum(totals[2] for totals in monthly_totals.values())
         
         for month_idx in range(12):
             month_num = month_idx + 1
-            month_row = next((ms for ms in monthly_summaries if int(ms.month) == month_num), None)
-            cycles = month_row.total_cycles if month_row else 0
-            runtime_sec = month_row.total_runtime_sec if month_row else 0
-            downtime_sec = month_row.total_downtime_sec if month_row else 0
+            cycles, runtime_sec, downtime_sec = monthly_totals.get(month_num, (0, 0, 0))
             total_time_sec = runtime_sec + downtime_sec
             avg_availability = round((runtime_sec / total_time_sec * 100), 2) if total_time_sec > 0 else 100.0
             
@@ -386,12 +445,15 @@ def export_downtime_report(
             func.sum(DowntimeLog.duration_sec).label("total_duration_sec")
         ).filter(
             and_(
-                func.extract("year", DowntimeLog.date) == year,
+                DowntimeLog.machine_id == machine_id,
+                DowntimeLog.date.between(year_start, year_end),
                 DowntimeLog.is_active == False,
                 DowntimeLog.duration_sec.isnot(None)
             )
         ).group_by(DowntimeLog.downtime_reason).order_by(desc("total_duration_sec")).all()
         
+        yearly_reasons = _with_archived_reasons(db, yearly_reasons, year_start, year_end, machine_id)
+        
         total_year_downtime_from_reasons = sum((r.total_duration_sec or 0) for r in yearly_reasons)
         
         for idx, row_data in enumerate(yearly_reasons, start=2):
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from datetime import date
+from typing import Optional
+
+from ..services import export_service
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+EXPORT_TABLES = {
+    "cycles": "cycle_log",
+    "downtime": "downtime_log",
+}
+
+@router.get("/{dataset}")
+def export_raw_data(
+    dataset: str,
+    start_date: date = Query(..., description="วันเริ่ม (YYYY-MM-DD)"),
+    end_date: date = Query(..., description="วันสิ้นสุด (YYYY-MM-DD)"),
+    format: str = Query("csv", description="csv หรือ parquet"),
+    machine_id: Optional[str] = Query(None, max_length=64, description="รหัสเครื่อง (ไม่ระบุ = ทุกเครื่อง)")
+):
+    """
+    Export ข้อมูลดิบ (cycles / downtime) ช่วงวันที่ใดก็ได้ แบบ streaming
+    """
+    if dataset not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail="Unknown dataset. Use 'cycles' or 'downtime'")
+    if format not in export_service.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid format. Use 'csv' or 'parquet'")
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+
+    table_name = EXPORT_TABLES[dataset]
+    stream = export_service.stream_csv if format == "csv" else export_service.stream_parquet
+    filename = f"{dataset}_{start_date.isoformat()}_{end_date.isoformat()}.{format}"
+
+    return StreamingResponse(
+        stream(table_name, start_date, end_date, machine_id),
+        media_type=export_service.EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+from typing import List, Optional
+
+from ..database import get_async_db
+from ..schemas import StateResponse, FleetSummaryResponse, DowntimeLogSchema, MachineReasonSchema
+from ..services import fleet_service
+
+router = APIRouter(prefix="/fleet", tags=["Fleet"])
+
+
+def _date_range(start_date: Optional[date], end_date: Optional[date]):
+    start_date = start_date or date.today()
+    end_date = end_date or start_date
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+    return start_date, end_date
+
+
+@router.get("/state", response_model=List[StateResponse])
+async def get_fleet_state(db: AsyncSession = Depends(get_async_db)):
+    """สถานะปัจจุบันของทุกเครื่อง"""
+    return await fleet_service.get_fleet_states(db)
+
+
+@router.get("/summary", response_model=FleetSummaryResponse)
+async def get_fleet_summary(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """ยอดรวมแยกตามเครื่อง + ทั้ง fleet (ไม่ระบุวันที่ = วันนี้)"""
+    start_date, end_date = _date_range(start_date, end_date)
+    return await fleet_service.get_fleet_summary(db, start_date, end_date)
+
+
+@router.get("/downtime/active", response_model=List[DowntimeLogSchema])
+async def get_fleet_active_downtime(db: AsyncSession = Depends(get_async_db)):
+    """downtime ที่กำลัง active อยู่ของทุกเครื่อง"""
+    return await fleet_service.get_active_downtimes(db)
+
+
+@router.get("/downtime/summary", response_model=List[MachineReasonSchema])
+async def get_fleet_downtime_summary(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """downtime แยกตามเครื่องและสาเหตุ (ไม่ระบุวันที่ = วันนี้)"""
+    start_date, end_date = _date_range(start_date, end_date)
+    return await fleet_service.get_downtime_by_reason(db, start_date, end_date)
@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+
+from ..schemas import VisionHealthResponse
+from ..vision.sampler import frame_scheduler
+from ..vision.supervisor import vision_supervisor
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/vision", response_model=VisionHealthResponse)
+def get_vision_health():
+    """
+    สถานะกล้อง / inference: อายุเฟรมล่าสุด, heartbeat ของแต่ละ stage, จำนวนครั้งที่ restart
+    และความถี่ inference ปัจจุบัน (sampler)
+    """
+    return {**vision_supervisor.health(), "sampler": frame_scheduler.status()}
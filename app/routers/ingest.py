@@ -0,0 +1,69 @@
+import hmac
+import os
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import SessionLocal, get_async_db
+from ..models import IngestCheckpoint
+from ..schemas import IngestBatch, IngestResult, IngestMachineSchema
+from ..services import ingest_service
+
+router = APIRouter(prefix="/ingest", tags=["Ingest"])
+
+# ถ้าตั้งไว้ edge node ต้องส่ง header X-Ingest-Token ให้ตรง
+INGEST_TOKEN = os.getenv("INGEST_TOKEN", "")
+
+
+def _check_token(x_ingest_token: Optional[str] = Header(None)):
+    if INGEST_TOKEN and not hmac.compare_digest(x_ingest_token or "", INGEST_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid ingest token")
+
+
+def _ingest(raw: bytes, content_encoding: Optional[str]) -> dict:
+    try:
+        batch = IngestBatch.model_validate_json(ingest_service.decode_body(raw, content_encoding))
+    except ingest_service.PayloadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    db = SessionLocal()
+    try:
+        return ingest_service.ingest_batch(db, batch)
+    except ingest_service.MachineConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    finally:
+        db.close()
+
+
+@router.post("/batch", response_model=IngestResult, dependencies=[Depends(_check_token)])
+async def ingest_batch(request: Request):
+    """
+    รับ batch ผล detection / state transition จาก edge node (JSON, บีบอัดด้วย gzip หรือ deflate ได้)
+
+    {"machine_id": "press-01", "node_id": "edge-01",
+     "detections": [{"timestamp": "...", "spark_detected": true, "confidence": 0.91}, ...],
+     "transitions": [{"timestamp": "...", "state": "RUN"}, ...]}
+
+    ส่ง batch เดิมซ้ำได้ (event ที่ไม่ใหม่กว่า event ล่าสุดของเครื่องจะถูกข้าม)
+    ถ้าส่ง detections ควรส่งทุกเฟรม (รวม spark_detected=false) เพื่อให้จับ STOP ได้ตามเวลา
+    """
+    raw = await request.body()
+    # decompress + DB เป็นงาน blocking -> threadpool
+    return await run_in_threadpool(_ingest, raw, request.headers.get("content-encoding"))
+
+
+@router.get("/machines", response_model=List[IngestMachineSchema])
+async def list_ingest_machines(db: AsyncSession = Depends(get_async_db)):
+    """
+    สถานะล่าสุดของทุกเครื่องที่ส่งข้อมูลผ่าน edge node
+    """
+    result = await db.execute(select(IngestCheckpoint).order_by(IngestCheckpoint.machine_id))
+    return result.scalars().all()
@@ -0,0 +1,56 @@
+import asyncio
+import weakref
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+
+from ..vision.preview import preview_hub
+
+router = APIRouter(prefix="/preview", tags=["Preview"])
+
+_BOUNDARY = "frame"
+
+
+@router.get("/snapshot.jpg")
+async def get_snapshot(boxes: bool = Query(True, description="วาด box ที่ตรวจเจอ")):
+    """ภาพล่าสุดที่ vision module ประมวลผล (JPEG)"""
+    latest = await run_in_threadpool(preview_hub.jpeg, boxes)
+    if latest is None:
+        raise HTTPException(status_code=503, detail="No frame available yet")
+    _, captured_at, jpeg = latest
+    return Response(content=jpeg, media_type="image/jpeg",
+                    headers={"Cache-Control": "no-store", "X-Frame-Timestamp": f"{captured_at:.3f}"})
+
+
+@router.get("/stream")
+async def get_stream(request: Request, boxes: bool = Query(True, description="วาด box ที่ตรวจเจอ")):
+    """
+    MJPEG (multipart/x-mixed-replace) เปิดใน <img src> ได้เลย
+    ส่งเฉพาะเมื่อมีเฟรมใหม่ ไม่เกิน PREVIEW_MAX_FPS
+    """
+    # จองที่ตั้งแต่ใน handler: เต็มแล้วตอบ 503 ได้ (ใน generator ส่ง 200 ไปแล้ว)
+    if not preview_hub.acquire_viewer():
+        raise HTTPException(status_code=503, detail="Too many preview viewers")
+
+    async def frames():
+        try:
+            last_seq = None
+            while not await request.is_disconnected():
+                if preview_hub.seq != last_seq:
+                    latest = await run_in_threadpool(preview_hub.jpeg, boxes)
+                    if latest is not None and latest[0] != last_seq:
+                        last_seq, captured_at, jpeg = latest
+                        yield (f"--{_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                               f"Content-Length: {len(jpeg)}\r\nX-Frame-Timestamp: {captured_at:.3f}\r\n\r\n"
+                               ).encode() + jpeg + b"\r\n"
+                await asyncio.sleep(preview_hub.min_interval or 0.05)
+        finally:
+            release()
+
+    stream = frames()
+    # client หลุดก่อนเริ่มส่ง -> generator ไม่เคยเริ่ม (finally ไม่ทำงาน) คืนที่ตอน generator ถูกเก็บกวาดแทน
+    # finalize เรียกได้ครั้งเดียว -> ไม่คืนซ้ำ
+    release = weakref.finalize(stream, preview_hub.release_viewer)
+    return StreamingResponse(stream, media_type=f"multipart/x-mixed-replace; boundary={_BOUNDARY}",
+                             headers={"Cache-Control": "no-store"})
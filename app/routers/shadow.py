@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+
+from ..schemas import ShadowStatusResponse
+from ..vision.shadow import shadow_runner
+
+router = APIRouter(prefix="/shadow", tags=["Shadow Model"])
+
+
+@router.get("", response_model=ShadowStatusResponse)
+def get_shadow_status():
+    """
+    โมเดล production / candidate ที่ใช้อยู่ + สถิติความตรงกันรายเฟรมและรายรอบ
+    (ตั้งค่า / promote ที่ MODEL_CONFIG_PATH ไม่ต้อง restart)
+    """
+    return shadow_runner.status()
@@ -1,16 +1,20 @@
-from fastapi import APIRouter, Depends
-from ..state_machine import machine_brain
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_db
+from ..models import DEFAULT_MACHINE_ID
 from ..schemas import StateResponse
-from datetime import datetime
+from ..services.live_status import live_status
 
 router = APIRouter()
 
 @router.get("/state", response_model=StateResponse)
-def get_current_state():
-    return {
-        "state": machine_brain.current_state,
-        "is_running": machine_brain.current_state == "RUN",
-        "current_cycle": machine_brain.current_cycle_count,
-        "today_runtime_sec": machine_brain.today_runtime,
-        "last_updated": datetime.now()
-    }
\ No newline at end of file
+async def get_current_state(
+    machine_id: str = Query(DEFAULT_MACHINE_ID, max_length=64, description="รหัสเครื่อง"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # อ่านจาก memory (services/live_status.py): ยอดของวันนี้ reset ตอนข้ามวัน
+    # เครื่องที่ต่อกล้องกับ server นี้ใช้ state จาก machine_brain, เครื่องจาก edge node ใช้ที่ ingest commit ล่าสุด
+    live = await live_status.get(db, machine_id)
+    if not live.known:
+        raise HTTPException(status_code=404, detail="Unknown machine")
+    return live_status.state_view(live)
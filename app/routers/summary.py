@@ -1,31 +1,38 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date
 
-from ..database import get_db
+from ..database import get_async_db
+from ..models import DEFAULT_MACHINE_ID
 from ..schemas import SummarySchema
 from ..services import summary_service
+from ..services.live_status import live_status
 
 router = APIRouter()
 
 @router.get("/summary/today", response_model=SummarySchema, tags=["Dashboard"])
-def get_today_summary(db: Session = Depends(get_db)):
+async def get_today_summary(
+    machine_id: str = Query(DEFAULT_MACHINE_ID, max_length=64, description="รหัสเครื่อง"),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     ดึงข้อมูลสรุปของ 'วันนี้' (Real-time dashboard use)
     ถ้าไม่มีข้อมูล จะ return 0 ทั้งหมด ไม่ error
+    (ตอบจาก memory: services/live_status.py ไม่ query DB ทุก poll)
     """
-    return summary_service.get_realtime_today_summary(db)
+    return live_status.summary_view(await live_status.get(db, machine_id))
 
 @router.get("/summary", response_model=SummarySchema, tags=["History"])
-def get_historical_summary(
+async def get_historical_summary(
     date: date = Query(..., description="ระบุวันที่ (YYYY-MM-DD)"),
-    db: Session = Depends(get_db)
+    machine_id: str = Query(DEFAULT_MACHINE_ID, max_length=64, description="รหัสเครื่อง"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     ดึงข้อมูลสรุปย้อนหลัง
     ถ้าไม่พบวันที่ระบุ จะ return 404
     """
-    summary = summary_service.get_summary_by_date(db, date)
+    summary = await summary_service.get_summary_by_date(db, date, machine_id)
     
     if not summary:
         # กรณีดูย้อนหลัง ถ้าไม่มีข้อมูลถือว่า User อาจจะใส่วันผิด หรือวันหยุด
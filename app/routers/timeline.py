@@ -0,0 +1,35 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_async_db
+from ..models import DEFAULT_MACHINE_ID
+from ..schemas import TimelineResponse
+from ..services import timeline_service
+
+router = APIRouter(tags=["Dashboard"])
+
+
+@router.get("/timeline", response_model=TimelineResponse)
+async def get_timeline(
+    start_date: Optional[date] = Query(None, description="วันเริ่ม (YYYY-MM-DD) ค่าเริ่มต้น = วันนี้"),
+    end_date: Optional[date] = Query(None, description="วันสุดท้าย (YYYY-MM-DD) ค่าเริ่มต้น = start_date"),
+    machine_id: str = Query(DEFAULT_MACHINE_ID, max_length=64, description="รหัสเครื่อง"),
+    bucket_sec: Optional[int] = Query(None, ge=1, le=86400, description="รวมเป็นช่องละกี่วินาที (ไม่ระบุ = ละเอียดสุด)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Timeline RUN / STOP / DOWNTIME (ตามสาเหตุ) เป็นช่วงต่อเนื่อง สำหรับวาด bar บน dashboard
+    ถึงเวลาปัจจุบัน (ถ้าช่วงรวมวันนี้) / คำนวณใหม่เฉพาะเมื่อมี cycle / downtime เปลี่ยน
+    """
+    start_date = start_date or date.today()
+    end_date = end_date or start_date
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+    try:
+        body = await timeline_service.get_timeline(db, start_date, end_date, machine_id, bucket_sec)
+    except timeline_service.TimelineRangeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=body, media_type="application/json")
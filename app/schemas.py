@@ -1,8 +1,10 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime, date
-from typing import Optional
+from typing import Dict, Optional, List, Literal
+from .models import DEFAULT_MACHINE_ID
 
 class StateResponse(BaseModel):
+    machine_id: str = DEFAULT_MACHINE_ID
     state: str
     is_running: bool
     current_cycle: int
@@ -16,6 +18,7 @@ class CycleSchema(BaseModel):
     runtime_sec: int
 
 class SummarySchema(BaseModel):
+    machine_id: str = DEFAULT_MACHINE_ID
     date: date
     total_cycles: int
     total_runtime_sec: int
@@ -30,6 +33,7 @@ class DowntimeStopRequest(BaseModel):
 
 class DowntimeLogSchema(BaseModel):
     id: int
+    machine_id: str = DEFAULT_MACHINE_ID
     start_time: datetime
     end_time: Optional[datetime]
     downtime_reason: str
@@ -42,4 +46,123 @@ class DowntimeLogSchema(BaseModel):
 
 class ActiveDowntimeResponse(BaseModel):
     is_active: bool
-    current_downtime: Optional[DowntimeLogSchema]
\ No newline at end of file
+    current_downtime: Optional[DowntimeLogSchema]
+
+class MachineSummarySchema(BaseModel):
+    machine_id: str
+    days: int
+    total_cycles: int
+    total_runtime_sec: int
+    total_downtime_sec: int
+    availability: float = 0.0
+
+class FleetSummaryResponse(BaseModel):
+    start_date: date
+    end_date: date
+    machine_count: int
+    total_cycles: int
+    total_runtime_sec: int
+    total_downtime_sec: int
+    availability: float = 0.0
+    machines: List[MachineSummarySchema]
+
+class MachineReasonSchema(BaseModel):
+    machine_id: str
+    downtime_reason: str
+    frequency: int
+    total_duration_sec: int
+
+class DetectionEvent(BaseModel):
+    timestamp: datetime
+    spark_detected: bool
+    confidence: float = 0.0
+
+class TransitionEvent(BaseModel):
+    timestamp: datetime
+    state: Literal["RUN", "STOP"]
+
+class IngestBatch(BaseModel):
+    machine_id: str = Field(..., min_length=1, max_length=64)
+    node_id: Optional[str] = Field(None, max_length=64)
+    detections: List[DetectionEvent] = []
+    transitions: List[TransitionEvent] = []
+
+class IngestResult(BaseModel):
+    machine_id: str
+    accepted: int
+    skipped: int
+    state: str
+    last_event_time: Optional[datetime]
+
+class IngestMachineSchema(BaseModel):
+    machine_id: str
+    node_id: Optional[str]
+    state: str
+    current_cycle: int
+    today_runtime_sec: int
+    last_event_time: Optional[datetime]
+    updated_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+class ShadowStatsSchema(BaseModel):
+    candidate_path: Optional[str]
+    since: float
+    frames: int
+    both_on: int
+    both_off: int
+    production_only: int
+    candidate_only: int
+    dropped: int
+    production_cycles: int
+    candidate_cycles: int
+    production_matched: int
+    candidate_matched: int
+    frame_agreement: Optional[float]
+    cycle_recall: Optional[float]
+    cycle_precision: Optional[float]
+
+class ShadowStatusResponse(BaseModel):
+    production_model: Optional[str]
+    candidate_model: Optional[str]
+    candidate_loaded: bool
+    sample_every: int
+    stats: ShadowStatsSchema
+
+class VisionStageHealth(BaseModel):
+    name: str
+    running: bool
+    last_beat_age_sec: Optional[float]
+    stall_sec: float
+    restarts: int
+    last_error: Optional[str]
+    last_restart_at: Optional[float]
+    next_start_in_sec: Optional[float]
+
+class SamplerStatus(BaseModel):
+    enabled: bool
+    mode: str  # idle / run / burst
+    interval_sec: float
+    frames: Dict[str, int]  # จำนวนเฟรมที่ประมวลผล แยกตาม mode
+
+class VisionHealthResponse(BaseModel):
+    status: str
+    last_frame_at: Optional[float]
+    last_frame_age_sec: Optional[float]
+    restarts: int
+    stages: List[VisionStageHealth]
+    sampler: SamplerStatus
+
+class TimelineSegment(BaseModel):
+    start: datetime
+    end: datetime
+    state: str  # RUN / STOP / DOWNTIME
+    reason: Optional[str]  # สาเหตุ (เฉพาะ DOWNTIME)
+
+class TimelineResponse(BaseModel):
+    machine_id: str
+    start: datetime
+    end: datetime
+    bucket_sec: Optional[int]
+    segments: List[TimelineSegment]
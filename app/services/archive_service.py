@@ -0,0 +1,452 @@
+"""
+Archive ข้อมูลเก่าของ cycle_log / downtime_log เป็นไฟล์ Parquet (บีบอัด zstd)
+
+โครงสร้างไฟล์ (hive partition):
+    {ARCHIVE_DIR}/{table}/year=YYYY/month=MM/part-<timestamp>.parquet
+
+- เดือนที่ archive แล้วจะถูกลบออกจาก hot table (ถ้าเป็น partition จะ DROP ทั้ง partition)
+  และบันทึกไว้ใน archive_manifest
+- archive เรียงจากเดือนเก่าไปใหม่เท่านั้น -> ข้อมูลใน archive เก่ากว่าทุกแถวใน hot table เสมอ
+  (การอ่านแบบแบ่งหน้าต่อ archive ไว้ท้าย hot table ได้เลย)
+- get_hot_cutoff() บอกว่าข้อมูลก่อนวันไหนต้องไปอ่านจาก archive
+  (cache ไว้ใน process จนกว่าไฟล์ stamp {ARCHIVE_DIR}/{table}/.cutoff จะเปลี่ยน = มีการ archive จาก process ไหนก็ได้)
+- หลาย worker รัน archive พร้อมกันได้: PostgreSQL ล็อกทีละ (ตาราง, เดือน) ด้วย pg_advisory_xact_lock
+  และทุก DB ตรวจจำนวนแถวที่ลบต้องเท่ากับที่เขียนลงไฟล์ ไม่งั้น rollback + ลบไฟล์ทิ้ง
+- การอ่านใช้ pyarrow.dataset + filter (partition pruning ตามปี + row-group stats ของ date)
+"""
+import os
+import tempfile
+from collections import namedtuple
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import select, delete, func, and_, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models import CycleLog, DowntimeLog, ArchiveManifest, DEFAULT_MACHINE_ID
+from ..migrations import partition_name, is_partitioned, add_months
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+# archive เดือนที่ปิดไปแล้วเกิน N เดือน (0 = ปิดการ archive อัตโนมัติ)
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", 0))
+
+ARCHIVED_MODELS = {
+    "cycle_log": CycleLog,
+    "downtime_log": DowntimeLog,
+}
+
+ReasonTotal = namedtuple("ReasonTotal", ["downtime_reason", "frequency", "total_duration_sec"])
+MachineReasonTotal = namedtuple("MachineReasonTotal", ["machine_id", "downtime_reason", "frequency", "total_duration_sec"])
+
+
+class ArchiveOrderError(ValueError):
+    pass
+
+
+# cutoff ถูกอ่านทุก request ของข้อมูลย้อนหลัง -> cache ไว้ (table -> (cutoff, stamp))
+_cutoff_cache = {}
+
+
+def arrow_schema(table_name: str):
+    import pyarrow as pa
+    if table_name == "cycle_log":
+        return pa.schema([
+            ("id", pa.int64()),
+            ("machine_id", pa.string()),
+            ("date", pa.date32()),
+            ("cycle_no", pa.int32()),
+            ("start_time", pa.timestamp("us")),
+            ("stop_time", pa.timestamp("us")),
+            ("runtime_sec", pa.int32()),
+        ])
+    return pa.schema([
+        ("id", pa.int64()),
+        ("machine_id", pa.string()),
+        ("start_time", pa.timestamp("us", tz="UTC")),
+        ("end_time", pa.timestamp("us", tz="UTC")),
+        ("downtime_reason", pa.string()),
+        ("duration_sec", pa.int32()),
+        ("date", pa.date32()),
+        ("is_active", pa.bool_()),
+    ])
+
+
+def _partition_schema():
+    import pyarrow as pa
+    return pa.schema([("year", pa.int16()), ("month", pa.int8())])
+
+
+def _partitioning():
+    import pyarrow.dataset as ds
+    return ds.partitioning(_partition_schema(), flavor="hive")
+
+
+def machine_filter(machine_id: str):
+    """
+    เงื่อนไขเลือกเครื่อง (pyarrow expression)
+    ไฟล์ที่ archive ไว้ก่อนมีคอลัมน์ machine_id อ่านได้เป็น null = ข้อมูลของ DEFAULT_MACHINE_ID
+    """
+    import pyarrow.dataset as ds
+
+    expr = ds.field("machine_id") == machine_id
+    if machine_id == DEFAULT_MACHINE_ID:
+        expr = expr | ~ds.field("machine_id").is_valid()
+    return expr
+
+
+def _fill_machine_id(data):
+    """แทน machine_id ที่เป็น null (archive รุ่นเก่า) ด้วย DEFAULT_MACHINE_ID ใช้ได้ทั้ง Table / RecordBatch"""
+    import pyarrow.compute as pc
+
+    index = data.schema.get_field_index("machine_id")
+    if index < 0 or data.column(index).null_count == 0:
+        return data
+    return data.set_column(index, "machine_id", pc.fill_null(data.column(index), DEFAULT_MACHINE_ID))
+
+
+# --- READ SIDE ---
+def _stamp_path(table_name: str) -> str:
+    return os.path.join(ARCHIVE_DIR, table_name, ".cutoff")
+
+
+def _read_stamp(table_name: str):
+    try:
+        st = os.stat(_stamp_path(table_name))
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns
+
+
+def _bump_stamp(table_name: str):
+    """แทนไฟล์ stamp ด้วยไฟล์ใหม่ (inode ใหม่) -> ทุก process โหลด cutoff ใหม่"""
+    folder = os.path.dirname(_stamp_path(table_name))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".stamp-")
+    os.close(fd)
+    os.replace(tmp, _stamp_path(table_name))
+
+
+def _cached_cutoff(table_name: str, stamp):
+    cached = _cutoff_cache.get(table_name)
+    if cached and cached[1] == stamp:
+        return cached
+    return None
+
+
+def _store_cutoff(table_name: str, last_month: Optional[date], stamp) -> Optional[date]:
+    cutoff = add_months(last_month, 1) if last_month else None
+    _cutoff_cache[table_name] = (cutoff, stamp)
+    return cutoff
+
+
+def _last_archived_month_stmt(table_name: str):
+    return select(func.max(ArchiveManifest.month)).where(ArchiveManifest.table_name == table_name)
+
+
+def get_hot_cutoff(db: Session, table_name: str) -> Optional[date]:
+    """
+    วันแรกที่ข้อมูลยังอยู่ใน hot table (ก่อนหน้านี้อยู่ใน archive)
+    None = ยังไม่เคย archive เลย
+    """
+    stamp = _read_stamp(table_name)
+    cached = _cached_cutoff(table_name, stamp)
+    if cached:
+        return cached[0]
+    return _store_cutoff(table_name, db.execute(_last_archived_month_stmt(table_name)).scalar(), stamp)
+
+
+async def get_hot_cutoff_async(db: AsyncSession, table_name: str) -> Optional[date]:
+    """get_hot_cutoff() สำหรับ AsyncSession"""
+    stamp = _read_stamp(table_name)
+    cached = _cached_cutoff(table_name, stamp)
+    if cached:
+        return cached[0]
+    return _store_cutoff(table_name, (await db.execute(_last_archived_month_stmt(table_name))).scalar(), stamp)
+
+
+def _archive_dataset(table_name: str, start_date: Optional[date], end_date: Optional[date], extra_filter=None):
+    """
+    (dataset, filter expression) สำหรับช่วงวันที่ที่ต้องการ / None ถ้ายังไม่มี archive
+    """
+    import pyarrow.dataset as ds
+
+    base = os.path.join(ARCHIVE_DIR, table_name)
+    if not os.path.isdir(base):
+        return None
+
+    # ระบุ schema เอง: ไฟล์รุ่นเก่าที่ไม่มีบางคอลัมน์ (เช่น machine_id) จะอ่านคอลัมน์นั้นได้เป็น null
+    schema = arrow_schema(table_name)
+    for field in _partition_schema():
+        schema = schema.append(field)
+    dataset = ds.dataset(base, format="parquet", partitioning=_partitioning(), schema=schema)
+    expr = ds.field("id").is_valid()
+    if start_date:
+        expr = expr & (ds.field("year") >= start_date.year) & (ds.field("date") >= start_date)
+    if end_date:
+        expr = expr & (ds.field("year") <= end_date.year) & (ds.field("date") <= end_date)
+    if extra_filter is not None:
+        expr = expr & extra_filter
+    return dataset, expr
+
+
+def read_archive(table_name: str, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                 extra_filter=None, columns: Optional[List[str]] = None):
+    """
+    อ่าน archive เป็น pyarrow.Table (เฉพาะช่วงวันที่ / filter ที่ระบุ)
+    """
+    schema = arrow_schema(table_name)
+    columns = columns or schema.names
+    scan = _archive_dataset(table_name, start_date, end_date, extra_filter)
+    if scan is None:
+        return schema.empty_table().select(columns)
+    dataset, expr = scan
+    return _fill_machine_id(dataset.to_table(columns=columns, filter=expr))
+
+
+def iter_archive_batches(table_name: str, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                         batch_size: int = 5000, extra_filter=None):
+    """
+    อ่าน archive ทีละ RecordBatch (ไม่โหลดทั้งช่วงเข้า memory) สำหรับ export
+    """
+    scan = _archive_dataset(table_name, start_date, end_date, extra_filter)
+    if scan is None:
+        return
+    dataset, expr = scan
+    columns = arrow_schema(table_name).names
+    for batch in dataset.to_batches(columns=columns, filter=expr, batch_size=batch_size):
+        if batch.num_rows:
+            yield _fill_machine_id(batch)
+
+
+def seek_filter(table_name: str, cursor, descending: bool = False):
+    """
+    เงื่อนไข keyset (start_time, id) แบบเดียวกับ pagination.seek_condition แต่เป็น pyarrow expression
+    cursor จาก hot table ของ SQLite ไม่มี timezone -> ถ้าคอลัมน์ใน archive เป็น UTC ให้ถือว่า cursor เป็น UTC
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    start_time, row_id = cursor
+    if arrow_schema(table_name).field("start_time").type.tz:
+        if start_time.tzinfo is None:
+            start_time = start_time.replace(tzinfo=timezone.utc)
+        start_time = pa.scalar(start_time.astimezone(timezone.utc), type=pa.timestamp("us", tz="UTC"))
+    t, i = ds.field("start_time"), ds.field("id")
+    if descending:
+        return (t < start_time) | ((t == start_time) & (i < row_id))
+    return (t > start_time) | ((t == start_time) & (i > row_id))
+
+
+def _archived_months(table_name: str, start_date: Optional[date], end_date: Optional[date],
+                     descending: bool = False) -> List[date]:
+    """
+    วันแรกของเดือนที่มีไฟล์ใน archive (ตามชื่อโฟลเดอร์ year=/month=) เฉพาะที่ทับช่วงวันที่
+    """
+    base = os.path.join(ARCHIVE_DIR, table_name)
+    if not os.path.isdir(base):
+        return []
+    months = []
+    for year_dir in os.listdir(base):
+        if not year_dir.startswith("year="):
+            continue
+        for month_dir in os.listdir(os.path.join(base, year_dir)):
+            if month_dir.startswith("month="):
+                months.append(date(int(year_dir[5:]), int(month_dir[6:]), 1))
+    if start_date:
+        months = [m for m in months if add_months(m, 1) > start_date]
+    if end_date:
+        months = [m for m in months if m <= end_date]
+    return sorted(months, reverse=descending)
+
+
+def load_rows(table_name: str, start_date: Optional[date] = None, end_date: Optional[date] = None,
+              descending: bool = False, limit: Optional[int] = None, extra_filter=None) -> list:
+    """
+    อ่าน archive แล้วคืนเป็น ORM object (transient) เรียงตาม (start_time, id)
+    ใช้แทนผล query จาก hot table ได้เลย
+    อ่านทีละเดือน (partition) ตามลำดับที่ต้องการ แล้วหยุดเมื่อได้ครบ limit แถว
+    -> หน้าลึกๆ ไม่ต้องอ่าน / sort ทั้ง archive
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    order = "descending" if descending else "ascending"
+    tables = []
+    found = 0
+    for month in _archived_months(table_name, start_date, end_date, descending):
+        partition = (ds.field("year") == month.year) & (ds.field("month") == month.month)
+        if extra_filter is not None:
+            partition = partition & extra_filter
+        table = read_archive(table_name, start_date, end_date, extra_filter=partition)
+        if not table.num_rows:
+            continue
+        # partition แบ่งตาม date (วันที่ local) -> เดือนไม่ทับกันตาม start_time เรียงแค่ภายในเดือนพอ
+        table = table.sort_by([("start_time", order), ("id", order)])
+        if limit is not None:
+            table = table.slice(0, limit - found)
+        tables.append(table)
+        found += table.num_rows
+        if limit is not None and found >= limit:
+            break
+    if not tables:
+        return []
+    model = ARCHIVED_MODELS[table_name]
+    return [model(**row) for row in pa.concat_tables(tables).to_pylist()]
+
+
+def downtime_reason_totals(start_date: date, end_date: date, machine_id: Optional[str] = None,
+                           by_machine: bool = False) -> list:
+    """
+    จำนวนครั้ง / เวลารวม ของ downtime แต่ละสาเหตุ จาก archive
+    machine_id: เฉพาะเครื่องนั้น (None = ทุกเครื่อง)
+    by_machine: แยกตามเครื่อง -> คืนค่าเป็น MachineReasonTotal
+    """
+    import pyarrow.dataset as ds
+
+    expr = (ds.field("is_active") == False) & ds.field("duration_sec").is_valid()
+    if machine_id is not None:
+        expr = expr & machine_filter(machine_id)
+    table = read_archive(
+        "downtime_log", start_date, end_date,
+        extra_filter=expr,
+        columns=["id", "machine_id", "downtime_reason", "duration_sec"]
+    )
+    if table.num_rows == 0:
+        return []
+    keys = ["machine_id", "downtime_reason"] if by_machine else ["downtime_reason"]
+    grouped = table.group_by(keys).aggregate([("id", "count"), ("duration_sec", "sum")])
+    if by_machine:
+        return [
+            MachineReasonTotal(row["machine_id"], row["downtime_reason"], row["id_count"], row["duration_sec_sum"])
+            for row in grouped.to_pylist()
+        ]
+    return [
+        ReasonTotal(row["downtime_reason"], row["id_count"], row["duration_sec_sum"])
+        for row in grouped.to_pylist()
+    ]
+
+
+def merge_reason_totals(*sources) -> List[ReasonTotal]:
+    """
+    รวมผลรายสาเหตุจากหลายแหล่ง (hot query + archive) แล้วเรียงตามเวลารวมมาก -> น้อย
+    """
+    merged = {}
+    for rows in sources:
+        for row in rows:
+            freq, total = merged.get(row.downtime_reason, (0, 0))
+            merged[row.downtime_reason] = (freq + row.frequency, total + (row.total_duration_sec or 0))
+    totals = [ReasonTotal(reason, freq, total) for reason, (freq, total) in merged.items()]
+    return sorted(totals, key=lambda r: r.total_duration_sec, reverse=True)
+
+
+# --- WRITE SIDE ---
+def archive_month(db: Session, table_name: str, month_start: date) -> int:
+    """
+    ย้ายข้อมูล 1 เดือนของตารางไปเป็นไฟล์ Parquet แล้วลบออกจาก hot table
+    คืนค่าจำนวนแถวที่ archive
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    model = ARCHIVED_MODELS[table_name]
+    table = model.__table__
+    month_end = add_months(month_start, 1)
+    in_month = and_(table.c.date >= month_start, table.c.date < month_end)
+
+    if db.get_bind().dialect.name == "postgresql":
+        # worker อื่นที่ archive เดือนเดียวกันอยู่ต้องรอจน commit แล้วจะอ่านได้ 0 แถว (ล็อกปล่อยตอนจบ transaction)
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+                   {"key": f"archive:{table_name}:{month_start:%Y-%m}"})
+
+    older = db.query(func.min(model.date)).filter(model.date < month_start).scalar()
+    if older is not None:
+        raise ArchiveOrderError(f"{table_name} still has rows from {older:%Y-%m} in the hot table, "
+                                f"archive that month before {month_start:%Y-%m}")
+
+    if table_name == "downtime_log":
+        still_active = db.query(func.count(DowntimeLog.id)).filter(
+            and_(DowntimeLog.date >= month_start, DowntimeLog.date < month_end, DowntimeLog.is_active == True)
+        ).scalar()
+        if still_active:
+            print(f"⚠️ Skip archiving {table_name} {month_start:%Y-%m}: {still_active} downtime still active")
+            return 0
+
+    rows = db.execute(select(table).where(in_month).order_by(table.c.start_time)).mappings().all()
+    if not rows:
+        return 0
+
+    schema = arrow_schema(table_name)
+    arrow_table = pa.Table.from_pylist([dict(r) for r in rows], schema=schema)
+
+    folder = os.path.join(ARCHIVE_DIR, table_name, f"year={month_start.year}", f"month={month_start.month:02d}")
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"part-{datetime.now():%Y%m%d%H%M%S%f}.parquet")
+    # ไฟล์ที่ขึ้นต้นด้วย "." จะถูก pyarrow.dataset ข้ามไป (กันอ่านไฟล์ที่เขียนไม่เสร็จ)
+    tmp_path = os.path.join(folder, "." + os.path.basename(path) + ".tmp")
+    pq.write_table(arrow_table, tmp_path, compression="zstd", row_group_size=64 * 1024)
+    os.replace(tmp_path, path)
+
+    try:
+        if pq.read_metadata(path).num_rows != len(rows):
+            raise RuntimeError(f"Row count mismatch while archiving {path}")
+
+        # ทั้งเดือนอยู่ใน partition ของมันเอง -> DROP ได้ทันที ไม่ต้อง DELETE ทีละแถว
+        conn = db.connection()
+        partition = partition_name(table_name, month_start)
+        drop_partition = False
+        if is_partitioned(conn, table_name) and conn.dialect.has_table(conn, partition):
+            in_partition = db.execute(text(f"SELECT count(*) FROM {partition}")).scalar()
+            drop_partition = in_partition == len(rows)
+        if drop_partition:
+            db.execute(text(f"DROP TABLE {partition}"))
+        else:
+            deleted = db.execute(delete(table).where(in_month)).rowcount
+            if deleted != len(rows):
+                # แถวเปลี่ยนระหว่างเขียนไฟล์ (เช่น process อื่น archive เดือนนี้ไปแล้ว) -> ไม่เอาไฟล์นี้
+                raise RuntimeError(f"{table_name} {month_start:%Y-%m}: deleted {deleted} row(s), "
+                                   f"archived {len(rows)}")
+
+        manifest = db.get(ArchiveManifest, (table_name, month_start))
+        if manifest:
+            manifest.row_count += len(rows)
+        else:
+            db.add(ArchiveManifest(table_name=table_name, month=month_start, row_count=len(rows),
+                                   path=os.path.dirname(path)))
+        db.commit()
+    except Exception:
+        db.rollback()
+        os.remove(path)
+        raise
+
+    _bump_stamp(table_name)
+    return len(rows)
+
+
+def archive_closed_months(db: Session, after_months: int = ARCHIVE_AFTER_MONTHS) -> int:
+    """
+    Archive ทุกเดือนที่ปิดไปแล้วเกิน after_months เดือน (ทั้ง cycle_log และ downtime_log)
+    คืนค่าจำนวนแถวที่ archive ทั้งหมด
+    """
+    if after_months <= 0:
+        return 0
+
+    horizon = add_months(date.today().replace(day=1), -after_months)
+    archived = 0
+    for table_name, model in ARCHIVED_MODELS.items():
+        first_date = db.query(func.min(model.date)).filter(model.date < horizon).scalar()
+        if first_date is None:
+            continue
+        month = first_date.replace(day=1)
+        while month < horizon:
+            try:
+                count = archive_month(db, table_name, month)
+            except ArchiveOrderError:
+                # เดือนก่อนหน้าถูกข้าม (downtime ยัง active) -> เดือนถัดไปต้องรอด้วย
+                print(f"⚠️ Stop archiving {table_name} at {month:%Y-%m}: an earlier month is still in the hot table")
+                break
+            if count:
+                print(f"📦 Archived {table_name} {month:%Y-%m}: {count} row(s)")
+            archived += count
+            month = add_months(month, 1)
+    return archived
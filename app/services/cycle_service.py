@@ -1,14 +1,48 @@
-from sqlalchemy.orm import Session
-from datetime import date
-from typing import List
-from ..models import CycleLog
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from ..models import CycleLog, DEFAULT_MACHINE_ID
+from . import archive_service
+from .pagination import seek_condition, next_cursor
 
-def get_cycles_by_date(db: Session, target_date: date) -> List[CycleLog]:
+async def get_cycles_page(db: AsyncSession, target_date: date,
+                          cursor: Optional[Tuple[datetime, int]] = None,
+                          limit: Optional[int] = None,
+                          machine_id: str = DEFAULT_MACHINE_ID) -> Tuple[List[CycleLog], Optional[str]]:
+    """
+    ดึง Cycle ของเครื่อง ในวันที่ระบุ ทีละหน้า (keyset บน start_time, id)
+    คืนค่า (รายการ, cursor ของหน้าถัดไป หรือ None ถ้าหมดแล้ว)
+    ถ้าวันที่อยู่ก่อน hot cutoff จะอ่านจาก Parquet archive ด้วย
+    """
+    fetch = limit + 1 if limit is not None else None
+
+    stmt = select(CycleLog).where(CycleLog.machine_id == machine_id, CycleLog.date == target_date)
+    if cursor:
+        stmt = stmt.where(seek_condition(CycleLog.start_time, CycleLog.id, cursor))
+    stmt = stmt.order_by(CycleLog.start_time.asc(), CycleLog.id.asc()).limit(fetch)
+    cycles = list((await db.scalars(stmt)).all())
+
+    cutoff = await archive_service.get_hot_cutoff_async(db, "cycle_log")
+    if cutoff and target_date < cutoff:
+        archive_filter = archive_service.machine_filter(machine_id)
+        if cursor:
+            archive_filter = archive_filter & archive_service.seek_filter("cycle_log", cursor)
+        # อ่านไฟล์ Parquet เป็นงาน blocking -> ย้ายไป threadpool
+        archived = await run_in_threadpool(
+            archive_service.load_rows, "cycle_log", target_date, target_date,
+            limit=fetch, extra_filter=archive_filter
+        )
+        cycles = sorted(archived + cycles, key=lambda c: (c.start_time, c.id))[:fetch]
+
+    return cycles[:limit], next_cursor(cycles, limit)
+
+async def get_cycles_by_date(db: AsyncSession, target_date: date,
+                             machine_id: str = DEFAULT_MACHINE_ID) -> List[CycleLog]:
     """
     ดึงข้อมูล Cycle ทั้งหมดของวันที่ระบุ
     เรียงตามเวลาเริ่ม (start_time)
     """
-    return db.query(CycleLog)\
-             .filter(CycleLog.date == target_date)\
-             .order_by(CycleLog.start_time.asc())\
-             .all()
\ No newline at end of file
+    cycles, _ = await get_cycles_page(db, target_date, machine_id=machine_id)
+    return cycles
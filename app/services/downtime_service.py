@@ -0,0 +1,50 @@
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+from ..models import DowntimeLog
+from . import archive_service
+from .pagination import seek_condition, next_cursor
+
+async def get_history_page(db: AsyncSession,
+                           start_date: Optional[date] = None,
+                           end_date: Optional[date] = None,
+                           cursor: Optional[Tuple[datetime, int]] = None,
+                           limit: int = 100,
+                           machine_id: Optional[str] = None) -> Tuple[List[DowntimeLog], Optional[str]]:
+    """
+    ประวัติ downtime ใหม่ -> เก่า ทีละหน้า (keyset บน start_time, id)
+    machine_id: เฉพาะเครื่องนั้น (None = ทุกเครื่อง)
+    คืนค่า (รายการ, cursor ของหน้าถัดไป หรือ None ถ้าหมดแล้ว)
+    """
+    stmt = select(DowntimeLog)
+    if machine_id is not None:
+        stmt = stmt.where(DowntimeLog.machine_id == machine_id)
+    if start_date:
+        stmt = stmt.where(DowntimeLog.date >= start_date)
+    if end_date:
+        stmt = stmt.where(DowntimeLog.date <= end_date)
+    if cursor:
+        stmt = stmt.where(seek_condition(DowntimeLog.start_time, DowntimeLog.id, cursor, descending=True))
+    stmt = stmt.order_by(DowntimeLog.start_time.desc(), DowntimeLog.id.desc()).limit(limit + 1)
+    downtimes = list((await db.scalars(stmt)).all())
+
+    # ส่วนที่เก่ากว่า hot cutoff อยู่ใน archive (เก่ากว่าทุกแถวใน hot table) -> ต่อท้ายได้เลย
+    cutoff = await archive_service.get_hot_cutoff_async(db, "downtime_log")
+    if len(downtimes) <= limit and cutoff and (start_date is None or start_date < cutoff):
+        archive_end = cutoff - timedelta(days=1)
+        if end_date:
+            archive_end = min(end_date, archive_end)
+        archive_filter = None
+        if machine_id is not None:
+            archive_filter = archive_service.machine_filter(machine_id)
+        if cursor:
+            seek = archive_service.seek_filter("downtime_log", cursor, descending=True)
+            archive_filter = seek if archive_filter is None else archive_filter & seek
+        downtimes += await run_in_threadpool(
+            archive_service.load_rows, "downtime_log", start_date, archive_end,
+            descending=True, limit=limit + 1 - len(downtimes), extra_filter=archive_filter
+        )
+
+    return downtimes[:limit], next_cursor(downtimes, limit)
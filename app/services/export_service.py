@@ -0,0 +1,119 @@
+"""
+Export ข้อมูลดิบ (cycle_log / downtime_log) เป็น CSV หรือ Parquet แบบ streaming
+
+- archive (Parquet) อ่านทีละ RecordBatch, hot table อ่านผ่าน server-side cursor (yield_per)
+- ส่งออกทีละ batch ผ่าน generator -> memory คงที่ไม่ว่าจะ export 1 วัน หรือ 5 ปี
+"""
+import csv
+import io
+from datetime import date, timedelta
+from typing import Iterator, Optional
+
+from sqlalchemy import select, and_
+
+from ..database import SessionLocal
+from . import archive_service
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXPORT_BATCH_SIZE = 5000
+
+
+def _iter_batches(table_name: str, start_date: date, end_date: date, machine_id: Optional[str] = None,
+                  batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    ไล่ข้อมูลทั้งช่วงเป็น pyarrow.RecordBatch: ส่วนที่อยู่ใน archive ก่อน แล้วต่อด้วย hot table
+    machine_id: เฉพาะเครื่องนั้น (None = ทุกเครื่อง)
+    เปิด session ของตัวเอง เพราะ generator ทำงานหลังจาก request handler คืนค่าไปแล้ว
+    """
+    import pyarrow as pa
+
+    schema = archive_service.arrow_schema(table_name)
+    table = archive_service.ARCHIVED_MODELS[table_name].__table__
+
+    db = SessionLocal()
+    try:
+        cutoff = archive_service.get_hot_cutoff(db, table_name)
+        if cutoff and start_date < cutoff:
+            archive_end = min(end_date, cutoff - timedelta(days=1))
+            yield from archive_service.iter_archive_batches(
+                table_name, start_date, archive_end, batch_size,
+                extra_filter=archive_service.machine_filter(machine_id) if machine_id else None
+            )
+
+        condition = and_(table.c.date >= start_date, table.c.date <= end_date)
+        if machine_id:
+            condition = and_(table.c.machine_id == machine_id, condition)
+        result = db.execute(
+            select(table).where(condition)
+            .order_by(table.c.date, table.c.start_time).execution_options(yield_per=batch_size)
+        ).mappings()
+        for rows in result.partitions():
+            yield pa.RecordBatch.from_pylist([dict(r) for r in rows], schema=schema)
+    finally:
+        db.close()
+
+
+def stream_csv(table_name: str, start_date: date, end_date: date,
+               machine_id: Optional[str] = None) -> Iterator[bytes]:
+    columns = archive_service.arrow_schema(table_name).names
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in _iter_batches(table_name, start_date, end_date, machine_id):
+        writer.writerows(zip(*(batch.column(name).to_pylist() for name in columns)))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink:
+    """
+    file-like สำหรับ ParquetWriter: เก็บ bytes ที่ถูกเขียนไว้ชั่วคราวให้ generator ดึงออกไปส่ง
+    (ต้องนับ position เอง เพราะ writer ใช้ tell() คำนวณ offset ใน footer)
+    """
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_parquet(table_name: str, start_date: date, end_date: date,
+                   machine_id: Optional[str] = None) -> Iterator[bytes]:
+    import pyarrow.parquet as pq
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, archive_service.arrow_schema(table_name), compression="zstd")
+    try:
+        for batch in _iter_batches(table_name, start_date, end_date, machine_id):
+            writer.write_batch(batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,137 @@
+"""
+ข้อมูลระดับ fleet (ทุกเครื่องพร้อมกัน)
+แต่ละฟังก์ชันใช้ query เดียว (GROUP BY machine_id) ไม่วนถามทีละเครื่อง
+"""
+from datetime import date, timedelta
+from typing import List
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import DailySummary, DowntimeLog, IngestCheckpoint
+from ..config import SHIFT_SECONDS, calc_availability
+from . import archive_service
+from .live_status import live_status, is_stale_run
+
+
+async def local_state(db: AsyncSession) -> dict:
+    """สถานะของเครื่องที่ต่อกล้องกับ server นี้ (live_status: ยอดของวันนี้ ตรงกันทุก worker)"""
+    from ..state_machine import machine_brain
+    return live_status.state_view(await live_status.get(db, machine_brain.machine_id))
+
+
+def checkpoint_state(checkpoint: IngestCheckpoint) -> dict:
+    """
+    สถานะของเครื่องจาก edge node (จาก ingest checkpoint)
+    ยอด cycle / runtime ใน checkpoint เป็นของวันที่ของ event ล่าสุด -> ข้ามวันแล้วยังไม่มี event = 0
+    """
+    state = checkpoint.state or "STOP"
+    if is_stale_run(state, checkpoint.last_event_time):
+        state = "STOP"
+    today = checkpoint.last_event_time is not None and checkpoint.last_event_time.date() == date.today()
+    return {
+        "machine_id": checkpoint.machine_id,
+        "state": state,
+        "is_running": state == "RUN",
+        "current_cycle": (checkpoint.current_cycle or 0) if today else 0,
+        "today_runtime_sec": (checkpoint.today_runtime_sec or 0) if today else 0,
+        "last_updated": checkpoint.last_event_time or checkpoint.updated_at
+    }
+
+
+async def get_fleet_states(db: AsyncSession) -> List[dict]:
+    from ..state_machine import machine_brain
+    checkpoints = (await db.scalars(
+        select(IngestCheckpoint).where(IngestCheckpoint.machine_id != machine_brain.machine_id)
+        .order_by(IngestCheckpoint.machine_id)
+    )).all()
+    return [await local_state(db)] + [checkpoint_state(c) for c in checkpoints]
+
+
+async def get_fleet_summary(db: AsyncSession, start_date: date, end_date: date) -> dict:
+    """
+    ยอดรวมของแต่ละเครื่อง + ทั้ง fleet ในช่วงวันที่ (จาก daily_summary, เฉพาะ cycle ที่จบแล้ว)
+    Availability = runtime / (จำนวนวันที่มีข้อมูล x ความยาวกะ)
+    """
+    rows = (await db.execute(
+        select(
+            DailySummary.machine_id,
+            func.count(DailySummary.date).label("days"),
+            func.coalesce(func.sum(DailySummary.total_cycles), 0).label("total_cycles"),
+            func.coalesce(func.sum(DailySummary.total_runtime_sec), 0).label("total_runtime_sec"),
+            func.coalesce(func.sum(DailySummary.total_downtime_sec), 0).label("total_downtime_sec")
+        ).where(
+            DailySummary.date.between(start_date, end_date)
+        ).group_by(DailySummary.machine_id).order_by(DailySummary.machine_id)
+    )).all()
+
+    machines = [
+        {
+            "machine_id": row.machine_id,
+            "days": row.days,
+            "total_cycles": row.total_cycles,
+            "total_runtime_sec": row.total_runtime_sec,
+            "total_downtime_sec": row.total_downtime_sec,
+            "availability": calc_availability(row.total_runtime_sec, SHIFT_SECONDS * row.days),
+        }
+        for row in rows
+    ]
+    machine_days = sum(m["days"] for m in machines)
+    total_runtime = sum(m["total_runtime_sec"] for m in machines)
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "machine_count": len(machines),
+        "total_cycles": sum(m["total_cycles"] for m in machines),
+        "total_runtime_sec": total_runtime,
+        "total_downtime_sec": sum(m["total_downtime_sec"] for m in machines),
+        "availability": calc_availability(total_runtime, SHIFT_SECONDS * machine_days) if machine_days else 0.0,
+        "machines": machines,
+    }
+
+
+async def get_active_downtimes(db: AsyncSession) -> List[DowntimeLog]:
+    """downtime ที่ active อยู่ของทุกเครื่อง"""
+    return (await db.scalars(
+        select(DowntimeLog).where(DowntimeLog.is_active == True).order_by(DowntimeLog.machine_id)
+    )).all()
+
+
+async def get_downtime_by_reason(db: AsyncSession, start_date: date, end_date: date) -> List[dict]:
+    """
+    จำนวนครั้ง / เวลารวม ของ downtime แยกตามเครื่องและสาเหตุ (รวมส่วนที่อยู่ใน archive)
+    """
+    rows = (await db.execute(
+        select(
+            DowntimeLog.machine_id,
+            DowntimeLog.downtime_reason,
+            func.count(DowntimeLog.id).label("frequency"),
+            func.coalesce(func.sum(DowntimeLog.duration_sec), 0).label("total_duration_sec")
+        ).where(
+            and_(
+                DowntimeLog.date.between(start_date, end_date),
+                DowntimeLog.is_active == False,
+                DowntimeLog.duration_sec.isnot(None)
+            )
+        ).group_by(DowntimeLog.machine_id, DowntimeLog.downtime_reason)
+    )).all()
+
+    cutoff = await archive_service.get_hot_cutoff_async(db, "downtime_log")
+    if cutoff and start_date < cutoff:
+        rows = list(rows) + await run_in_threadpool(
+            archive_service.downtime_reason_totals, start_date, min(end_date, cutoff - timedelta(days=1)),
+            by_machine=True
+        )
+
+    merged = {}
+    for row in rows:
+        key = (row.machine_id, row.downtime_reason)
+        frequency, total = merged.get(key, (0, 0))
+        merged[key] = (frequency + row.frequency, total + (row.total_duration_sec or 0))
+    return [
+        {"machine_id": machine_id, "downtime_reason": reason, "frequency": frequency, "total_duration_sec": total}
+        for (machine_id, reason), (frequency, total) in sorted(
+            merged.items(), key=lambda item: (item[0][0], -item[1][1])
+        )
+    ]
@@ -0,0 +1,211 @@
+"""
+รับผล detection / state transition ที่ edge node คำนวณมาแล้ว แล้วป้อนเข้า MachineStateMachine ของแต่ละเครื่อง
+
+- 1 batch = 1 transaction: ผลของ state machine (CycleLog, DailySummary, MachineState)
+  ถูก commit พร้อม checkpoint (ingest_checkpoint) เสมอ
+- ลำดับ: event ใน batch ถูกเรียงตาม timestamp ก่อนป้อน
+- กันซ้ำ: checkpoint เก็บ watermark (last_event_time) event ที่ไม่ใหม่กว่านี้จะถูกข้าม
+  -> edge node ส่ง batch เดิมซ้ำ (retry) ได้อย่างปลอดภัย
+- state machine ถูกสร้างใหม่จาก checkpoint ทุก batch และล็อกแถว checkpoint (FOR UPDATE)
+  -> gunicorn หลาย worker รับ batch ของเครื่องเดียวกันได้โดยสถานะไม่แตกกัน
+- edge node ที่หยุดส่งระหว่าง RUN: ตอนอ่านแสดงเป็น STOP หลัง INGEST_STALE_RUN_SEC
+  และ maintenance ปิด run นั้นที่เวลา event สุดท้าย (close_stale_runs)
+  node ที่ส่งแต่ transition ให้ส่ง state ปัจจุบันซ้ำ (timestamp ใหม่) เป็น heartbeat ระหว่าง run ยาว
+"""
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models import IngestCheckpoint
+from ..schemas import IngestBatch
+from ..state_machine import MachineStateMachine, machine_brain
+from .live_status import live_status, is_stale_run
+from .rollup_service import dialect_insert
+
+# ขนาด batch สูงสุดหลัง decompress (กัน gzip bomb)
+INGEST_MAX_BYTES = int(os.getenv("INGEST_MAX_BYTES", 16 * 1024 * 1024))
+
+# request ของเครื่องเดียวกันใน process เดียวกันทำทีละ batch (SQLite ไม่มี row lock)
+# machine_id -> [lock, จำนวน request ที่ถือ/รออยู่] ลบทิ้งเมื่อไม่มีใครใช้ (ไม่โตตาม machine_id ที่เคยส่งมา)
+_machine_locks = {}
+_machine_locks_guard = threading.Lock()
+
+
+class PayloadTooLarge(ValueError):
+    pass
+
+
+class MachineConflict(ValueError):
+    pass
+
+
+@contextmanager
+def _machine_lock(machine_id: str):
+    with _machine_locks_guard:
+        entry = _machine_locks.setdefault(machine_id, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _machine_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _machine_locks[machine_id]
+
+
+def decode_body(raw: bytes, content_encoding: Optional[str]) -> bytes:
+    """
+    แตก body ตาม Content-Encoding (gzip / deflate / ไม่บีบอัด) โดยจำกัดขนาดผลลัพธ์
+    """
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding == "identity":
+        data = raw
+    elif encoding in ("gzip", "deflate"):
+        wbits = 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS
+        decompressor = zlib.decompressobj(wbits)
+        try:
+            data = decompressor.decompress(raw, INGEST_MAX_BYTES + 1)
+        except zlib.error as e:
+            raise ValueError(f"Invalid {encoding} body: {e}")
+        if decompressor.unconsumed_tail:
+            raise PayloadTooLarge(f"Batch exceeds {INGEST_MAX_BYTES} bytes")
+        if not decompressor.eof:
+            raise ValueError(f"Truncated {encoding} body")
+    else:
+        raise ValueError(f"Unsupported Content-Encoding '{content_encoding}'")
+
+    if len(data) > INGEST_MAX_BYTES:
+        raise PayloadTooLarge(f"Batch exceeds {INGEST_MAX_BYTES} bytes")
+    return data
+
+
+def _local_naive(ts: datetime) -> datetime:
+    # CycleLog / state machine ใช้เวลา local แบบ naive (datetime.now())
+    if ts.tzinfo is not None:
+        return ts.astimezone().replace(tzinfo=None)
+    return ts
+
+
+def _ordered_events(batch: IngestBatch):
+    """
+    รวม detections + transitions เป็นลำดับเดียว เรียงตามเวลา
+    (เวลาเท่ากัน: transition มาก่อน detection)
+    """
+    events = [(_local_naive(t.timestamp), 0, t) for t in batch.transitions]
+    events += [(_local_naive(d.timestamp), 1, d) for d in batch.detections]
+    events.sort(key=lambda e: (e[0], e[1]))
+    return events
+
+
+def _load_checkpoint(db: Session, machine_id: str) -> IngestCheckpoint:
+    insert = dialect_insert(db)
+    db.execute(
+        insert(IngestCheckpoint).values(machine_id=machine_id).on_conflict_do_nothing(
+            index_elements=[IngestCheckpoint.machine_id]
+        )
+    )
+    return db.query(IngestCheckpoint).filter(
+        IngestCheckpoint.machine_id == machine_id
+    ).with_for_update().one()
+
+
+def _restore_machine(checkpoint: IngestCheckpoint) -> MachineStateMachine:
+    machine = MachineStateMachine(checkpoint.machine_id)
+    machine.defer_commits = True
+    machine.current_state = checkpoint.state or "STOP"
+    machine.run_start_time = checkpoint.run_start_time
+    machine.last_spark_time = checkpoint.last_spark_time or 0.0
+    machine.current_cycle_count = checkpoint.current_cycle or 0
+    machine.today_runtime = checkpoint.today_runtime_sec or 0
+    return machine
+
+
+def ingest_batch(db: Session, batch: IngestBatch) -> dict:
+    """
+    ป้อน batch เข้า state machine ของเครื่อง แล้ว commit ผลพร้อม checkpoint ใน transaction เดียว
+    """
+    if batch.machine_id == machine_brain.machine_id:
+        # เครื่องนี้ถูกป้อนจาก vision_loop ของ server เอง
+        raise MachineConflict(f"Machine '{batch.machine_id}' is fed by the local camera")
+
+    with _machine_lock(batch.machine_id):
+        try:
+            checkpoint = _load_checkpoint(db, batch.machine_id)
+            machine = _restore_machine(checkpoint)
+            watermark = checkpoint.last_event_time
+
+            accepted = skipped = 0
+            for ts, _, event in _ordered_events(batch):
+                if watermark is not None and ts <= watermark:
+                    skipped += 1
+                    continue
+                if hasattr(event, "spark_detected"):
+                    machine.update_from_vision(db, event.spark_detected, at=ts)
+                else:
+                    machine.apply_transition(db, event.state, ts)
+                watermark = ts
+                accepted += 1
+
+            checkpoint.node_id = batch.node_id or checkpoint.node_id
+            checkpoint.state = machine.current_state
+            checkpoint.run_start_time = machine.run_start_time
+            checkpoint.last_spark_time = machine.last_spark_time
+            checkpoint.last_event_time = watermark
+            checkpoint.current_cycle = machine.current_cycle_count
+            checkpoint.today_runtime_sec = machine.today_runtime
+            if accepted:
+                live_status.stage_state(db, batch.machine_id, machine.current_state, machine.run_start_time, watermark)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    return {
+        "machine_id": batch.machine_id,
+        "accepted": accepted,
+        "skipped": skipped,
+        "state": machine.current_state,
+        "last_event_time": watermark,
+    }
+
+
+def close_stale_runs(db: Session, now: Optional[datetime] = None) -> List[str]:
+    """
+    ปิด run ของเครื่องจาก edge node ที่ไม่มี event ใหม่เกิน INGEST_STALE_RUN_SEC
+    ที่เวลา event สุดท้าย (last_event_time) -> CycleLog / DailySummary ครบแม้ node จะไม่กลับมา
+    คืน machine_id ที่ถูกปิด
+    """
+    candidates = db.query(IngestCheckpoint.machine_id).filter(
+        IngestCheckpoint.state == "RUN", IngestCheckpoint.machine_id != machine_brain.machine_id
+    ).all()
+    db.rollback()
+
+    closed = []
+    for (machine_id,) in candidates:
+        with _machine_lock(machine_id):
+            try:
+                checkpoint = _load_checkpoint(db, machine_id)
+                # batch ใหม่อาจมาถึงระหว่างนี้ -> ตรวจซ้ำหลังล็อกแถว
+                if not is_stale_run(checkpoint.state, checkpoint.last_event_time, now):
+                    db.rollback()
+                    continue
+                machine = _restore_machine(checkpoint)
+                stop_time = checkpoint.last_event_time
+                machine.apply_transition(db, "STOP", stop_time)
+                checkpoint.state = machine.current_state
+                checkpoint.run_start_time = machine.run_start_time
+                checkpoint.current_cycle = machine.current_cycle_count
+                checkpoint.today_runtime_sec = machine.today_runtime
+                live_status.stage_state(db, machine_id, machine.current_state, machine.run_start_time, stop_time)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        closed.append(machine_id)
+    return closed
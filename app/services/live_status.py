@@ -0,0 +1,276 @@
+"""
+สถานะ "วันนี้" ของแต่ละเครื่องใน memory: จำนวน cycle, runtime, downtime รายสาเหตุ, downtime ที่ active
+ใช้ตอบ endpoint ที่ dashboard poll ถี่ (/state, /summary/today, /downtime/active, /downtime/summary/today)
+โดยไม่ query DB
+
+- ผู้เขียน (state machine, downtime router, ingest) ฝากการเปลี่ยนแปลงไว้กับ session ด้วย stage_*()
+  registry ถูกแก้ใน after_commit เท่านั้น (rollback = ทิ้ง) -> ค่าใน memory ตรงกับที่ commit แล้วเสมอ
+- หลาย worker (gunicorn): หลัง commit ผู้เขียนเปลี่ยนไฟล์ stamp ของเครื่องนั้นใน LIVE_STATUS_DIR
+  worker อื่นเทียบ stamp ด้วย os.stat() ตอนอ่าน ถ้าเปลี่ยน -> โหลดเครื่องนั้นจาก DB ใหม่ (ครั้งเดียวต่อการเปลี่ยน)
+- ข้ามวัน: snapshot ของเมื่อวานถูกแทนด้วยตัวใหม่ที่ยอดเป็น 0 ทั้งก้อน (downtime / run ที่ค้างอยู่ยกไปด้วย)
+  ไม่ต้อง query เพราะการเขียนของวันนี้ทุกครั้งเปลี่ยน stamp อยู่แล้ว
+- เครื่องที่ยังไม่เคยอ่าน / เริ่ม process ใหม่ -> โหลดจาก DB ตอนอ่านครั้งแรก
+  (แก้ DB ตรงๆ นอกแอป เช่น recompute_summaries ของวันนี้ จะเห็นหลัง restart หรือการเขียนครั้งถัดไป)
+"""
+import os
+import tempfile
+import threading
+from datetime import date, datetime
+from typing import Callable, Dict, Optional
+from urllib.parse import quote
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models import DailySummary, DowntimeLog, IngestCheckpoint
+from ..config import calc_availability
+
+LIVE_STATUS_DIR = os.getenv("LIVE_STATUS_DIR", os.path.join(tempfile.gettempdir(), "spark-live-status"))
+
+# edge node ที่เงียบไปนานกว่านี้ (วินาที) ระหว่าง RUN -> แสดงเป็น STOP (run ถูกปิดจริงตอน maintenance)
+INGEST_STALE_RUN_SEC = float(os.getenv("INGEST_STALE_RUN_SEC", 900))
+
+_PENDING_KEY = "live_status_pending"
+
+
+class MachineLive:
+    """snapshot ของเครื่องเดียว (ไม่แก้ในที่ เปลี่ยนเมื่อไหร่สร้างตัวใหม่)"""
+    __slots__ = ("machine_id", "day", "stamp", "known", "total_cycles", "runtime_sec", "downtime_sec",
+                 "downtime_by_reason", "active_downtime", "state", "run_start_time", "last_updated")
+
+    def __init__(self, machine_id: str, day: date, stamp=None, known: bool = True, total_cycles: int = 0,
+                 runtime_sec: int = 0, downtime_sec: int = 0, downtime_by_reason: Optional[Dict[str, int]] = None,
+                 active_downtime: Optional[dict] = None, state: str = "STOP",
+                 run_start_time: Optional[datetime] = None, last_updated: Optional[datetime] = None):
+        self.machine_id = machine_id
+        self.day = day
+        self.stamp = stamp
+        self.known = known
+        self.total_cycles = total_cycles
+        self.runtime_sec = runtime_sec
+        self.downtime_sec = downtime_sec
+        self.downtime_by_reason = downtime_by_reason or {}
+        self.active_downtime = active_downtime
+        self.state = state
+        self.run_start_time = run_start_time
+        self.last_updated = last_updated
+
+    def copy(self, **changes) -> "MachineLive":
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return MachineLive(**values)
+
+    def rolled(self, day: date) -> "MachineLive":
+        """เริ่มวันใหม่: ยอดของวันเป็น 0, สถานะ / downtime ที่ยัง active ยกไป"""
+        return self.copy(day=day, total_cycles=0, runtime_sec=0, downtime_sec=0, downtime_by_reason={})
+
+
+def is_stale_run(state: Optional[str], last_event_time: Optional[datetime], now: Optional[datetime] = None) -> bool:
+    """RUN ของเครื่องจาก edge node ที่ไม่มี event ใหม่เกิน INGEST_STALE_RUN_SEC (last_event_time = local naive)"""
+    if state != "RUN" or last_event_time is None:
+        return False
+    return ((now or datetime.now()) - last_event_time).total_seconds() > INGEST_STALE_RUN_SEC
+
+
+def _downtime_dict(downtime: DowntimeLog) -> dict:
+    # ตาม schemas.DowntimeLogSchema (เก็บเป็น dict ไม่ผูกกับ session)
+    return {
+        "id": downtime.id,
+        "machine_id": downtime.machine_id,
+        "start_time": downtime.start_time,
+        "end_time": downtime.end_time,
+        "downtime_reason": downtime.downtime_reason,
+        "duration_sec": downtime.duration_sec,
+        "date": downtime.date,
+        "is_active": downtime.is_active,
+    }
+
+
+class LiveStatusRegistry:
+    def __init__(self, stamp_dir: str = LIVE_STATUS_DIR):
+        self.stamp_dir = stamp_dir
+        self._machines: Dict[str, MachineLive] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.stamp_dir, exist_ok=True)
+
+    # --- stamp ข้าม process ---
+
+    def _stamp_path(self, machine_id: str) -> str:
+        return os.path.join(self.stamp_dir, quote(machine_id, safe=""))
+
+    def _read_stamp(self, machine_id: str):
+        try:
+            st = os.stat(self._stamp_path(machine_id))
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def _bump_stamp(self, machine_id: str):
+        """แทนไฟล์ stamp ด้วยไฟล์ใหม่ (inode ใหม่) คืน stamp ของไฟล์ที่เขียนเอง"""
+        fd, tmp = tempfile.mkstemp(dir=self.stamp_dir, prefix=".stamp-")
+        try:
+            st = os.fstat(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp, self._stamp_path(machine_id))
+        return st.st_ino, st.st_mtime_ns
+
+    # --- เขียน (ฝากไว้กับ session, ทำจริงหลัง commit) ---
+
+    def _stage(self, db: Session, machine_id: str, change: Callable[[MachineLive], MachineLive]):
+        db.info.setdefault(_PENDING_KEY, []).append((machine_id, change))
+
+    def _apply(self, pending):
+        today = date.today()
+        with self._lock:
+            for machine_id in dict.fromkeys(m for m, _ in pending):
+                stamp = self._bump_stamp(machine_id)
+                live = self._machines.get(machine_id)
+                if live is None:
+                    continue  # ยังไม่เคยโหลดใน process นี้ -> อ่านครั้งแรกโหลดจาก DB (รวมของที่เพิ่ง commit แล้ว)
+                if live.day != today:
+                    live = live.rolled(today)
+                for changed_id, change in pending:
+                    if changed_id == machine_id:
+                        live = change(live)
+                self._machines[machine_id] = live.copy(stamp=stamp, known=True)
+
+    def stage_cycle(self, db: Session, summary: DailySummary):
+        """จบ cycle (state machine): ยอดรวมของวันจาก daily_summary แถวที่เพิ่งอัพเดท"""
+        day, cycles, runtime, downtime = (summary.date, summary.total_cycles, summary.total_runtime_sec,
+                                          summary.total_downtime_sec)
+        self._stage(db, summary.machine_id, lambda live: live.copy(
+            total_cycles=cycles, runtime_sec=runtime, downtime_sec=downtime) if live.day == day else live)
+
+    def stage_state(self, db: Session, machine_id: str, state: str, run_start_time: Optional[datetime],
+                    at: Optional[datetime]):
+        """สถานะล่าสุดของเครื่องจาก edge node (ingest)"""
+        self._stage(db, machine_id, lambda live: live.copy(
+            state=state, run_start_time=run_start_time, last_updated=at))
+
+    def stage_downtime_start(self, db: Session, downtime: DowntimeLog):
+        active = _downtime_dict(downtime)
+        self._stage(db, downtime.machine_id, lambda live: live.copy(active_downtime=active))
+
+    def stage_downtime_stop(self, db: Session, downtime: DowntimeLog, summary: DailySummary):
+        day, reason, duration = downtime.date, downtime.downtime_reason, downtime.duration_sec
+        total = summary.total_downtime_sec
+
+        def change(live: MachineLive) -> MachineLive:
+            if live.day != day:
+                return live.copy(active_downtime=None)
+            by_reason = dict(live.downtime_by_reason)
+            by_reason[reason] = by_reason.get(reason, 0) + duration
+            return live.copy(active_downtime=None, downtime_by_reason=by_reason, downtime_sec=total)
+        self._stage(db, downtime.machine_id, change)
+
+    # --- อ่าน ---
+
+    async def _load(self, db: AsyncSession, machine_id: str, day: date, stamp) -> MachineLive:
+        from ..state_machine import machine_brain
+        summary = await db.get(DailySummary, (machine_id, day))
+        reasons = (await db.execute(
+            select(DowntimeLog.downtime_reason, func.sum(DowntimeLog.duration_sec)).where(
+                DowntimeLog.machine_id == machine_id,
+                DowntimeLog.date == day,
+                DowntimeLog.is_active == False,
+                DowntimeLog.duration_sec.isnot(None)
+            ).group_by(DowntimeLog.downtime_reason)
+        )).all()
+        active = await db.scalar(
+            select(DowntimeLog).where(DowntimeLog.machine_id == machine_id, DowntimeLog.is_active == True).limit(1)
+        )
+        live = MachineLive(
+            machine_id, day, stamp,
+            total_cycles=summary.total_cycles if summary else 0,
+            runtime_sec=summary.total_runtime_sec if summary else 0,
+            downtime_sec=summary.total_downtime_sec if summary else 0,
+            downtime_by_reason={reason: total or 0 for reason, total in reasons},
+            active_downtime=_downtime_dict(active) if active else None,
+        )
+        if machine_id != machine_brain.machine_id:
+            checkpoint = await db.get(IngestCheckpoint, machine_id)
+            live.known = checkpoint is not None
+            if checkpoint:
+                live.state = checkpoint.state or "STOP"
+                live.run_start_time = checkpoint.run_start_time
+                live.last_updated = checkpoint.last_event_time or checkpoint.updated_at
+        return live
+
+    async def get(self, db: AsyncSession, machine_id: str) -> MachineLive:
+        """
+        snapshot ของวันนี้ (ไม่ query ถ้าใน memory ยังตรงกับ DB)
+        เครื่องที่ต่อกล้องกับ server นี้: state / run_start_time อ่านจาก machine_brain ตอนใช้
+        """
+        today = date.today()
+        stamp = self._read_stamp(machine_id)
+        live = self._machines.get(machine_id)
+        if live is not None and live.stamp == stamp:
+            if live.day == today:
+                return live
+            with self._lock:
+                current = self._machines.get(machine_id)
+                if current is live:
+                    self._machines[machine_id] = live = live.rolled(today)
+                    return live
+
+        live = await self._load(db, machine_id, today, stamp)
+        # เครื่องที่ไม่รู้จักและไม่มีข้อมูล ไม่เก็บ (กัน machine_id สุ่มกิน memory)
+        if live.known or live.total_cycles or live.downtime_by_reason or live.active_downtime:
+            with self._lock:
+                self._machines[machine_id] = live
+        return live
+
+    # --- มุมมองสำหรับ endpoint ---
+
+    @staticmethod
+    def _run_state(live: MachineLive):
+        from ..state_machine import machine_brain
+        if live.machine_id == machine_brain.machine_id:
+            return machine_brain.current_state, machine_brain.run_start_time, datetime.now()
+        if is_stale_run(live.state, live.last_updated):
+            return "STOP", None, live.last_updated
+        return live.state, live.run_start_time, live.last_updated
+
+    def state_view(self, live: MachineLive) -> dict:
+        state, _, last_updated = self._run_state(live)
+        return {
+            "machine_id": live.machine_id,
+            "state": state,
+            "is_running": state == "RUN",
+            "current_cycle": live.total_cycles,
+            "today_runtime_sec": live.runtime_sec,
+            "last_updated": last_updated,
+        }
+
+    def summary_view(self, live: MachineLive) -> dict:
+        """ยอดของวันนี้ รวมเวลาของ run ที่ยังไม่จบ (ถ้าเริ่มวันนี้)"""
+        state, run_start_time, _ = self._run_state(live)
+        runtime = live.runtime_sec
+        if state == "RUN" and run_start_time and run_start_time.date() == live.day:
+            runtime += max(0, int((datetime.now() - run_start_time).total_seconds()))
+        return {
+            "machine_id": live.machine_id,
+            "date": live.day,
+            "total_cycles": live.total_cycles,
+            "total_runtime_sec": runtime,
+            "total_downtime_sec": live.downtime_sec,
+            "availability": calc_availability(runtime),
+        }
+
+
+# ตัวเดียวทั้งแอป (เหมือน machine_brain)
+live_status = LiveStatusRegistry()
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session: Session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        live_status._apply(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,48 @@
+"""
+Keyset (seek) pagination บน (start_time, id)
+
+cursor เป็น string ทึบ (base64 ของ start_time + id ของแถวสุดท้ายในหน้าก่อน)
+หน้าถัดไปใช้ WHERE (start_time, id) > / < cursor แทน OFFSET -> ทุกหน้าใช้ index เดียวกัน เร็วเท่ากันหมด
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(start_time: datetime, row_id: int) -> str:
+    raw = json.dumps({"t": start_time.isoformat(), "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    แปลง cursor กลับเป็น (start_time, id) / ValueError ถ้า cursor ไม่ถูกต้อง
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["t"]), int(data["id"])
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def seek_condition(start_col, id_col, cursor: Tuple[datetime, int], descending: bool = False):
+    """
+    เงื่อนไข WHERE สำหรับแถวที่อยู่ "หลัง" cursor ตามลำดับการเรียง
+    """
+    if descending:
+        return tuple_(start_col, id_col) < tuple_(*cursor)
+    return tuple_(start_col, id_col) > tuple_(*cursor)
+
+
+def next_cursor(items: list, limit: Optional[int]) -> Optional[str]:
+    """
+    cursor ของหน้าถัดไป (items ต้องดึงมา limit + 1 แถว เพื่อดูว่ายังมีหน้าต่อไปหรือไม่)
+    """
+    if limit is None or len(items) <= limit:
+        return None
+    last = items[limit - 1]
+    return encode_cursor(last.start_time, last.id)
@@ -0,0 +1,81 @@
+"""
+Sampling profiler แบบเปิดเฉพาะตอนเรียก (routers/admin.py)
+
+- ไม่มี hook / thread ค้างไว้ตอน idle: thread ที่เรียก profile() สุ่ม sys._current_frames()
+  ทุก interval จนครบเวลา แล้วจบ
+- ผลเป็น collapsed stack (1 บรรทัด = "thread;frame;frame;... count") ใช้กับ flamegraph.pl /
+  speedscope / inferno ได้เลย
+- stack ที่ไปหยุดรออยู่ (threading / queue / selectors / asyncio) นับเป็น idle ตัดทิ้งเป็นค่าเริ่มต้น
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional, Tuple
+
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", 120))
+
+_IDLE_MODULES = ("threading.py", "queue.py", "selectors.py", os.path.join("asyncio", "base_events.py"))
+
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _short_path(filename: str) -> str:
+    best = ""
+    for prefix in sys.path:
+        if prefix and filename.startswith(prefix) and len(prefix) > len(best):
+            best = prefix
+    return filename[len(best):].lstrip(os.sep) if best else filename
+
+
+def _is_idle(frame) -> bool:
+    return frame.f_code.co_filename.endswith(_IDLE_MODULES)
+
+
+def profile(seconds: float, interval: float = 0.01, thread_filter: Optional[str] = None,
+            include_idle: bool = False, lines: bool = False) -> Tuple[str, int]:
+    """
+    สุ่ม stack ของทุก thread (ยกเว้นตัวเอง) เป็นเวลา seconds วินาที
+    thread_filter: เอาเฉพาะ thread ที่ชื่อมีข้อความนี้ (เช่น 'vision', 'AnyIO')
+    คืน (collapsed stacks, จำนวนรอบที่สุ่ม)
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy("Another profile is running")
+    try:
+        me = threading.get_ident()
+        labels = {}  # (code, lineno) -> label
+        stacks = Counter()
+        rounds = 0
+        deadline = time.monotonic() + min(seconds, PROFILE_MAX_SECONDS)
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                name = names.get(ident, f"thread-{ident}")
+                if thread_filter and thread_filter not in name:
+                    continue
+                if not include_idle and _is_idle(frame):
+                    continue
+                parts = []
+                while frame is not None:
+                    key = (frame.f_code, frame.f_lineno if lines else 0)
+                    label = labels.get(key)
+                    if label is None:
+                        code = frame.f_code
+                        where = _short_path(code.co_filename) + (f":{key[1]}" if lines else "")
+                        label = labels[key] = f"{code.co_name} ({where})".replace(";", ":")
+                    parts.append(label)
+                    frame = frame.f_back
+                parts.append(name.replace(";", ":"))
+                stacks[";".join(reversed(parts))] += 1
+            rounds += 1
+            time.sleep(interval)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common()), rounds
+    finally:
+        _profile_lock.release()
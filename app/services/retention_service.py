@@ -0,0 +1,101 @@
+import os
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete, func, case, and_
+from datetime import date, datetime, timedelta
+from ..models import MachineState, MachineStateDaily
+from ..migrations import ensure_log_partitions
+from .rollup_service import dialect_insert
+from . import archive_service, ingest_service
+from ..vision import trace_store
+
+# เก็บ raw machine_state ย้อนหลังกี่วัน (เก่ากว่านี้จะเหลือแค่ rollup รายวัน)
+MACHINE_STATE_RETENTION_DAYS = int(os.getenv("MACHINE_STATE_RETENTION_DAYS", 90))
+
+
+def rollup_machine_state(db: Session, start: datetime, end: datetime) -> int:
+    """
+    สรุป machine_state ช่วง [start, end) ลง machine_state_daily แยกตามเครื่อง (INSERT ... SELECT upsert)
+    """
+    day = func.date(MachineState.timestamp)
+    insert = dialect_insert(db)
+    stmt = insert(MachineStateDaily).from_select(
+        ["machine_id", "date", "run_transitions", "stop_transitions", "first_timestamp",
+         "last_timestamp", "max_cycle", "max_runtime_sec"],
+        select(
+            MachineState.machine_id,
+            day,
+            func.sum(case((MachineState.state == "RUN", 1), else_=0)),
+            func.sum(case((MachineState.state == "STOP", 1), else_=0)),
+            func.min(MachineState.timestamp),
+            func.max(MachineState.timestamp),
+            func.coalesce(func.max(MachineState.current_cycle), 0),
+            func.coalesce(func.max(MachineState.today_runtime_sec), 0)
+        ).where(
+            and_(MachineState.timestamp >= start, MachineState.timestamp < end)
+        ).group_by(MachineState.machine_id, day)
+    )
+    # ช่วงเวลาเป็นวันเต็มเสมอ -> เขียนทับได้ (รันซ้ำ/รันพร้อมกันหลาย worker ก็ได้ผลเท่าเดิม)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MachineStateDaily.machine_id, MachineStateDaily.date],
+        set_={
+            "run_transitions": stmt.excluded.run_transitions,
+            "stop_transitions": stmt.excluded.stop_transitions,
+            "first_timestamp": stmt.excluded.first_timestamp,
+            "last_timestamp": stmt.excluded.last_timestamp,
+            "max_cycle": stmt.excluded.max_cycle,
+            "max_runtime_sec": stmt.excluded.max_runtime_sec,
+        }
+    )
+    return db.execute(stmt).rowcount
+
+
+def prune_machine_state(db: Session, retain_days: int = MACHINE_STATE_RETENTION_DAYS,
+                        chunk_days: int = 7) -> int:
+    """
+    Rollup แล้วลบ raw machine_state ที่เก่ากว่า retain_days
+    ทำทีละ chunk_days วัน โดย rollup + delete อยู่ใน transaction เดียวกัน
+    (ถ้าล้มกลางทาง จะไม่มีวันที่ถูก rollup ซ้ำหรือหายไป)
+    คืนค่าจำนวนแถวที่ถูกลบ
+    """
+    cutoff = datetime.combine(date.today() - timedelta(days=retain_days), datetime.min.time())
+    oldest = db.query(func.min(MachineState.timestamp)).scalar()
+    if oldest is None:
+        return 0
+
+    deleted = 0
+    chunk_start = datetime.combine(oldest.date(), datetime.min.time())
+    while chunk_start < cutoff:
+        chunk_end = min(cutoff, chunk_start + timedelta(days=chunk_days))
+        try:
+            rollup_machine_state(db, chunk_start, chunk_end)
+            deleted += db.execute(
+                delete(MachineState).where(
+                    and_(MachineState.timestamp >= chunk_start, MachineState.timestamp < chunk_end)
+                ).execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        chunk_start = chunk_end
+    return deleted
+
+
+def run_maintenance(db: Session, retain_days: int = MACHINE_STATE_RETENTION_DAYS,
+                    archive: bool = True, traces: bool = True) -> int:
+    """
+    งานดูแล DB ประจำวัน: สร้าง partition ล่วงหน้า + ปิด run ของ edge node ที่เงียบไป + archive เดือนเก่า
+    + retention ของ machine_state และลบ detection trace เก่า (TRACE_RETENTION_DAYS)
+    ใช้ทั้งจาก maintenance_loop และ python -m app.tools.maintenance / คืนจำนวนแถว machine_state ที่ลบ
+    """
+    ensure_log_partitions(db.connection())
+    db.commit()
+    for machine_id in ingest_service.close_stale_runs(db):
+        print(f"🧹 Maintenance: closed stale run of {machine_id}")
+    if archive:
+        archive_service.archive_closed_months(db)
+    if traces:
+        removed = trace_store.prune_traces()
+        if removed:
+            print(f"🧹 Maintenance: removed {removed} trace file(s)")
+    return prune_machine_state(db, retain_days)
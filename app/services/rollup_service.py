@@ -0,0 +1,156 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete, union, exists, func, case, cast, literal, Numeric, and_
+from datetime import date, timedelta
+from typing import Optional
+from ..models import CycleLog, DowntimeLog, DailySummary
+from ..config import SHIFT_SECONDS
+from . import archive_service
+
+
+def dialect_insert(db: Session):
+    """
+    เลือก insert() ตาม dialect ของ DB (ต้องรองรับ ON CONFLICT)
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Upsert not supported on dialect '{dialect}'")
+    return insert
+
+
+def _summary_select(start_date: date, end_date: date, shift_seconds: float):
+    """
+    SELECT ที่คำนวณ DailySummary ของทุกเครื่อง ทุกวันในช่วง จาก CycleLog + DowntimeLog (set-based)
+    """
+    cycles = select(
+        CycleLog.machine_id.label("machine_id"),
+        CycleLog.date.label("date"),
+        func.count(CycleLog.id).label("total_cycles"),
+        func.coalesce(func.sum(CycleLog.runtime_sec), 0).label("total_runtime_sec")
+    ).where(
+        CycleLog.date.between(start_date, end_date)
+    ).group_by(CycleLog.machine_id, CycleLog.date).subquery()
+
+    downtimes = select(
+        DowntimeLog.machine_id.label("machine_id"),
+        DowntimeLog.date.label("date"),
+        func.coalesce(func.sum(DowntimeLog.duration_sec), 0).label("total_downtime_sec")
+    ).where(
+        and_(
+            DowntimeLog.date.between(start_date, end_date),
+            DowntimeLog.is_active == False,
+            DowntimeLog.duration_sec.isnot(None)
+        )
+    ).group_by(DowntimeLog.machine_id, DowntimeLog.date).subquery()
+
+    days = union(
+        select(cycles.c.machine_id, cycles.c.date),
+        select(downtimes.c.machine_id, downtimes.c.date)
+    ).subquery()
+
+    runtime = func.coalesce(cycles.c.total_runtime_sec, 0)
+    pct = runtime * 100.0 / literal(shift_seconds)
+    # สูตรเดียวกับ calc_availability(): runtime / กะ, ไม่เกิน 100
+    availability = func.round(cast(case((pct > 100, 100), else_=pct), Numeric), 2)
+
+    return select(
+        days.c.machine_id,
+        days.c.date,
+        func.coalesce(cycles.c.total_cycles, 0),
+        runtime,
+        func.coalesce(downtimes.c.total_downtime_sec, 0),
+        availability
+    ).select_from(
+        days.outerjoin(cycles, and_(cycles.c.machine_id == days.c.machine_id, cycles.c.date == days.c.date))
+            .outerjoin(downtimes, and_(downtimes.c.machine_id == days.c.machine_id, downtimes.c.date == days.c.date))
+    )
+
+
+def recompute_range(db: Session, start_date: date, end_date: date,
+                    shift_seconds: float = SHIFT_SECONDS) -> int:
+    """
+    สร้าง DailySummary ของช่วงวันที่ใหม่ทั้งหมดด้วย INSERT ... SELECT ... ON CONFLICT
+    และลบแถวของวันที่ไม่มี log เหลืออยู่ (ทำใน transaction เดียว ยังไม่ commit)
+    คืนค่าจำนวนวันที่ถูกเขียน
+    """
+    insert = dialect_insert(db)
+    stmt = insert(DailySummary).from_select(
+        ["machine_id", "date", "total_cycles", "total_runtime_sec", "total_downtime_sec", "availability"],
+        _summary_select(start_date, end_date, shift_seconds)
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailySummary.machine_id, DailySummary.date],
+        set_={
+            "total_cycles": stmt.excluded.total_cycles,
+            "total_runtime_sec": stmt.excluded.total_runtime_sec,
+            "total_downtime_sec": stmt.excluded.total_downtime_sec,
+            "availability": stmt.excluded.availability,
+        }
+    )
+    written = db.execute(stmt).rowcount
+
+    db.execute(
+        delete(DailySummary).where(
+            and_(
+                DailySummary.date.between(start_date, end_date),
+                ~exists().where(
+                    and_(CycleLog.machine_id == DailySummary.machine_id, CycleLog.date == DailySummary.date)
+                ),
+                ~exists().where(
+                    and_(
+                        DowntimeLog.machine_id == DailySummary.machine_id,
+                        DowntimeLog.date == DailySummary.date,
+                        DowntimeLog.is_active == False,
+                        DowntimeLog.duration_sec.isnot(None)
+                    )
+                )
+            )
+        ).execution_options(synchronize_session=False)
+    )
+    return written
+
+
+def get_data_date_range(db: Session) -> Optional[tuple]:
+    """
+    วันแรก-วันสุดท้ายที่มีข้อมูลใน CycleLog / DowntimeLog (None ถ้ายังไม่มีข้อมูล)
+    """
+    c_min, c_max = db.query(func.min(CycleLog.date), func.max(CycleLog.date)).one()
+    d_min, d_max = db.query(func.min(DowntimeLog.date), func.max(DowntimeLog.date)).one()
+    starts = [d for d in (c_min, d_min) if d is not None]
+    ends = [d for d in (c_max, d_max) if d is not None]
+    if not starts:
+        return None
+    return min(starts), max(ends)
+
+
+def recompute_daily_summaries(db: Session, start_date: date, end_date: date,
+                              chunk_days: int = 31,
+                              shift_seconds: float = SHIFT_SECONDS) -> int:
+    """
+    Backfill DailySummary ทีละช่วง (chunk) โดย commit ทุก chunk
+    เพื่อไม่ให้ transaction ใหญ่เกินไปเมื่อทำย้อนหลังหลายปี
+    """
+    if chunk_days < 1:
+        raise ValueError("chunk_days must be at least 1")
+    # วันที่ถูก archive ไปแล้วไม่มี log ใน hot table -> ถ้า recompute จะกลายเป็นลบ summary ทิ้ง
+    cutoff = min(filter(None, [archive_service.get_hot_cutoff(db, "cycle_log"),
+                               archive_service.get_hot_cutoff(db, "downtime_log")]), default=None)
+    if cutoff and start_date < cutoff:
+        print(f"⚠️ Data before {cutoff} is archived, recompute starts from {cutoff}")
+        start_date = cutoff
+
+    total = 0
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(end_date, chunk_start + timedelta(days=chunk_days - 1))
+        try:
+            total += recompute_range(db, chunk_start, chunk_end, shift_seconds)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        chunk_start = chunk_end + timedelta(days=1)
+    return total
@@ -1,47 +1,24 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date
-from ..models import DailySummary
-from ..schemas import SummarySchema
+from ..models import DailySummary, IngestCheckpoint, DEFAULT_MACHINE_ID
+from .live_status import is_stale_run
 
-def get_summary_by_date(db: Session, target_date: date) -> DailySummary:
+async def get_summary_by_date(db: AsyncSession, target_date: date,
+                             machine_id: str = DEFAULT_MACHINE_ID) -> DailySummary:
     """
-    ดึงข้อมูล Summary ตามวันที่
+    ดึงข้อมูล Summary ตามวันที่ ของเครื่องที่ระบุ
     """
-    return db.query(DailySummary).filter(DailySummary.date == target_date).first()
+    return await db.get(DailySummary, (machine_id, target_date))
 
-def create_empty_summary(target_date: date) -> DailySummary:
+async def get_run_start_time(db: AsyncSession, machine_id: str = DEFAULT_MACHINE_ID):
     """
-    สร้าง Object เปล่า สำหรับส่งกลับกรณีเริ่มวันใหม่แล้วยังไม่มี Log
-    เพื่อป้องกัน Frontend Error
+    เวลาเริ่มของ run ที่ยังไม่จบ (None ถ้าเครื่องหยุดอยู่)
+    เครื่องที่ต่อกล้องกับ server นี้อ่านจาก memory, เครื่องจาก edge node อ่านจาก ingest checkpoint
     """
-    return DailySummary(
-        date=target_date,
-        total_cycles=0,
-        total_runtime_sec=0,
-        total_downtime_sec=0,
-        availability=0.0
-    )
-
-
-def get_realtime_today_summary(db: Session) -> SummarySchema:
-    from datetime import date, datetime
     from ..state_machine import machine_brain
-    today = date.today()
-    summary = get_summary_by_date(db, today)
-    if not summary:
-        summary = create_empty_summary(today)
-    current_add = 0
-    if (machine_brain.current_state == "RUN" and
-        machine_brain.run_start_time and
-        machine_brain.run_start_time.date() == today):
-        current_add = int((datetime.now() - machine_brain.run_start_time).total_seconds())
-    total_runtime = summary.total_runtime_sec + current_add
-    SHIFT_SECONDS = 7.5 * 3600
-    availability = round(min(100.0, total_runtime / SHIFT_SECONDS * 100), 2)
-    return SummarySchema(
-        date=today,
-        total_cycles=summary.total_cycles,
-        total_runtime_sec=total_runtime,
-        total_downtime_sec=summary.total_downtime_sec,
-        availability=availability
-    )
\ No newline at end of file
+    if machine_id == machine_brain.machine_id:
+        return machine_brain.run_start_time if machine_brain.current_state == "RUN" else None
+    checkpoint = await db.get(IngestCheckpoint, machine_id)
+    if checkpoint and checkpoint.state == "RUN" and not is_stale_run(checkpoint.state, checkpoint.last_event_time):
+        return checkpoint.run_start_time
+    return None
@@ -0,0 +1,241 @@
+"""
+Timeline RUN / STOP / DOWNTIME ของเครื่อง เป็นช่วง (run-length) พร้อมวาด
+รวม cycle_log + downtime_log (+ archive) + run ที่ยังไม่จบ
+
+- ลำดับความสำคัญเมื่อช่วงทับกัน: RUN > DOWNTIME (ตามสาเหตุ) > STOP
+- ผลถูก cache ต่อ (เครื่อง, ช่วงวันที่, bucket) และคำนวณใหม่เฉพาะเมื่อข้อมูลเปลี่ยน
+  ตรวจด้วย change token (count / max id ของแต่ละตาราง + run ที่ค้างอยู่) = query aggregate บน index 1 ครั้ง
+  ใช้ได้ถูกต้องแม้มีหลาย worker (token มาจาก DB ไม่ใช่ memory ของ process)
+- ช่วงที่ยังไม่จบ (run / downtime ที่ active) ยืดถึง "ตอนนี้" ตอนตอบ โดยไม่ต้องคำนวณทั้งช่วงใหม่
+- bucket_sec: รวมเป็นช่องละ N วินาที ใช้สถานะที่กินเวลามากที่สุดในช่อง แล้ว run-length อีกรอบ
+"""
+import bisect
+import json
+import os
+from collections import OrderedDict
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from typing import List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import CycleLog, DEFAULT_MACHINE_ID, DowntimeLog
+from . import archive_service
+from .summary_service import get_run_start_time
+
+TIMELINE_CACHE_SIZE = int(os.getenv("TIMELINE_CACHE_SIZE", 128))
+TIMELINE_MAX_RAW_DAYS = int(os.getenv("TIMELINE_MAX_RAW_DAYS", 31))
+TIMELINE_MAX_BUCKETS = int(os.getenv("TIMELINE_MAX_BUCKETS", 20000))
+
+RUN, STOP, DOWNTIME = "RUN", "STOP", "DOWNTIME"
+
+# key -> _Entry
+_cache: "OrderedDict[tuple, _Entry]" = OrderedDict()
+
+
+class TimelineRangeError(ValueError):
+    pass
+
+
+class _Entry:
+    __slots__ = ("token", "segments", "view_mark", "view")
+
+    def __init__(self, token, segments):
+        self.token = token
+        self.segments = segments
+        self.view_mark = None
+        self.view = None
+
+
+def _local_naive(ts: Optional[datetime]) -> Optional[datetime]:
+    """downtime เก็บเป็น UTC (SQLite คืนค่าแบบไม่มี timezone) -> เวลา local แบบเดียวกับ cycle_log"""
+    if ts is None or isinstance(ts, str):
+        return ts
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone().replace(tzinfo=None)
+
+
+def build_segments(window_start: datetime, window_end: datetime, runs, downtimes) -> List[list]:
+    """
+    runs: [(start, end)], downtimes: [(start, end, reason)] (end = None = ยังไม่จบ)
+    คืน [[start, end, state, reason], ...] ต่อเนื่องกันตั้งแต่ window_start ถึง window_end
+    """
+    events = []
+    for start, end in runs:
+        start, end = max(start, window_start), min(end or window_end, window_end)
+        if start < end:
+            events += [(start, 1, RUN, None), (end, -1, RUN, None)]
+    for start, end, reason in downtimes:
+        start, end = max(start, window_start), min(end or window_end, window_end)
+        if start < end:
+            events += [(start, 1, DOWNTIME, reason), (end, -1, DOWNTIME, reason)]
+    events.sort(key=lambda e: e[0])
+
+    segments = []
+    running = 0
+    reasons = []  # downtime ที่ active อยู่ (ตัวล่าสุดอยู่ท้าย)
+    cursor = window_start
+
+    def emit(until):
+        if until <= cursor:
+            return
+        state, reason = (RUN, None) if running else (DOWNTIME, reasons[-1]) if reasons else (STOP, None)
+        if segments and segments[-1][2] == state and segments[-1][3] == reason:
+            segments[-1][1] = until
+        else:
+            segments.append([cursor, until, state, reason])
+
+    for at, delta, kind, reason in events:
+        emit(at)
+        cursor = max(cursor, at)
+        if kind == RUN:
+            running += delta
+        elif delta > 0:
+            reasons.append(reason)
+        else:
+            reasons.remove(reason)
+    emit(window_end)
+    return segments
+
+
+def clip_segments(segments: List[list], until: datetime) -> List[list]:
+    """ตัด timeline ที่ "ตอนนี้" (ช่วงที่ยังไม่จบถูกคำนวณยาวถึงท้ายช่วงวันที่ไว้)"""
+    count = bisect.bisect_left([s[0] for s in segments], until)
+    clipped = segments[:count]
+    if clipped and clipped[-1][1] > until:
+        clipped[-1] = [clipped[-1][0], until, clipped[-1][2], clipped[-1][3]]
+    return clipped
+
+
+def bucket_segments(segments: List[list], window_start: datetime, until: datetime, bucket_sec: int) -> List[list]:
+    """รวมเป็นช่องละ bucket_sec วินาที (สถานะที่กินเวลามากที่สุดในช่อง) แล้ว run-length อีกรอบ"""
+    step = timedelta(seconds=bucket_sec)
+    out = []
+    i = 0
+    bucket_start = window_start
+    while bucket_start < until:
+        bucket_end = min(bucket_start + step, until)
+        while i < len(segments) and segments[i][1] <= bucket_start:
+            i += 1
+        covered = {}
+        j = i
+        while j < len(segments) and segments[j][0] < bucket_end:
+            key = (segments[j][2], segments[j][3])
+            overlap = (min(segments[j][1], bucket_end) - max(segments[j][0], bucket_start)).total_seconds()
+            covered[key] = covered.get(key, 0) + overlap
+            j += 1
+        state, reason = max(covered, key=covered.get) if covered else (STOP, None)
+        if out and out[-1][2] == state and out[-1][3] == reason:
+            out[-1][1] = bucket_end
+        else:
+            out.append([bucket_start, bucket_end, state, reason])
+        bucket_start = bucket_end
+    return out
+
+
+async def _change_token(db: AsyncSession, machine_id: str, start_date: date, end_date: date, run_start):
+    cycles = select(func.count(CycleLog.id), func.max(CycleLog.id)).where(
+        CycleLog.machine_id == machine_id, CycleLog.date.between(start_date, end_date))
+    downtimes = select(func.count(DowntimeLog.id), func.max(DowntimeLog.id), func.count(DowntimeLog.end_time)).where(
+        DowntimeLog.machine_id == machine_id, DowntimeLog.date.between(start_date, end_date))
+    return (
+        tuple((await db.execute(cycles)).one()),
+        tuple((await db.execute(downtimes)).one()),
+        await archive_service.get_hot_cutoff_async(db, "cycle_log"),
+        await archive_service.get_hot_cutoff_async(db, "downtime_log"),
+        run_start,
+    )
+
+
+def _archived(table_name: str, start_date: date, end_date: date, cutoff: Optional[date], machine_id: str,
+              columns: List[str]) -> list:
+    if not cutoff or start_date >= cutoff:
+        return []
+    table = archive_service.read_archive(table_name, start_date, min(end_date, cutoff - timedelta(days=1)),
+                                         extra_filter=archive_service.machine_filter(machine_id), columns=columns)
+    return [tuple(row[c] for c in columns) for row in table.to_pylist()]
+
+
+async def _compute(db: AsyncSession, machine_id: str, start_date: date, end_date: date,
+                   window_start: datetime, window_end: datetime, run_start, token) -> List[list]:
+    runs = [tuple(r) for r in (await db.execute(
+        select(CycleLog.start_time, CycleLog.stop_time)
+        .where(CycleLog.machine_id == machine_id, CycleLog.date.between(start_date, end_date))
+    )).all()]
+    downtimes = [tuple(r) for r in (await db.execute(
+        select(DowntimeLog.start_time, DowntimeLog.end_time, DowntimeLog.downtime_reason)
+        .where(DowntimeLog.machine_id == machine_id, DowntimeLog.date.between(start_date, end_date))
+    )).all()]
+
+    cycle_cutoff, downtime_cutoff = token[2], token[3]
+    if (cycle_cutoff and start_date < cycle_cutoff) or (downtime_cutoff and start_date < downtime_cutoff):
+        # อ่านไฟล์ Parquet เป็นงาน blocking -> ย้ายไป threadpool
+        runs += await run_in_threadpool(_archived, "cycle_log", start_date, end_date, cycle_cutoff,
+                                        machine_id, ["start_time", "stop_time"])
+        downtimes += await run_in_threadpool(_archived, "downtime_log", start_date, end_date, downtime_cutoff,
+                                             machine_id, ["start_time", "end_time", "downtime_reason"])
+
+    if run_start:
+        runs.append((run_start, None))
+    downtimes = [(_local_naive(s), _local_naive(e), reason) for s, e, reason in downtimes if s is not None]
+    return build_segments(window_start, window_end, [r for r in runs if r[0] is not None], downtimes)
+
+
+def _render(machine_id: str, window_start: datetime, until: datetime, bucket_sec: Optional[int],
+            segments: List[list]) -> bytes:
+    return json.dumps({
+        "machine_id": machine_id,
+        "start": window_start.isoformat(),
+        "end": until.isoformat(),
+        "bucket_sec": bucket_sec,
+        "segments": [
+            {"start": s.isoformat(), "end": e.isoformat(), "state": state, "reason": reason}
+            for s, e, state, reason in segments
+        ],
+    }, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+async def get_timeline(db: AsyncSession, start_date: date, end_date: date,
+                       machine_id: str = DEFAULT_MACHINE_ID, bucket_sec: Optional[int] = None) -> bytes:
+    """
+    timeline ของช่วงวันที่ (JSON ที่ encode แล้ว ตาม schemas.TimelineResponse)
+    """
+    window_start = datetime.combine(start_date, dtime())
+    window_end = datetime.combine(end_date + timedelta(days=1), dtime())
+    now = datetime.now()
+    until = max(min(window_end, now), window_start)
+
+    if bucket_sec is None and (end_date - start_date).days + 1 > TIMELINE_MAX_RAW_DAYS:
+        raise TimelineRangeError(f"Range longer than {TIMELINE_MAX_RAW_DAYS} days requires bucket_sec")
+    if bucket_sec is not None and (window_end - window_start).total_seconds() / bucket_sec > TIMELINE_MAX_BUCKETS:
+        raise TimelineRangeError(f"Too many buckets (max {TIMELINE_MAX_BUCKETS}), use a larger bucket_sec")
+
+    run_start = await get_run_start_time(db, machine_id)
+    token = await _change_token(db, machine_id, start_date, end_date, run_start)
+
+    key = (machine_id, start_date, end_date, bucket_sec)
+    entry = _cache.get(key)
+    if entry is None or entry.token != token:
+        segments = await _compute(db, machine_id, start_date, end_date, window_start, window_end, run_start, token)
+        entry = _Entry(token, segments)
+        _cache[key] = entry
+        while len(_cache) > TIMELINE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    _cache.move_to_end(key)
+
+    # ช่วงที่ผ่านไปแล้วทั้งหมด: ผลคงที่ / ช่วงที่รวม "ตอนนี้": แบบ bucket เปลี่ยนเมื่อขึ้นช่องใหม่เท่านั้น
+    if until >= window_end:
+        mark = window_end
+    elif bucket_sec:
+        mark = int((until - window_start).total_seconds() // bucket_sec)
+    else:
+        mark = until
+    if entry.view_mark != mark:
+        segments = clip_segments(entry.segments, until)
+        if bucket_sec:
+            segments = bucket_segments(segments, window_start, until, bucket_sec)
+        entry.view = _render(machine_id, window_start, until, bucket_sec, segments)
+        entry.view_mark = mark
+    return entry.view
@@ -1,11 +1,20 @@
+import os
 import time
-from datetime import datetime, date
+from datetime import datetime, date, timezone
+from typing import Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from . import models
+from .config import calc_availability
+from .services.live_status import live_status
+
+# รวม commit ของ state log ไว้ทีละช่วง (วินาที) ลดจำนวน fsync บน edge box / SQLite
+# การจบ cycle (CycleLog + DailySummary) ยัง commit ทันทีเสมอ
+STATE_COMMIT_INTERVAL_SEC = float(os.getenv("STATE_COMMIT_INTERVAL_SEC", 1.0))
 
 class MachineStateMachine:
-    def __init__(self):
+    def __init__(self, machine_id: str = models.DEFAULT_MACHINE_ID):
+        self.machine_id = machine_id
         self.current_state = "STOP"
         self.last_spark_time = 0
         self.run_start_time = None
@@ -16,8 +25,19 @@ class MachineStateMachine:
         self.today_runtime = 0
         self.cached_summary = {}
 
-    def update_from_vision(self, db: Session, spark_detected: bool):
-        now = time.time()
+        # Batched commits
+        self.commit_interval = STATE_COMMIT_INTERVAL_SEC
+        self.pending_writes = 0
+        self.last_commit_time = 0.0
+        # True = ผู้เรียกเป็นคน commit เอง (เช่น ingest batch ต้อง commit พร้อม checkpoint)
+        self.defer_commits = False
+
+    def update_from_vision(self, db: Session, spark_detected: bool, at: Optional[datetime] = None):
+        """
+        at: เวลาที่ถ่ายภาพ (local naive) สำหรับข้อมูลที่ส่งมาจาก edge node
+            ไม่ระบุ = ใช้เวลาปัจจุบัน (vision_loop ในเครื่อง)
+        """
+        now = at.timestamp() if at else time.time()
         
         # 1. Update Spark Timestamp
         if spark_detected:
@@ -31,19 +51,53 @@ class MachineStateMachine:
         if spark_detected:
             # Transition STOP -> RUN
             if self.current_state == "STOP":
-                self.current_state = "RUN"
-                self.run_start_time = datetime.now()
-                self._log_state_change(db, "RUN")
-                print(f"⚡ MACHINE STARTED at {self.run_start_time}")
+                self._start_run(db, at)
                 
         else:
             # Transition RUN -> STOP (after timeout)
             if self.current_state == "RUN" and time_since_spark > self.stop_threshold:
-                self.current_state = "STOP"
-                stop_time = datetime.now()
-                self._handle_stop_logic(db, stop_time)
-                self._log_state_change(db, "STOP")
-                print(f"🛑 MACHINE STOPPED at {stop_time}")
+                self._stop_run(db, at)
+
+        # 3. Commit งานที่ค้างอยู่ ถ้าถึงรอบ
+        self.flush(db)
+
+    def apply_transition(self, db: Session, state: str, at: datetime):
+        """
+        รับ state ที่ edge node ตัดสินมาแล้ว (RUN / STOP) แทนผล detection รายเฟรม
+        """
+        if state == "RUN" and self.current_state == "STOP":
+            self.last_spark_time = at.timestamp()
+            self._start_run(db, at)
+        elif state == "STOP" and self.current_state == "RUN":
+            self._stop_run(db, at)
+        self.flush(db)
+
+    def _start_run(self, db: Session, at: Optional[datetime] = None):
+        self.current_state = "RUN"
+        self.run_start_time = at or datetime.now()
+        self._log_state_change(db, "RUN", at)
+        print(f"⚡ MACHINE STARTED at {self.run_start_time}")
+
+    def _stop_run(self, db: Session, at: Optional[datetime] = None):
+        self.current_state = "STOP"
+        stop_time = at or datetime.now()
+        self._handle_stop_logic(db, stop_time)
+        self._log_state_change(db, "STOP", at)
+        # จบ cycle = ข้อมูลสำคัญ commit ทันที (CycleLog + DailySummary + state log ใน transaction เดียว)
+        self.flush(db, force=True)
+        print(f"🛑 MACHINE STOPPED at {stop_time}")
+
+    def flush(self, db: Session, force: bool = False):
+        """
+        Commit state log ที่ค้างอยู่ (ทุก commit_interval วินาที หรือทันทีถ้า force)
+        """
+        if not self.pending_writes or self.defer_commits:
+            return
+        now = time.time()
+        if force or now - self.last_commit_time >= self.commit_interval:
+            db.commit()
+            self.pending_writes = 0
+            self.last_commit_time = now
 
     def _handle_stop_logic(self, db: Session, stop_time: datetime):
         if not self.run_start_time:
@@ -53,20 +107,19 @@ class MachineStateMachine:
         runtime_delta = stop_time - self.run_start_time
         runtime_sec = int(runtime_delta.total_seconds())
         
-        today = date.today()
+        today = stop_time.date()
         
         # 1. Update Daily Summary (Create if not exists)
-        summary = db.query(models.DailySummary).filter(models.DailySummary.date == today).first()
+        summary = db.get(models.DailySummary, (self.machine_id, today))
         if not summary:
-            summary = models.DailySummary(date=today, total_cycles=0, total_runtime_sec=0, total_downtime_sec=0)
+            summary = models.DailySummary(machine_id=self.machine_id, date=today,
+                                          total_cycles=0, total_runtime_sec=0, total_downtime_sec=0)
             db.add(summary)
             db.flush() # to get defaults if needed
 
         summary.total_cycles += 1
         summary.total_runtime_sec += runtime_sec
-        
-        SHIFT_SECONDS = 27000.0
-        summary.availability = round(min(100.0, summary.total_runtime_sec / SHIFT_SECONDS * 100), 2)
+        summary.availability = calc_availability(summary.total_runtime_sec)
         
         # Downtime calculation requires simpler logic: 24h - runtime or time_since_start - runtime
         # For Phase 1 simple accumulation:
@@ -74,9 +127,11 @@ class MachineStateMachine:
         
         self.current_cycle_count = summary.total_cycles
         self.today_runtime = summary.total_runtime_sec
+        live_status.stage_cycle(db, summary)
         
         # 2. Log Cycle
         new_cycle = models.CycleLog(
+            machine_id=self.machine_id,
             date=today,
             cycle_no=summary.total_cycles,
             start_time=self.run_start_time,
@@ -84,24 +139,29 @@ class MachineStateMachine:
             runtime_sec=runtime_sec
         )
         db.add(new_cycle)
-        db.commit()
+        self.pending_writes += 1
         
         self.run_start_time = None
 
-    def _log_state_change(self, db: Session, state: str):
+    def _log_state_change(self, db: Session, state: str, at: Optional[datetime] = None):
         # Optional: Keep a granular log of state changes
         log = models.MachineState(
+            machine_id=self.machine_id,
             state=state,
             current_cycle=self.current_cycle_count,
             today_runtime_sec=self.today_runtime
         )
+        if at:
+            # at = local naive -> เก็บเป็น UTC แบบเดียวกับ server_default (SQLite ไม่เก็บ timezone)
+            log.timestamp = at.astimezone(timezone.utc)
         db.add(log)
-        db.commit()
+        self.pending_writes += 1
     
     def load_today_stats(self, db: Session):
         today = date.today()
-        self.current_cycle_count = db.query(func.count(models.CycleLog.id)).filter(models.CycleLog.date == today).scalar() or 0
-        self.today_runtime = db.query(func.coalesce(func.sum(models.CycleLog.runtime_sec), 0)).filter(models.CycleLog.date == today).scalar()
+        mine = (models.CycleLog.machine_id == self.machine_id, models.CycleLog.date == today)
+        self.current_cycle_count = db.query(func.count(models.CycleLog.id)).filter(*mine).scalar() or 0
+        self.today_runtime = db.query(func.coalesce(func.sum(models.CycleLog.runtime_sec), 0)).filter(*mine).scalar()
 
 # Singleton Instance
 machine_brain = MachineStateMachine()
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""
+ย้าย cycle_log / downtime_log ของเดือนที่ปิดแล้วไปเก็บเป็น Parquet (ดู services/archive_service.py)
+
+ตัวอย่าง:
+    python -m app.tools.archive --after-months 12      # archive ทุกเดือนที่เก่ากว่า 12 เดือน
+    python -m app.tools.archive --month 2024-01        # archive เฉพาะเดือนเดียว
+"""
+import argparse
+from datetime import datetime
+
+from ..database import SessionLocal
+from ..services import archive_service
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive closed months of cycle_log / downtime_log to Parquet")
+    parser.add_argument("--after-months", type=int, default=archive_service.ARCHIVE_AFTER_MONTHS,
+                        help="archive เดือนที่ปิดไปแล้วเกิน N เดือน")
+    parser.add_argument("--month", type=lambda s: datetime.strptime(s, "%Y-%m").date(),
+                        help="archive เฉพาะเดือนนี้ (YYYY-MM)")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.month:
+            try:
+                total = sum(
+                    archive_service.archive_month(db, table_name, args.month)
+                    for table_name in archive_service.ARCHIVED_MODELS
+                )
+            except archive_service.ArchiveOrderError as e:
+                parser.error(str(e))
+        else:
+            if args.after_months <= 0:
+                parser.error("--after-months must be > 0 (or set ARCHIVE_AFTER_MONTHS)")
+            total = archive_service.archive_closed_months(db, args.after_months)
+        print(f"✅ Archived {total} row(s) to {archive_service.ARCHIVE_DIR}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
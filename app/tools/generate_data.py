@@ -0,0 +1,181 @@
+"""
+สร้างข้อมูลจำลองหลายปี (cycle_log / downtime_log / machine_state / daily_summary) ลง DB ที่ตั้งใน DATABASE_URL
+สำหรับวัดประสิทธิภาพ API ด้วย app.tools.loadtest ก่อน deploy  ** ใช้กับ DB ทดสอบเท่านั้น **
+
+- วันทำงาน จันทร์-เสาร์ 08:00-17:30 พัก 3 ช่วง (เหมือน vision_loop)
+- cycle: เวลาเดิน ~ lognormal รอบ --runtime-mean-sec, ช่วงว่างระหว่าง cycle ~ exponential
+  ให้ได้ประมาณ --cycles-per-day ต่อวัน
+- downtime: ~Poisson(--downtimes-per-day) ครั้ง/วัน สาเหตุสุ่มตามสัดส่วนที่พบบ่อย
+- machine_state: เฉพาะ --state-days วันล่าสุด (ที่เก่ากว่านั้น maintenance จะ rollup แล้วลบอยู่แล้ว)
+- daily_summary: คำนวณจาก log ที่สร้างด้วย rollup_service (สูตรเดียวกับของจริง)
+
+ตัวอย่าง:
+    DATABASE_URL=postgresql://... python -m app.tools.generate_data --years 3
+    python -m app.tools.generate_data --start 2022-01-01 --end 2024-12-31 --machines 5 --cycles-per-day 400
+"""
+import argparse
+import time
+from datetime import date, datetime, timedelta, time as dtime, timezone
+
+import numpy as np
+from sqlalchemy import func, insert, select
+
+from ..config import BREAKS, END_TIME, START_TIME
+from ..database import Base, SessionLocal, engine
+from ..migrations import add_months, create_month_partition, is_partitioned, run_migrations
+from ..models import CycleLog, DEFAULT_MACHINE_ID, DowntimeLog, MachineState
+from ..services import rollup_service
+from ..services.retention_service import MACHINE_STATE_RETENTION_DAYS
+
+DOWNTIME_REASONS = {
+    "SETUP_DIE": 0.30, "REPAIR": 0.15, "MAINTENANCE": 0.10, "MATERIAL_SHORTAGE": 0.12, "POWER_FAILURE": 0.02,
+    "QUALITY_CHECK": 0.12, "WAITING_APPROVAL": 0.05, "OPERATOR_BREAK": 0.08, "OTHER_1": 0.04, "OTHER_2": 0.02,
+}
+
+
+def _seconds(t: dtime) -> int:
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+
+# ช่วงทำงาน (วินาทีนับจากเที่ยงคืน) ระหว่างพัก
+_WORK_SEGMENTS = []
+_cursor = _seconds(START_TIME)
+for _b_start, _b_end in BREAKS:
+    _WORK_SEGMENTS.append((_cursor, _seconds(_b_start)))
+    _cursor = _seconds(_b_end)
+_WORK_SEGMENTS.append((_cursor, _seconds(END_TIME)))
+_SEGMENT_STARTS = np.array([s for s, _ in _WORK_SEGMENTS])
+_SEGMENT_OFFSETS = np.cumsum([0] + [e - s for s, e in _WORK_SEGMENTS])
+WORK_SECONDS = int(_SEGMENT_OFFSETS[-1])
+
+
+def _work_to_clock(offsets: np.ndarray) -> np.ndarray:
+    """เวลาทำงานสะสม (ไม่นับพัก) -> วินาทีนับจากเที่ยงคืน"""
+    segment = np.searchsorted(_SEGMENT_OFFSETS, offsets, side="right") - 1
+    return _SEGMENT_STARTS[segment] + (offsets - _SEGMENT_OFFSETS[segment])
+
+
+def generate_day(rng: np.random.Generator, day: date, machine_id: str, args, with_state: bool):
+    midnight = datetime.combine(day, dtime())
+    gap_mean = max(WORK_SECONDS / args.cycles_per_day - args.runtime_mean_sec, 1.0)
+
+    # --- cycles ---
+    n = int(args.cycles_per_day * 1.5) + 10
+    runtimes = np.clip(rng.lognormal(np.log(args.runtime_mean_sec), 0.5, n), 3, 1800).astype(np.int64)
+    gaps = rng.exponential(gap_mean, n)
+    starts = np.cumsum(gaps + np.concatenate(([0], runtimes[:-1])))
+    keep = starts + runtimes < WORK_SECONDS
+    runtimes, starts = runtimes[keep], _work_to_clock(starts[keep])
+
+    cycles, states = [], []
+    runtime_total = 0
+    for i, (start, runtime) in enumerate(zip(starts.tolist(), runtimes.tolist()), start=1):
+        start_time = midnight + timedelta(seconds=start)
+        stop_time = start_time + timedelta(seconds=runtime)
+        cycles.append({"machine_id": machine_id, "date": day, "cycle_no": i, "start_time": start_time,
+                       "stop_time": stop_time, "runtime_sec": runtime})
+        if with_state:
+            states.append({"machine_id": machine_id, "timestamp": start_time.astimezone(timezone.utc), "state": "RUN",
+                           "current_cycle": i - 1, "today_runtime_sec": runtime_total})
+            states.append({"machine_id": machine_id, "timestamp": stop_time.astimezone(timezone.utc), "state": "STOP",
+                           "current_cycle": i, "today_runtime_sec": runtime_total + runtime})
+        runtime_total += runtime
+
+    # --- downtime ---
+    downtimes = []
+    count = rng.poisson(args.downtimes_per_day)
+    reasons = rng.choice(list(DOWNTIME_REASONS), size=count, p=list(DOWNTIME_REASONS.values()))
+    for reason, offset, duration in zip(reasons.tolist(),
+                                        rng.uniform(0, WORK_SECONDS, count).tolist(),
+                                        np.clip(rng.lognormal(np.log(900), 0.8, count), 60, 4 * 3600).tolist()):
+        # เก็บเป็น UTC แบบเดียวกับ routers/downtime.py
+        start_time = (midnight + timedelta(seconds=int(_work_to_clock(np.array([offset]))[0]))).astimezone(timezone.utc)
+        downtimes.append({"machine_id": machine_id, "date": day, "downtime_reason": reason,
+                          "start_time": start_time, "end_time": start_time + timedelta(seconds=int(duration)),
+                          "duration_sec": int(duration), "is_active": False})
+    return cycles, downtimes, states
+
+
+def _ensure_partitions(start_date: date, end_date: date):
+    with engine.begin() as conn:
+        if conn.dialect.name != "postgresql":
+            return
+        for model in (CycleLog, DowntimeLog):
+            if not is_partitioned(conn, model.__tablename__):
+                continue
+            month = start_date.replace(day=1)
+            while month <= end_date:
+                create_month_partition(conn, model.__tablename__, month)
+                month = add_months(month, 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-load synthetic production data for load testing")
+    parser.add_argument("--years", type=float, default=3, help="จำนวนปีย้อนหลัง (ถ้าไม่ระบุ --start)")
+    parser.add_argument("--start", type=date.fromisoformat, help="วันเริ่ม (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="วันสิ้นสุด (YYYY-MM-DD) ค่าเริ่มต้น = เมื่อวาน")
+    parser.add_argument("--machines", type=int, default=1, help="จำนวนเครื่อง (เครื่องแรก = MACHINE_ID)")
+    parser.add_argument("--cycles-per-day", type=int, default=300)
+    parser.add_argument("--runtime-mean-sec", type=float, default=60)
+    parser.add_argument("--downtimes-per-day", type=float, default=4)
+    parser.add_argument("--state-days", type=int, default=MACHINE_STATE_RETENTION_DAYS,
+                        help="สร้าง machine_state เฉพาะกี่วันล่าสุด")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--force", action="store_true", help="เพิ่มข้อมูลแม้ช่วงวันที่นี้มีข้อมูลอยู่แล้ว")
+    args = parser.parse_args(argv)
+
+    end_date = args.end or date.today() - timedelta(days=1)
+    start_date = args.start or end_date - timedelta(days=int(args.years * 365) - 1)
+    if start_date > end_date:
+        parser.error("--start must be before --end")
+    state_from = end_date - timedelta(days=args.state_days - 1)
+    machine_ids = [DEFAULT_MACHINE_ID] + [f"machine-{i:02d}" for i in range(2, args.machines + 1)]
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count(CycleLog.id)).where(
+            CycleLog.date.between(start_date, end_date), CycleLog.machine_id.in_(machine_ids)
+        )).scalar()
+    if existing and not args.force:
+        parser.error(f"{existing} cycle_log row(s) already exist in {start_date} → {end_date} (use --force)")
+
+    db = SessionLocal()
+    try:
+        _ensure_partitions(start_date, end_date)
+        rng = np.random.default_rng(args.seed)
+        print(f"🏭 Generating {start_date} → {end_date} for {len(machine_ids)} machine(s)")
+        t0 = time.perf_counter()
+        totals = {"cycle_log": 0, "downtime_log": 0, "machine_state": 0}
+
+        # ทีละเดือน = 1 transaction
+        month = start_date.replace(day=1)
+        while month <= end_date:
+            cycles, downtimes, states = [], [], []
+            day = max(month, start_date)
+            month_end = min(add_months(month, 1) - timedelta(days=1), end_date)
+            while day <= month_end:
+                if day.weekday() != 6:  # หยุดวันอาทิตย์
+                    for machine_id in machine_ids:
+                        c, d, s = generate_day(rng, day, machine_id, args, day >= state_from)
+                        cycles += c
+                        downtimes += d
+                        states += s
+                day += timedelta(days=1)
+            with engine.begin() as conn:
+                for model, rows in ((CycleLog, cycles), (DowntimeLog, downtimes), (MachineState, states)):
+                    if rows:
+                        conn.execute(insert(model.__table__), rows)
+                        totals[model.__tablename__] += len(rows)
+            print(f"  {month:%Y-%m}: {len(cycles)} cycles, {len(downtimes)} downtimes, {len(states)} states")
+            month = add_months(month, 1)
+
+        print("🔁 Computing daily_summary ...")
+        days = rollup_service.recompute_daily_summaries(db, start_date, end_date)
+        print(f"✅ Inserted {totals} + {days} daily_summary row(s) in {time.perf_counter() - t0:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
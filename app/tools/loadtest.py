@@ -0,0 +1,171 @@
+"""
+Load test ของ API หลัก: ยิงพร้อมกันหลาย poller ต่อ endpoint แล้วสรุป latency p50/p95/p99 + throughput
+(ใช้คู่กับข้อมูลจาก app.tools.generate_data)
+
+- poller แต่ละตัวยิงต่อเนื่อง (หรือเว้น --interval วินาที แบบ dashboard) เป็นเวลา --duration วินาที
+- พารามิเตอร์ (วันที่ / ปี) สุ่มจากช่วง --start..--end ด้วย --seed เดิม -> รันซ้ำได้ผลเทียบกันได้
+- --json บันทึกผล, --baseline เทียบกับผลเดิม: p95 ช้ากว่าเดิมเกิน --max-regression % -> exit code 1
+
+ตัวอย่าง:
+    python -m app.tools.loadtest --base-url http://127.0.0.1:8000 --start 2023-01-01 --end 2025-12-31
+    python -m app.tools.loadtest --concurrency 8 --duration 60 --json after.json --baseline before.json
+    python -m app.tools.loadtest --endpoints cycles summary --interval 2
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import httpx
+import numpy as np
+
+from ..models import DEFAULT_MACHINE_ID
+
+
+def _working_day(rng: random.Random, start: date, end: date) -> date:
+    while True:
+        day = start + timedelta(days=rng.randrange((end - start).days + 1))
+        if day.weekday() != 6:
+            return day
+
+
+# ชื่อ -> (path, สร้าง query params)
+ENDPOINTS = {
+    "summary": ("/api/summary", lambda rng, a: {"date": _working_day(rng, a.start, a.end).isoformat(),
+                                                "machine_id": a.machine_id}),
+    "summary_today": ("/api/summary/today", lambda rng, a: {"machine_id": a.machine_id}),
+    "cycles": ("/api/cycles", lambda rng, a: {"date": _working_day(rng, a.start, a.end).isoformat(),
+                                              "machine_id": a.machine_id}),
+    "downtime_history": ("/api/downtime/history", lambda rng, a: _history_params(rng, a)),
+    "downtime_top_today": ("/api/downtime/top-today", lambda rng, a: {"machine_id": a.machine_id}),
+    "downtime_export_yearly": ("/api/downtime/export", lambda rng, a: {
+        "report_type": "yearly", "year": rng.randint(a.start.year, a.end.year), "machine_id": a.machine_id}),
+}
+# endpoint หนัก ใช้ poller น้อยกว่า (--export-concurrency)
+HEAVY_ENDPOINTS = {"downtime_export_yearly"}
+
+
+def _history_params(rng: random.Random, args) -> dict:
+    start = _working_day(rng, args.start, args.end)
+    return {"start_date": start.isoformat(), "end_date": min(start + timedelta(days=30), args.end).isoformat(),
+            "limit": 100, "machine_id": args.machine_id}
+
+
+async def _poller(client: httpx.AsyncClient, name: str, rng: random.Random, args,
+                  warmup_until: float, stop_at: float, samples: list, errors: list):
+    path, make_params = ENDPOINTS[name]
+    while True:
+        t0 = time.perf_counter()
+        if t0 >= stop_at:
+            return
+        try:
+            response = await client.get(path, params=make_params(rng, args))
+            await response.aread()
+            ok = response.status_code < 400 or response.status_code == 404  # 404 = วันที่ไม่มีข้อมูล
+        except httpx.HTTPError:
+            ok = False
+        elapsed = time.perf_counter() - t0
+        if t0 >= warmup_until:
+            samples.append(elapsed)
+            if not ok:
+                errors.append(elapsed)
+        if args.interval:
+            await asyncio.sleep(max(args.interval - elapsed, 0))
+
+
+async def run(args) -> dict:
+    results = {}
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        now = time.perf_counter()
+        warmup_until = now + args.warmup
+        stop_at = warmup_until + args.duration
+        tasks, collected = [], {}
+        for name in args.endpoints:
+            samples, errors = [], []
+            collected[name] = (samples, errors)
+            pollers = args.export_concurrency if name in HEAVY_ENDPOINTS else args.concurrency
+            for i in range(pollers):
+                rng = random.Random(f"{args.seed}:{name}:{i}")
+                tasks.append(_poller(client, name, rng, args, warmup_until, stop_at, samples, errors))
+        await asyncio.gather(*tasks)
+
+    for name, (samples, errors) in collected.items():
+        latencies = np.array(samples) * 1000
+        results[name] = {
+            "requests": len(samples),
+            "errors": len(errors),
+            "throughput_rps": round(len(samples) / args.duration, 2),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 1) if len(samples) else None,
+            "p95_ms": round(float(np.percentile(latencies, 95)), 1) if len(samples) else None,
+            "p99_ms": round(float(np.percentile(latencies, 99)), 1) if len(samples) else None,
+            "max_ms": round(float(latencies.max()), 1) if len(samples) else None,
+        }
+    return results
+
+
+def _regressions(results: dict, baseline: dict, max_regression: float) -> list:
+    found = []
+    for name, result in results.items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before or not before.get("p95_ms") or result["p95_ms"] is None:
+            continue
+        change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+        if change > max_regression:
+            found.append(f"{name}: p95 {before['p95_ms']} → {result['p95_ms']} ms (+{change:.0f}%)")
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent load test of the history / dashboard API")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument("--start", type=date.fromisoformat, help="วันแรกของข้อมูล ค่าเริ่มต้น = 1 ปีก่อน --end")
+    parser.add_argument("--end", type=date.fromisoformat, help="วันสุดท้ายของข้อมูล ค่าเริ่มต้น = เมื่อวาน")
+    parser.add_argument("--machine-id", default=DEFAULT_MACHINE_ID)
+    parser.add_argument("--concurrency", type=int, default=4, help="จำนวน poller ต่อ endpoint")
+    parser.add_argument("--export-concurrency", type=int, default=1, help="จำนวน poller ของ yearly export")
+    parser.add_argument("--duration", type=float, default=30, help="วินาทีที่วัดผล (ไม่รวม warmup)")
+    parser.add_argument("--warmup", type=float, default=3, help="วินาทีแรกที่ไม่นับ")
+    parser.add_argument("--interval", type=float, default=0, help="เว้นระหว่าง request ของแต่ละ poller (0 = ยิงต่อเนื่อง)")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="บันทึกผลเป็นไฟล์ JSON")
+    parser.add_argument("--baseline", help="ไฟล์ JSON ของรอบก่อน สำหรับเทียบ p95")
+    parser.add_argument("--max-regression", type=float, default=20, help="p95 ช้าลงได้ไม่เกินกี่ %%")
+    args = parser.parse_args(argv)
+
+    args.end = args.end or date.today() - timedelta(days=1)
+    args.start = args.start or args.end - timedelta(days=364)
+    if args.start > args.end:
+        parser.error("--start must be before --end")
+
+    print(f"🚦 {len(args.endpoints)} endpoint(s) x {args.concurrency} poller(s), {args.duration:.0f}s "
+          f"against {args.base_url}", file=sys.stderr)
+    results = asyncio.run(run(args))
+
+    print(f"{'endpoint':<24} {'req':>7} {'err':>5} {'req/s':>8} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'max_ms':>8}")
+    for name, r in results.items():
+        cells = [f"{r[k]:>8.1f}" if r[k] is not None else f"{'-':>8}" for k in ("p50_ms", "p95_ms", "p99_ms", "max_ms")]
+        print(f"{name:<24} {r['requests']:>7d} {r['errors']:>5d} {r['throughput_rps']:>8.2f} {' '.join(cells)}")
+
+    if args.json:
+        report = {"base_url": args.base_url, "concurrency": args.concurrency, "duration": args.duration,
+                  "start": args.start.isoformat(), "end": args.end.isoformat(), "endpoints": results}
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = _regressions(results, json.load(f), args.max_regression)
+        if regressions:
+            print("❌ Regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"✅ No p95 regression over {args.max_regression:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
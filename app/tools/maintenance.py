@@ -0,0 +1,37 @@
+"""
+งานดูแล DB (สร้าง partition ล่วงหน้า + archive เดือนเก่า + rollup/ลบ machine_state เก่า + ลบ trace เก่า)
+ปกติรันอัตโนมัติจาก maintenance_loop ใน main.py แต่สั่งเองผ่าน cron ได้
+(ตั้ง MAINTENANCE_INTERVAL_SEC=0 เพื่อปิด loop แล้วใช้ cron แทน):
+
+    python -m app.tools.maintenance [--retain-days 90] [--migrate] [--skip-archive] [--skip-traces]
+"""
+import argparse
+
+from ..database import SessionLocal, engine
+from ..migrations import run_migrations
+from ..services import retention_service
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Partition upkeep, archive and retention")
+    parser.add_argument("--retain-days", type=int, default=retention_service.MACHINE_STATE_RETENTION_DAYS,
+                        help="เก็บ raw machine_state ย้อนหลังกี่วัน")
+    parser.add_argument("--migrate", action="store_true", help="รัน schema migrations ที่ค้างอยู่ก่อน")
+    parser.add_argument("--skip-archive", action="store_true", help="ไม่ archive เดือนเก่าเป็น Parquet")
+    parser.add_argument("--skip-traces", action="store_true", help="ไม่ลบ detection trace เก่า")
+    args = parser.parse_args(argv)
+
+    if args.migrate:
+        run_migrations(engine)
+
+    db = SessionLocal()
+    try:
+        deleted = retention_service.run_maintenance(db, args.retain_days, archive=not args.skip_archive,
+                                                    traces=not args.skip_traces)
+        print(f"🧹 machine_state: {deleted} raw row(s) rolled up and removed")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Rebuild ตาราง daily_summary ใหม่จาก cycle_log + downtime_log
+
+ตัวอย่าง:
+    python -m app.tools.recompute_summaries                      # ทุกวันที่มีข้อมูล
+    python -m app.tools.recompute_summaries --start 2024-01-01 --end 2024-12-31
+    python -m app.tools.recompute_summaries --shift-seconds 28800  # เปลี่ยนความยาวกะ
+"""
+import argparse
+import time
+from datetime import date
+
+from ..database import SessionLocal
+from ..services import rollup_service
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute DailySummary from CycleLog / DowntimeLog")
+    parser.add_argument("--start", type=date.fromisoformat, help="วันเริ่ม (YYYY-MM-DD) ค่าเริ่มต้น = วันแรกที่มีข้อมูล")
+    parser.add_argument("--end", type=date.fromisoformat, help="วันสิ้นสุด (YYYY-MM-DD) ค่าเริ่มต้น = วันล่าสุดที่มีข้อมูล")
+    parser.add_argument("--chunk-days", type=int, default=31, help="จำนวนวันต่อ 1 transaction")
+    parser.add_argument("--shift-seconds", type=float, default=rollup_service.SHIFT_SECONDS, help="ความยาวกะ (วินาที) ที่ใช้คิด Availability")
+    args = parser.parse_args(argv)
+    if args.chunk_days < 1:
+        parser.error("--chunk-days must be at least 1")
+
+    db = SessionLocal()
+    try:
+        start_date, end_date = args.start, args.end
+        if start_date is None or end_date is None:
+            data_range = rollup_service.get_data_date_range(db)
+            if data_range is None:
+                print("ℹ️ No cycle/downtime data found, nothing to recompute")
+                return
+            start_date = start_date or data_range[0]
+            end_date = end_date or data_range[1]
+
+        print(f"🔁 Recomputing daily_summary {start_date} → {end_date} (chunk={args.chunk_days} days)")
+        t0 = time.perf_counter()
+        written = rollup_service.recompute_daily_summaries(
+            db, start_date, end_date,
+            chunk_days=args.chunk_days,
+            shift_seconds=args.shift_seconds
+        )
+        print(f"✅ {written} day(s) written in {time.perf_counter() - t0:.2f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
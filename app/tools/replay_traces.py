@@ -0,0 +1,75 @@
+"""
+Replay detection trace ย้อนหลังด้วยพารามิเตอร์หลายชุด แล้วเทียบจำนวน cycle / availability
+(ดู vision/replay.py)
+
+ตัวอย่าง:
+    python -m app.tools.replay_traces                                   # ค่าที่ใช้อยู่ ทุกวันที่มี trace
+    python -m app.tools.replay_traces --start 2024-01-01 --end 2024-03-31 \\
+        --stop-threshold 5 10 15 20 --frames 1 2 3 5 --conf 0.4 0.5 0.6
+    python -m app.tools.replay_traces --csv sweep.csv
+"""
+import argparse
+import csv
+import sys
+import time
+from datetime import date
+
+from ..config import DEFAULT_MACHINE_ID, SHIFT_SECONDS
+from ..vision import replay, trace_store
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("must be >= 1")
+    return number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay detection traces over a parameter grid")
+    parser.add_argument("--start", type=date.fromisoformat, help="วันเริ่ม (YYYY-MM-DD) ค่าเริ่มต้น = วันแรกที่มี trace")
+    parser.add_argument("--end", type=date.fromisoformat, help="วันสิ้นสุด (YYYY-MM-DD) ค่าเริ่มต้น = วันล่าสุดที่มี trace")
+    parser.add_argument("--machine-id", default=DEFAULT_MACHINE_ID, help="รหัสเครื่อง")
+    parser.add_argument("--trace-dir", default=trace_store.TRACE_DIR, help="โฟลเดอร์ของ trace")
+    parser.add_argument("--conf", type=float, nargs="+", default=[replay.DEFAULT_CONF_THRESHOLD],
+                        help="conf_threshold ที่จะลอง")
+    parser.add_argument("--frames", type=_positive_int, nargs="+", default=[replay.DEFAULT_REQUIRED_FRAMES],
+                        help="required_consecutive_frames ที่จะลอง")
+    parser.add_argument("--stop-threshold", type=float, nargs="+", default=[replay.DEFAULT_STOP_THRESHOLD],
+                        help="stop_threshold (วินาที) ที่จะลอง")
+    parser.add_argument("--shift-seconds", type=float, default=SHIFT_SECONDS, help="ความยาวกะ (วินาที) ที่ใช้คิด Availability")
+    parser.add_argument("--csv", help="บันทึกผลเป็นไฟล์ CSV ('-' = stdout)")
+    args = parser.parse_args(argv)
+
+    days = trace_store.list_days(args.machine_id, args.trace_dir, args.start, args.end)
+    if not days:
+        print("ℹ️ No detection traces found, nothing to replay")
+        return
+
+    combos = len(args.conf) * len(args.frames) * len(args.stop_threshold)
+    print(f"🔁 Replaying {len(days)} day(s) ({days[0]} → {days[-1]}) x {combos} parameter set(s)", file=sys.stderr)
+    t0 = time.perf_counter()
+    results = replay.sweep(days, args.conf, args.frames, args.stop_threshold,
+                           machine_id=args.machine_id, root=args.trace_dir, shift_seconds=args.shift_seconds)
+    print(f"✅ Done in {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+
+    if args.csv:
+        out = sys.stdout if args.csv == "-" else open(args.csv, "w", newline="")
+        try:
+            writer = csv.writer(out)
+            writer.writerow(replay.ReplayResult._fields)
+            writer.writerows(results)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        return
+
+    print(f"{'conf':>6} {'frames':>6} {'stop_s':>7} {'days':>5} {'cycles':>8} {'cyc/day':>8} {'runtime_h':>10} {'avail_%':>8}")
+    for r in results:
+        print(f"{r.conf_threshold:>6.2f} {r.required_consecutive_frames:>6d} {r.stop_threshold:>7.1f} "
+              f"{r.days:>5d} {r.total_cycles:>8d} {r.total_cycles / r.days:>8.1f} "
+              f"{r.total_runtime_sec / 3600:>10.1f} {r.availability:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+ภาพล่าสุดที่ vision_loop ประมวลผล สำหรับ snapshot / MJPEG preview (routers/preview.py)
+
+- vision_loop แค่ publish() reference ของเฟรม + box (ไม่ copy ไม่ encode) -> ฝั่ง inference ไม่เสียอะไรเพิ่ม
+- encode JPEG เกิดฝั่งคนดูเท่านั้น (ตอนมีคนเปิด snapshot / stream) และ cache ผลไว้
+  คนดูหลายคนใช้ JPEG ก้อนเดียวกัน, encode ใหม่ไม่เกิน PREVIEW_MAX_FPS ครั้ง/วินาที ต่อแบบ (มี/ไม่มี box)
+"""
+import os
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+PREVIEW_MAX_FPS = float(os.getenv("PREVIEW_MAX_FPS", 5))
+PREVIEW_JPEG_QUALITY = int(os.getenv("PREVIEW_JPEG_QUALITY", 70))
+PREVIEW_MAX_VIEWERS = int(os.getenv("PREVIEW_MAX_VIEWERS", 4))
+
+# สี box (BGR) ตาม class
+_BOX_COLORS = {"on": (0, 165, 255), "off": (255, 200, 0)}
+_DEFAULT_BOX_COLOR = (200, 200, 200)
+
+
+class PreviewHub:
+    def __init__(self, max_fps: float = PREVIEW_MAX_FPS, quality: int = PREVIEW_JPEG_QUALITY,
+                 max_viewers: int = PREVIEW_MAX_VIEWERS):
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.quality = quality
+        self.max_viewers = max_viewers
+        self.viewers = 0
+        self._lock = threading.Lock()
+        self._frame = None
+        self._boxes: List[dict] = []
+        self._captured_at = 0.0
+        self._seq = 0
+        # with_boxes -> (seq, encoded_at, captured_at, jpeg)
+        self._cache = {}
+
+    # --- ฝั่ง vision_loop ---
+    def publish(self, frame: np.ndarray, boxes: List[dict], captured_at: float):
+        """เก็บ reference ของเฟรมล่าสุด (ห้ามแก้ไข frame หลังเรียก)"""
+        with self._lock:
+            self._frame = frame
+            self._boxes = boxes
+            self._captured_at = captured_at
+            self._seq += 1
+
+    # --- ฝั่งคนดู ---
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def acquire_viewer(self) -> bool:
+        with self._lock:
+            if self.viewers >= self.max_viewers:
+                return False
+            self.viewers += 1
+            return True
+
+    def release_viewer(self):
+        with self._lock:
+            self.viewers = max(self.viewers - 1, 0)
+
+    def jpeg(self, with_boxes: bool = True) -> Optional[Tuple[int, float, bytes]]:
+        """
+        (seq, captured_at, jpeg bytes) ของเฟรมล่าสุด หรือ None ถ้ายังไม่มีเฟรม
+        encode ซ้ำเฉพาะเมื่อมีเฟรมใหม่และ JPEG เดิมเก่ากว่า min_interval
+        """
+        with self._lock:
+            frame, boxes, captured_at, seq = self._frame, self._boxes, self._captured_at, self._seq
+            cached = self._cache.get(with_boxes)
+        if frame is None:
+            return None
+
+        now = time.monotonic()
+        if cached and (cached[0] == seq or now - cached[1] < self.min_interval):
+            return cached[0], cached[2], cached[3]
+
+        image = draw_boxes(frame, boxes) if with_boxes and boxes else frame
+        ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return None
+        jpeg = buf.tobytes()
+        with self._lock:
+            self._cache[with_boxes] = (seq, now, captured_at, jpeg)
+        return seq, captured_at, jpeg
+
+
+def draw_boxes(frame: np.ndarray, boxes: List[dict]) -> np.ndarray:
+    """วาด box ลงบนสำเนาของเฟรม (เฟรมต้นฉบับไม่ถูกแก้)"""
+    image = frame.copy()
+    for box in boxes:
+        x1, y1, x2, y2 = (int(v) for v in box["xyxy"])
+        color = _BOX_COLORS.get(box["class_name"], _DEFAULT_BOX_COLOR)
+        cv2.rectangle(image, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(image, f"{box['class_name']} {box['conf']:.2f}", (x1, max(y1 - 6, 12)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1, cv2.LINE_AA)
+    return image
+
+
+# ตัวเดียวทั้งแอป (เหมือน machine_brain)
+preview_hub = PreviewHub()
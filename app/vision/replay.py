@@ -0,0 +1,148 @@
+"""
+จำลอง SparkDetector (confirmation) + MachineStateMachine (RUN/STOP) ย้อนหลังจาก detection trace
+ด้วย NumPy ทั้งวันในครั้งเดียว (ไม่วน Python ทีละเฟรม) เพื่อเทียบผลของพารามิเตอร์หลายชุด
+
+ตรรกะเดียวกับของจริง:
+- เฟรมที่ on_conf >= conf_threshold = เจอ 'on'
+- spark ยืนยันเมื่อเจอ 'on' ต่อเนื่องครบ required_consecutive_frames (run-length ของเฟรม 'on')
+- RUN เริ่มที่ spark แรก, STOP เมื่อมี update แรกที่ห่างจาก spark ล่าสุดเกิน stop_threshold
+  ช่วงที่ไม่มีเฟรม: พัก / นอกเวลางาน vision_loop ส่ง False ทุก OFFLINE_TICK_SEC
+  ส่วนในเวลางาน (เช่น กล้อง reconnect) ไม่มี update จนกว่าจะได้เฟรมถัดไป
+- record ที่ sampled (vision/sampler.py ข้ามเฟรมกล้องไปก่อนหน้า) ระหว่างช่วง 'on' ต่อเนื่อง:
+  ถือว่าเฟรมที่ข้ามไปเป็น 'on' ด้วย -> ยืนยัน spark ได้ทันที และไม่ตัด STOP ในช่องว่างนั้น
+  (ที่พารามิเตอร์เดียวกับตอนบันทึก sampler burst ทุกช่วงที่ยังยืนยันไม่ครบ ผลจึงตรงกับของจริง)
+- แต่ละวันจำลองแยกกัน (เริ่มวันด้วย STOP)
+"""
+import itertools
+from collections import namedtuple
+from datetime import date, datetime, time as dtime
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from ..config import BREAKS, DEFAULT_MACHINE_ID, END_TIME, SHIFT_SECONDS, START_TIME, calc_availability
+from . import trace_store
+
+OFFLINE_TICK_SEC = 1.0
+
+# ค่าที่ใช้งานจริงตอนนี้ (SparkDetector / MachineStateMachine)
+DEFAULT_CONF_THRESHOLD = 0.5
+DEFAULT_REQUIRED_FRAMES = 3
+DEFAULT_STOP_THRESHOLD = 10.0
+
+ReplayResult = namedtuple("ReplayResult", [
+    "conf_threshold", "required_consecutive_frames", "stop_threshold",
+    "days", "total_cycles", "total_runtime_sec", "availability"
+])
+
+
+def confirmed_sparks(on_conf: np.ndarray, conf_threshold: float, required_frames: int,
+                     sampled: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    mask ของเฟรมที่ SparkDetector คืน spark_detected=True
+    = เฟรมตั้งแต่ตัวที่ required_frames ของแต่ละช่วง 'on' ต่อเนื่อง จนจบช่วง
+    sampled: ช่วงที่เจอ record sampled ก่อนครบ required_frames ยืนยันตั้งแต่ record นั้น
+    """
+    detected = on_conf >= conf_threshold
+    edges = np.diff(np.concatenate(([0], detected.view(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+    confirm_at = run_starts + required_frames - 1
+    if sampled is not None:
+        # record sampled ตัวแรกในช่วง (ไม่นับตัวแรกของช่วง: ก่อนหน้านั้นเป็น 'off')
+        gaps = np.flatnonzero(detected & (sampled != 0))
+        first_gap = np.searchsorted(gaps, run_starts, side="right")
+        gap_at = np.where(first_gap < gaps.size, gaps[np.minimum(first_gap, gaps.size - 1)], run_ends)
+        confirm_at = np.minimum(confirm_at, gap_at)
+    long_enough = confirm_at < run_ends
+
+    # +1 ที่เฟรมที่ยืนยันได้, -1 ที่จบช่วง -> cumsum > 0 คือเฟรมที่ยืนยันแล้ว (index ไม่ซ้ำกันเสมอ)
+    marks = np.zeros(len(on_conf) + 1, dtype=np.int32)
+    marks[confirm_at[long_enough]] += 1
+    marks[run_ends[long_enough]] -= 1
+    return np.cumsum(marks[:-1]) > 0
+
+
+def _seconds(t: dtime) -> float:
+    return t.hour * 3600 + t.minute * 60 + t.second + t.microsecond / 1e6
+
+
+def offline_from(times: np.ndarray, day_start: float) -> np.ndarray:
+    """
+    เวลาแรก (epoch) ที่ >= times และอยู่นอกเวลางาน (vision_loop เริ่มส่ง tick)
+    day_start = epoch ของเที่ยงคืน (local) ของวันนั้น
+    """
+    # ช่วงเวลางานระหว่างช่วงพัก (วินาทีนับจากเที่ยงคืน)
+    bounds = [_seconds(START_TIME)]
+    for b_start, b_end in sorted(BREAKS):
+        bounds += [_seconds(b_start), _seconds(b_end)]
+    bounds.append(_seconds(END_TIME))
+    starts, ends = np.array(bounds[::2]), np.array(bounds[1::2])
+
+    seconds = times - day_start
+    period = np.maximum(np.searchsorted(starts, seconds, side="right") - 1, 0)
+    working = (seconds >= starts[period]) & (seconds < ends[period])
+    return np.where(working, day_start + ends[period], times)
+
+
+def simulate_cycles(timestamps: np.ndarray, sparks: np.ndarray, stop_threshold: float,
+                    sampled: Optional[np.ndarray] = None):
+    """
+    (start_times, stop_times) ของแต่ละ cycle จาก timestamp ของทุกเฟรม + mask ของ spark
+    sampled: spark ที่ record ถัดไปเป็น spark แบบ sampled ไม่ตัด STOP ระหว่างสองเฟรมนั้น
+    """
+    spark_index = np.flatnonzero(sparks)
+    spark_times = timestamps[spark_index]
+    if spark_times.size == 0:
+        return spark_times, spark_times
+
+    # update แรกหลัง spark ที่ห่างเกิน stop_threshold: เฟรมถัดไป หรือ tick แรกนอกเวลางาน
+    deadline = spark_times + stop_threshold
+    after = np.searchsorted(timestamps, deadline, side="right")
+    next_frame = np.where(after < timestamps.size, timestamps[np.minimum(after, timestamps.size - 1)], np.inf)
+    day_start = datetime.combine(datetime.fromtimestamp(timestamps[0]).date(), dtime()).timestamp()
+    stop_at = np.minimum(next_frame, offline_from(deadline, day_start) + OFFLINE_TICK_SEC)
+
+    # cycle จบหลัง spark นี้ ถ้าเครื่องถูกตัดเป็น STOP ก่อน spark ถัดไป
+    next_spark = np.append(spark_times[1:], np.inf)
+    ends = stop_at < next_spark
+    if sampled is not None:
+        following = np.minimum(spark_index + 1, timestamps.size - 1)
+        bridged = (spark_index + 1 < timestamps.size) & sparks[following] & (sampled[following] != 0)
+        ends &= ~bridged
+    starts = np.concatenate(([True], ends[:-1]))
+    return spark_times[starts], stop_at[ends]
+
+
+def sweep(days: Iterable[date], conf_thresholds: List[float], required_frames: List[int],
+          stop_thresholds: List[float], machine_id: str = DEFAULT_MACHINE_ID,
+          root: str = trace_store.TRACE_DIR, shift_seconds: float = SHIFT_SECONDS) -> List[ReplayResult]:
+    """
+    ลองทุกชุดพารามิเตอร์กับ trace ทุกวันในช่วง
+    Availability = ค่าเฉลี่ยรายวัน (สูตรเดียวกับ daily_summary)
+    """
+    combos = list(itertools.product(conf_thresholds, required_frames, stop_thresholds))
+    cycles = {combo: 0 for combo in combos}
+    runtime = {combo: 0 for combo in combos}
+    availability = {combo: 0.0 for combo in combos}
+
+    loaded = 0
+    for day in days:
+        trace = trace_store.load_day(day, machine_id, root)
+        if trace["timestamp"].size == 0:
+            continue
+        loaded += 1
+        for conf, frames in itertools.product(conf_thresholds, required_frames):
+            sparks = confirmed_sparks(trace["on_conf"], conf, frames, trace["sampled"])
+            for stop in stop_thresholds:
+                starts, stops = simulate_cycles(trace["timestamp"], sparks, stop, trace["sampled"])
+                day_runtime = int(np.trunc(stops - starts).sum())
+                cycles[(conf, frames, stop)] += len(starts)
+                runtime[(conf, frames, stop)] += day_runtime
+                availability[(conf, frames, stop)] += calc_availability(day_runtime, shift_seconds)
+
+    return [
+        ReplayResult(conf, frames, stop, loaded, cycles[(conf, frames, stop)], runtime[(conf, frames, stop)],
+                     round(availability[(conf, frames, stop)] / loaded, 2) if loaded else 0.0)
+        for conf, frames, stop in combos
+    ]
@@ -0,0 +1,74 @@
+"""
+เลือกความถี่ inference ตามสถานะเครื่อง แทนการประมวลผลทุกเฟรมตลอดเวลา
+
+- STOP (ยังไม่เห็น spark): ตรวจทุก SAMPLER_IDLE_INTERVAL_SEC
+  -> เครื่องเริ่มเดินแล้วรู้ช้าสุด ~ค่านี้ + เวลายืนยัน required_consecutive_frames เฟรม
+- เจอ 'on' แต่ยังยืนยันไม่ครบ (ช่วงที่อาจเปลี่ยนสถานะ): เต็มความเร็ว (SAMPLER_BURST_INTERVAL_SEC)
+- RUN ที่ spark ต่อเนื่อง: ตรวจทุก SAMPLER_RUN_INTERVAL_SEC
+  -> stop_time ของ cycle คลาดจากจริงไม่เกินค่านี้ (last_spark_time ไม่เก่ากว่านี้)
+- RUN ที่เหลือเวลาก่อนครบ stop_threshold ไม่ถึง SAMPLER_GUARD_SEC: เต็มความเร็วอีกครั้ง
+  ให้ spark ที่กลับมามีเวลายืนยันครบก่อนถูกตัดเป็น STOP
+- SAMPLER_ENABLED=0 = เต็มความเร็วตลอด (แบบเดิม)
+- เฟรมที่ได้หลังรอแบบ idle / run ถูกบันทึกใน trace เป็น sampled (ข้ามเฟรมกล้องไป) ให้ replay รู้ว่าไม่ใช่เฟรมติดกัน
+"""
+import os
+import time
+from collections import Counter
+
+SAMPLER_ENABLED = os.getenv("SAMPLER_ENABLED", "1") == "1"
+SAMPLER_IDLE_INTERVAL_SEC = float(os.getenv("SAMPLER_IDLE_INTERVAL_SEC", 1.0))
+SAMPLER_RUN_INTERVAL_SEC = float(os.getenv("SAMPLER_RUN_INTERVAL_SEC", 1.0))
+SAMPLER_BURST_INTERVAL_SEC = float(os.getenv("SAMPLER_BURST_INTERVAL_SEC", 0.01))
+SAMPLER_GUARD_SEC = float(os.getenv("SAMPLER_GUARD_SEC", 3.0))
+
+IDLE, RUN, BURST = "idle", "run", "burst"
+
+
+class FrameScheduler:
+    def __init__(self):
+        self.brain = None
+        self.detector = None
+        self.mode = BURST
+        self.interval = SAMPLER_BURST_INTERVAL_SEC
+        self.frames = Counter()  # จำนวนเฟรมที่ประมวลผล แยกตาม mode
+
+    def attach(self, brain, detector):
+        """เรียกจาก inference_loop ทุกครั้งที่เริ่ม (detector ตัวใหม่)"""
+        self.brain = brain
+        self.detector = detector
+
+    @property
+    def sampled(self) -> bool:
+        """เฟรมถัดไปมาหลังการรอที่ข้ามเฟรมกล้องไปหรือไม่ (mode ของการรอครั้งล่าสุด)"""
+        return self.mode != BURST
+
+    def next_interval(self, now: float = None) -> float:
+        """เวลาที่รอก่อนหยิบเฟรมถัดไป (เรียกหลังประมวลผลเฟรมแต่ละครั้ง)"""
+        self.frames[self.mode] += 1
+        now = now or time.time()
+        pending = 0 < self.detector.consecutive_sparks < self.detector.required_consecutive_frames
+        if not SAMPLER_ENABLED or pending:
+            mode, interval = BURST, SAMPLER_BURST_INTERVAL_SEC
+        elif self.brain.current_state == "RUN":
+            time_left = self.brain.last_spark_time + self.brain.stop_threshold - now
+            if time_left <= SAMPLER_GUARD_SEC:
+                mode, interval = BURST, SAMPLER_BURST_INTERVAL_SEC
+            else:
+                mode, interval = RUN, min(SAMPLER_RUN_INTERVAL_SEC, time_left - SAMPLER_GUARD_SEC)
+        else:
+            mode, interval = IDLE, SAMPLER_IDLE_INTERVAL_SEC
+        self.mode = mode
+        self.interval = max(interval, SAMPLER_BURST_INTERVAL_SEC)
+        return self.interval
+
+    def status(self) -> dict:
+        return {
+            "enabled": SAMPLER_ENABLED,
+            "mode": self.mode,
+            "interval_sec": self.interval,
+            "frames": dict(self.frames),
+        }
+
+
+# ตัวเดียวทั้งแอป (เหมือน machine_brain)
+frame_scheduler = FrameScheduler()
@@ -0,0 +1,305 @@
+"""
+Shadow candidate model: ลองโมเดลใหม่คู่กับโมเดล production บนภาพจริง ก่อน promote
+
+ตั้งค่าใน MODEL_CONFIG_PATH (JSON, แก้ได้ขณะรัน - อ่านใหม่เมื่อไฟล์เปลี่ยน ทุก MODEL_CONFIG_CHECK_SEC):
+    {"production": "weights/best.pt", "candidate": "weights/candidate.pt", "sample_every": 5}
+
+- vision_loop ส่งทุกเฟรมที่ sample_every ให้ worker ผ่าน queue ขนาด 1 (worker ยังไม่ว่าง = ทิ้งเฟรมนั้น)
+  -> SparkDetector ตัวหลักไม่ต้องรอ candidate เลย, worker ลด priority ของ thread ตัวเอง (SHADOW_NICE)
+- เทียบรายเฟรม: เจอ 'on' (on_conf >= conf_threshold) ตรงกันไหม
+- เทียบรายรอบ: จำลอง RUN/STOP (กติกาเดียวกับ MachineStateMachine) จากเฟรม sample ชุดเดียวกันของทั้งสองโมเดล
+  แล้วนับ cycle ที่ทับกับ cycle ของอีกฝั่ง
+- บันทึก: trace รายเฟรมของ candidate (timestamp เดียวกับ trace หลัก) + stats.json
+  ที่ {TRACE_DIR}/candidate/{ชื่อไฟล์โมเดล}/{machine_id}/
+- promote = เปลี่ยน "production" ให้เป็น path ของ candidate -> สลับใช้โมเดลที่โหลดไว้แล้วทันที ไม่ต้อง restart
+"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from ..models import DEFAULT_MACHINE_ID
+from . import trace_store
+from .spark_detector import DEFAULT_MODEL_PATH, SparkDetector, load_model
+
+MODEL_CONFIG_PATH = os.getenv("MODEL_CONFIG_PATH", "weights/models.json")
+MODEL_CONFIG_CHECK_SEC = float(os.getenv("MODEL_CONFIG_CHECK_SEC", 5))
+SHADOW_SAMPLE_EVERY = int(os.getenv("SHADOW_SAMPLE_EVERY", 5))
+SHADOW_NICE = int(os.getenv("SHADOW_NICE", 10))
+
+
+def read_model_config(path: str = MODEL_CONFIG_PATH) -> dict:
+    """อ่าน config ของโมเดล (ไม่มีไฟล์ = ใช้ weights/best.pt อย่างเดียว ไม่มี candidate)"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def production_model_path(path: str = MODEL_CONFIG_PATH) -> str:
+    try:
+        return read_model_config(path).get("production") or DEFAULT_MODEL_PATH
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Invalid model config {path}: {e}")
+        return DEFAULT_MODEL_PATH
+
+
+class _CycleTracker:
+    """RUN/STOP แบบเดียวกับ MachineStateMachine จากผลรายเฟรม (เฉพาะเฟรมที่ sample)"""
+    def __init__(self, stop_threshold: float):
+        self.stop_threshold = stop_threshold
+        self.start = None
+        self.last_on = None
+        self.closed = deque(maxlen=64)
+
+    def feed(self, ts: float, on: bool):
+        closed = None
+        if self.start is not None and ts - self.last_on > self.stop_threshold:
+            closed = (self.start, self.last_on + self.stop_threshold)
+            self.closed.append(closed)
+            self.start = None
+        if on:
+            if self.start is None:
+                self.start = ts
+            self.last_on = ts
+        return closed
+
+    def overlaps(self, interval) -> bool:
+        start, end = interval
+        if self.start is not None and self.start < end:
+            return True
+        return any(s < end and start < e for s, e in self.closed)
+
+
+class ShadowStats:
+    COUNTERS = ("frames", "both_on", "both_off", "production_only", "candidate_only", "dropped",
+                "production_cycles", "candidate_cycles", "production_matched", "candidate_matched")
+
+    def __init__(self, candidate_path: Optional[str], stop_threshold: float, saved: Optional[dict] = None):
+        self.candidate_path = candidate_path
+        self.since = time.time()
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        if saved and saved.get("candidate_path") == candidate_path:
+            self.since = saved.get("since", self.since)
+            for name in self.COUNTERS:
+                setattr(self, name, int(saved.get(name, 0)))
+        self._production = _CycleTracker(stop_threshold)
+        self._candidate = _CycleTracker(stop_threshold)
+
+    def record(self, ts: float, production_on: bool, candidate_on: bool) -> bool:
+        """นับผลของเฟรม sample 1 เฟรม คืน True ถ้ามี cycle จบ (ควรบันทึก stats)"""
+        self.frames += 1
+        if production_on and candidate_on:
+            self.both_on += 1
+        elif production_on:
+            self.production_only += 1
+        elif candidate_on:
+            self.candidate_only += 1
+        else:
+            self.both_off += 1
+
+        production_closed = self._production.feed(ts, production_on)
+        candidate_closed = self._candidate.feed(ts, candidate_on)
+        if production_closed:
+            self.production_cycles += 1
+            self.production_matched += self._candidate.overlaps(production_closed)
+        if candidate_closed:
+            self.candidate_cycles += 1
+            self.candidate_matched += self._production.overlaps(candidate_closed)
+        return bool(production_closed or candidate_closed)
+
+    def as_dict(self) -> dict:
+        data = {"candidate_path": self.candidate_path, "since": self.since}
+        data.update({name: getattr(self, name) for name in self.COUNTERS})
+        data["frame_agreement"] = round((self.both_on + self.both_off) / self.frames, 4) if self.frames else None
+        data["cycle_recall"] = (round(self.production_matched / self.production_cycles, 4)
+                                if self.production_cycles else None)
+        data["cycle_precision"] = (round(self.candidate_matched / self.candidate_cycles, 4)
+                                   if self.candidate_cycles else None)
+        return data
+
+
+class ShadowRunner:
+    def __init__(self, config_path: str = MODEL_CONFIG_PATH):
+        self.config_path = config_path
+        self.detector = None
+        self.machine_id = DEFAULT_MACHINE_ID
+        self.stop_threshold = 10.0
+        self.sample_every = SHADOW_SAMPLE_EVERY
+        self.candidate_path = None
+        self.candidate = None  # SparkDetector ของ candidate (โหลดใน worker)
+        self.stats = ShadowStats(None, self.stop_threshold)
+        self._queue = queue.Queue(maxsize=1)
+        self._model_lock = threading.Lock()  # ถือระหว่าง candidate inference / ตอน promote
+        self._stats_lock = threading.Lock()
+        self._config_mtime = None
+        self._next_config_check = 0.0
+        self._frame_no = 0
+        self._gap = False  # มีเฟรมที่ไม่ได้ส่งให้ worker ตั้งแต่ครั้งล่าสุด (บันทึกเป็น sampled ใน trace)
+        self._worker = None
+
+    # --- ฝั่ง vision_loop ---
+    def attach(self, detector: SparkDetector, machine_id: str, stop_threshold: float):
+        self.detector = detector
+        self.machine_id = machine_id
+        self.stop_threshold = stop_threshold
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, daemon=True, name="shadow-model")
+            self._worker.start()
+        self.poll_config(force=True)
+
+    def offer(self, captured_at: float, frame, result: dict, sampled: bool = False):
+        """
+        เรียกทุกเฟรมหลัง detect (แค่ใส่ queue ไม่รอผล)
+        sampled: ก่อนเฟรมนี้ vision_loop ข้ามเฟรมกล้องไป (vision/sampler.py)
+        """
+        self.poll_config()
+        if self.candidate_path is None:
+            return
+        self._frame_no += 1
+        self._gap = self._gap or sampled
+        if self._frame_no % self.sample_every:
+            self._gap = True
+            return
+        try:
+            self._queue.put_nowait((captured_at, frame, result["on_conf"] >= self.detector.conf_threshold, self._gap))
+            self._gap = False
+        except queue.Full:
+            self.stats.dropped += 1
+            self._gap = True
+
+    def poll_config(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now < self._next_config_check:
+            return
+        self._next_config_check = now + MODEL_CONFIG_CHECK_SEC
+        try:
+            mtime = os.stat(self.config_path).st_mtime if os.path.exists(self.config_path) else None
+            if mtime == self._config_mtime and not force:
+                return
+            config = read_model_config(self.config_path)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Invalid model config {self.config_path}: {e}")
+            return
+        self._config_mtime = mtime
+        self._apply_config(config)
+
+    def _apply_config(self, config: dict):
+        production = config.get("production") or DEFAULT_MODEL_PATH
+        candidate = config.get("candidate") or None
+        self.sample_every = max(int(config.get("sample_every", SHADOW_SAMPLE_EVERY)), 1)
+
+        if production != self.detector.model_path:
+            self._promote(production)
+        if candidate == self.detector.model_path:
+            candidate = None
+
+        if candidate != self.candidate_path:
+            with self._stats_lock:
+                self.candidate_path = candidate
+                self.stats = ShadowStats(candidate, self.stop_threshold, self._load_stats(candidate))
+            print(f"🧪 Shadow candidate: {candidate or '-'} (every {self.sample_every} frame(s))")
+
+    def _promote(self, production: str):
+        # ใช้โมเดลที่ worker โหลดไว้แล้วถ้าตรงกัน ไม่งั้นโหลดใหม่จากไฟล์
+        with self._model_lock:
+            model = None
+            if self.candidate is not None and self.candidate.model_path == production:
+                model = self.candidate.model
+                self.candidate = None
+        if model is None:
+            model = load_model(production)
+        if model is None:
+            print(f"❌ Cannot switch production model to {production}, keeping {self.detector.model_path}")
+            return
+        self.detector.set_model(model, production)
+        print(f"🚀 Production model switched to {production}")
+
+    # --- ฝั่ง worker ---
+    def _run(self):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), SHADOW_NICE)
+        except (AttributeError, OSError):
+            pass
+        writer = None
+        while True:
+            captured_at, frame, production_on, sampled = self._queue.get()
+            try:
+                path = self.candidate_path
+                if path is None:
+                    continue
+                candidate = self.candidate
+                if candidate is None or candidate.model_path != path:
+                    candidate = SparkDetector(path)  # โหลดใน worker ไม่บล็อก vision_loop
+                    with self._model_lock:
+                        if self.candidate_path != path:
+                            continue
+                        self.candidate = candidate
+                    if writer:
+                        writer.close()
+                    writer = (trace_store.TraceWriter(self.machine_id, self._candidate_dir(path))
+                              if trace_store.TRACE_ENABLED else None)
+                if candidate.model is None:
+                    continue
+
+                with self._model_lock:
+                    if self.candidate is not candidate:
+                        continue  # ถูก promote / เปลี่ยน candidate ระหว่างนี้
+                    on_conf, off_conf, box_count, _ = candidate.score(frame)
+                if writer:
+                    writer.append(captured_at, on_conf, off_conf, box_count, sampled)
+                with self._stats_lock:
+                    if self.stats.candidate_path != path:
+                        continue
+                    cycle_closed = self.stats.record(captured_at, production_on, on_conf >= candidate.conf_threshold)
+                    snapshot = self.stats.as_dict() if cycle_closed else None
+                if snapshot:
+                    self._save_stats(path, snapshot)
+            except Exception as e:
+                print(f"🔥 Shadow Error: {e}")
+
+    # --- stats ---
+    def status(self) -> dict:
+        with self._stats_lock:
+            stats = self.stats.as_dict()
+        candidate = self.candidate
+        return {
+            "production_model": self.detector.model_path if self.detector else None,
+            "candidate_model": self.candidate_path,
+            "candidate_loaded": bool(candidate is not None and candidate.model_path == self.candidate_path
+                                     and candidate.model is not None),
+            "sample_every": self.sample_every,
+            "stats": stats,
+        }
+
+    def _candidate_dir(self, candidate_path: str) -> str:
+        name = os.path.splitext(os.path.basename(candidate_path))[0]
+        return os.path.join(trace_store.TRACE_DIR, "candidate", name)
+
+    def _stats_path(self, candidate_path: str) -> str:
+        return os.path.join(self._candidate_dir(candidate_path), self.machine_id, "stats.json")
+
+    def _load_stats(self, candidate_path: Optional[str]) -> Optional[dict]:
+        if candidate_path is None:
+            return None
+        try:
+            with open(self._stats_path(candidate_path)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_stats(self, candidate_path: str, snapshot: dict):
+        path = self._stats_path(candidate_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(snapshot, f, indent=2)
+        os.replace(tmp, path)
+
+
+# ตัวเดียวทั้งแอป (เหมือน machine_brain)
+shadow_runner = ShadowRunner()
@@ -3,65 +3,88 @@ from datetime import datetime
 from ultralytics import YOLO
 import numpy as np
 
+DEFAULT_MODEL_PATH = "weights/best.pt"
+
 class SparkDetector:
-    def __init__(self):
+    def __init__(self, model_path: str = DEFAULT_MODEL_PATH):
         # --- CONFIG ---
-        # 1. เปลี่ยนชื่อไฟล์ตรงนี้เป็น best.pt
-        self.model_path = "weights/best.pt" 
+        # 1. เปลี่ยนชื่อไฟล์ตรงนี้เป็น best.pt (หรือกำหนดใน weights/models.json ดู vision/shadow.py)
+        self.model_path = model_path
         
         # 2. ตั้งค่าความมั่นใจ (ถ้าโมเดลแม่น ปรับขึ้นเป็น 0.6-0.7 ได้)
         self.conf_threshold = 0.5
         
         # 3. ต้องเจอ "on" ต่อเนื่องกี่เฟรม ถึงจะยอมรับว่า Run จริง (กันวูบวาบ)
         self.required_consecutive_frames = 3
+
+        # 4. confidence ขั้นต่ำที่ยังเก็บลง detection trace (ต่ำกว่า conf_threshold
+        #    เพื่อให้ลองลด threshold ย้อนหลังได้) ไม่มีผลกับการตัดสิน on/off
+        self.trace_conf_floor = float(os.getenv("TRACE_CONF_FLOOR", 0.1))
         
         # --- STATE ---
         self.consecutive_sparks = 0
         self.model = None
         
         # --- LOAD MODEL ---
-        print(f"🔄 Loading Custom Model: {self.model_path}...")
-        if os.path.exists(self.model_path):
-            try:
-                self.model = YOLO(self.model_path)
-                print("✅ Model loaded successfully!")
-                print(f"📋 Class Names: {self.model.names}") # มันจะปริ้นท์บอกว่า 0=on, 1=off หรือเปล่า
-            except Exception as e:
-                print(f"❌ Error loading model: {e}")
-        else:
-            print(f"⚠️ Warning: Model file not found at {self.model_path}")
+        self.model = load_model(self.model_path)
 
-    def detect(self, frame: np.ndarray) -> dict:
-        if self.model is None or frame is None:
-            return {
-                "timestamp": datetime.now().isoformat(),
-                "spark_detected": False,
-                "confidence": 0.0
-            }
+    def set_model(self, model, model_path: str):
+        """สลับโมเดลขณะทำงาน (promote candidate) โดยไม่ต้อง restart"""
+        self.model = model
+        self.model_path = model_path
+        self.consecutive_sparks = 0
 
+    def score(self, frame: np.ndarray):
+        """
+        ผลของเฟรมเดียว ยังไม่ผ่าน confirmation: (on_conf, off_conf, box_count, boxes)
+        """
         # --- AI INFERENCE ---
-        results = self.model.predict(frame, conf=self.conf_threshold, verbose=False)
+        results = self.model.predict(frame, conf=min(self.conf_threshold, self.trace_conf_floor), verbose=False)
         
-        detected_on = False
         max_conf = 0.0
+        max_off_conf = 0.0
+        box_count = 0
+        boxes = []  # box ที่ผ่าน conf_threshold (สำหรับวาดบน preview)
 
         # วนลูปดูทุกวัตถุที่เจอในภาพ
         if len(results) > 0:
+            box_count = len(results[0].boxes)
             for box in results[0].boxes:
                 class_id = int(box.cls[0])
                 class_name = self.model.names[class_id] # ดึงชื่อ class เช่น 'on', 'off'
                 conf = float(box.conf[0])
+                if conf >= self.conf_threshold:
+                    boxes.append({"class_name": class_name, "conf": conf, "xyxy": box.xyxy[0].tolist()})
 
                 # 👉 LOGIC สำคัญ: เราสนใจแค่ 'on' 
                 # (ต้องพิมพ์เล็กพิมพ์ใหญ่ให้ตรงกับที่พี่เทรนมานะ ส่วนใหญ่ YOLO เป็น lowercase)
                 if class_name == 'on':  
-                    detected_on = True
                     if conf > max_conf:
                         max_conf = conf
                 
-                # ถ้าเจอ 'off' เราก็แค่ปล่อยผ่าน เพราะถือว่าเครื่องหยุด
+                # ถ้าเจอ 'off' เราก็แค่ปล่อยผ่าน เพราะถือว่าเครื่องหยุด (เก็บไว้ใน trace อย่างเดียว)
                 elif class_name == 'off':
-                    pass 
+                    if conf > max_off_conf:
+                        max_off_conf = conf
+
+        return max_conf, max_off_conf, box_count, boxes
+
+    def detect(self, frame: np.ndarray) -> dict:
+        if self.model is None or frame is None:
+            return {
+                "timestamp": datetime.now().isoformat(),
+                "spark_detected": False,
+                "confidence": 0.0,
+                "on_conf": 0.0,
+                "off_conf": 0.0,
+                "box_count": 0,
+                "boxes": []
+            }
+
+        max_conf, max_off_conf, box_count, boxes = self.score(frame)
+
+        # box ที่ต่ำกว่า conf_threshold มีไว้สำหรับ trace เท่านั้น
+        detected_on = max_conf >= self.conf_threshold
 
         # --- CONFIRMATION LOGIC ---
         if detected_on:
@@ -75,5 +98,25 @@ class SparkDetector:
         return {
             "timestamp": datetime.now().isoformat(),
             "spark_detected": is_confirmed_run,
-            "confidence": max_conf if is_confirmed_run else 0.0
-        }
\ No newline at end of file
+            "confidence": max_conf if is_confirmed_run else 0.0,
+            "on_conf": max_conf,
+            "off_conf": max_off_conf,
+            "box_count": box_count,
+            "boxes": boxes
+        }
+
+
+def load_model(model_path: str):
+    """โหลด YOLO จากไฟล์ (ไม่เจอไฟล์ / โหลดไม่ได้ = None)"""
+    print(f"🔄 Loading Custom Model: {model_path}...")
+    if not os.path.exists(model_path):
+        print(f"⚠️ Warning: Model file not found at {model_path}")
+        return None
+    try:
+        model = YOLO(model_path)
+        print("✅ Model loaded successfully!")
+        print(f"📋 Class Names: {model.names}") # มันจะปริ้นท์บอกว่า 0=on, 1=off หรือเปล่า
+        return model
+    except Exception as e:
+        print(f"❌ Error loading model: {e}")
+        return None
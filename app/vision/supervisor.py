@@ -0,0 +1,161 @@
+"""
+คุม thread ของ vision module (capture / inference) ให้ไม่ตายเงียบ
+
+- แต่ละ stage เรียก run.beat() ทุกรอบ loop (heartbeat)
+- stage ที่ throw exception / จบเอง / ไม่ beat นานเกิน stall_sec (เช่น RTSP read ค้าง)
+  -> เริ่ม thread ใหม่ หลังรอแบบ exponential backoff (SUPERVISOR_BACKOFF_MIN_SEC x2 ... สูงสุด MAX)
+- thread ที่ค้างถูกทิ้งไว้ (Python kill thread ไม่ได้) เมื่อหลุดออกมาจะเห็นว่า run.alive() = False แล้วจบเอง
+- ทำงานปกติครบ SUPERVISOR_BACKOFF_RESET_SEC -> นับ backoff ใหม่จากต้น
+"""
+import os
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+SUPERVISOR_CHECK_SEC = float(os.getenv("SUPERVISOR_CHECK_SEC", 1.0))
+SUPERVISOR_BACKOFF_MIN_SEC = float(os.getenv("SUPERVISOR_BACKOFF_MIN_SEC", 1.0))
+SUPERVISOR_BACKOFF_MAX_SEC = float(os.getenv("SUPERVISOR_BACKOFF_MAX_SEC", 60.0))
+SUPERVISOR_BACKOFF_RESET_SEC = float(os.getenv("SUPERVISOR_BACKOFF_RESET_SEC", 60.0))
+
+
+class LatestFrame:
+    """ช่องส่งเฟรมล่าสุดจาก capture -> inference (เฟรมที่ inference ไม่ทันจะถูกแทนที่ ไม่ต่อคิว)"""
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._captured_at = None
+        self._seq = 0
+        self._taken = 0
+        self.last_captured_at: Optional[float] = None
+
+    def put(self, frame, captured_at: float):
+        with self._cond:
+            self._frame = frame
+            self._captured_at = captured_at
+            self._seq += 1
+            self.last_captured_at = captured_at
+            self._cond.notify_all()
+
+    def get(self, timeout: float) -> Optional[Tuple[object, float]]:
+        """เฟรมใหม่ที่ยังไม่เคยหยิบ รอไม่เกิน timeout (ไม่มี = None)"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq != self._taken, timeout):
+                return None
+            self._taken = self._seq
+            return self._frame, self._captured_at
+
+
+class _Run:
+    """handle ที่ส่งให้ target ของ stage 1 รอบการทำงาน"""
+    def __init__(self, stage: "Stage", generation: int):
+        self._stage = stage
+        self._generation = generation
+
+    def alive(self) -> bool:
+        return self._stage.generation == self._generation
+
+    def beat(self):
+        if self.alive():
+            self._stage.last_beat = time.monotonic()
+
+
+class Stage:
+    def __init__(self, name: str, target: Callable[[_Run], None], stall_sec: float):
+        self.name = name
+        self.target = target
+        self.stall_sec = stall_sec
+        self.generation = 0
+        self.thread: Optional[threading.Thread] = None
+        self.started_at = None
+        self.last_beat = None
+        self.next_start = 0.0
+        self.failures = 0
+        self.restarts = 0
+        self.last_error: Optional[str] = None
+        self.last_restart_at: Optional[float] = None
+
+    def health(self, now: float) -> dict:
+        return {
+            "name": self.name,
+            "running": bool(self.thread and self.thread.is_alive()),
+            "last_beat_age_sec": round(now - self.last_beat, 1) if self.last_beat is not None else None,
+            "stall_sec": self.stall_sec,
+            "restarts": self.restarts,
+            "last_error": self.last_error,
+            "last_restart_at": self.last_restart_at,
+            "next_start_in_sec": round(max(self.next_start - now, 0.0), 1) if self.next_start is not None else None,
+        }
+
+
+class VisionSupervisor:
+    def __init__(self):
+        self.stages = []
+        self.frames = LatestFrame()
+        self._thread = None
+
+    def add_stage(self, name: str, target: Callable[[_Run], None], stall_sec: float) -> Stage:
+        stage = Stage(name, target, stall_sec)
+        self.stages.append(stage)
+        return stage
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._supervise, daemon=True, name="vision-supervisor")
+            self._thread.start()
+
+    def _supervise(self):
+        while True:
+            now = time.monotonic()
+            for stage in self.stages:
+                if stage.next_start is None:
+                    if not stage.thread.is_alive():
+                        self._fail(stage, now, stage.last_error or "exited")
+                    elif now - stage.last_beat > stage.stall_sec:
+                        self._fail(stage, now, f"no heartbeat for {now - stage.last_beat:.1f}s")
+                if stage.next_start is not None and now >= stage.next_start:
+                    self._launch(stage, now)
+            time.sleep(SUPERVISOR_CHECK_SEC)
+
+    def _fail(self, stage: Stage, now: float, reason: str):
+        stage.generation += 1  # thread เดิม (ถ้ายังค้างอยู่) หมดสิทธิ์ทำงานต่อ
+        if now - stage.started_at >= SUPERVISOR_BACKOFF_RESET_SEC:
+            stage.failures = 0
+        delay = min(SUPERVISOR_BACKOFF_MIN_SEC * 2 ** stage.failures, SUPERVISOR_BACKOFF_MAX_SEC)
+        stage.failures += 1
+        stage.next_start = now + delay
+        print(f"♻️ Vision {stage.name} stage down ({reason}), restarting in {delay:.1f}s")
+
+    def _launch(self, stage: Stage, now: float):
+        if stage.started_at is not None:
+            stage.restarts += 1
+            stage.last_restart_at = time.time()
+        run = _Run(stage, stage.generation)
+        stage.started_at = stage.last_beat = now
+        stage.next_start = None
+        stage.thread = threading.Thread(target=self._run_stage, args=(stage, run), daemon=True,
+                                        name=f"vision-{stage.name}")
+        stage.thread.start()
+
+    def _run_stage(self, stage: Stage, run: _Run):
+        try:
+            stage.target(run)
+        except Exception as e:
+            if run.alive():
+                stage.last_error = f"{type(e).__name__}: {e}"
+            print(f"🔥 Error in vision {stage.name}: {e}")
+
+    def health(self) -> dict:
+        now = time.monotonic()
+        last = self.frames.last_captured_at
+        healthy = all(stage.next_start is None and stage.thread.is_alive() for stage in self.stages)
+        return {
+            "status": "ok" if healthy else "restarting",
+            "last_frame_at": last,
+            "last_frame_age_sec": round(time.time() - last, 1) if last is not None else None,
+            "restarts": sum(stage.restarts for stage in self.stages),
+            "stages": [stage.health(now) for stage in self.stages],
+        }
+
+
+# ตัวเดียวทั้งแอป (เหมือน machine_brain)
+vision_supervisor = VisionSupervisor()
@@ -0,0 +1,218 @@
+"""
+บันทึกผลดิบของ SparkDetector ทุกเฟรม (detection trace) สำหรับปรับจูน threshold ย้อนหลัง
+
+โครงสร้างไฟล์:
+    {TRACE_DIR}/{machine_id}/YYYY-MM-DD.trc   (1 ไฟล์ต่อวัน ตามเวลา local ของเฟรม)
+
+- header 64 bytes (magic, version, ขนาด record, capacity, จำนวน record ที่เขียนแล้ว)
+  ตามด้วย record ขนาดคงที่ 21 bytes: timestamp (f8), on_conf (f4), off_conf (f4), box_count (u4), sampled (u1)
+- sampled = 1: ก่อนเฟรมนี้มีเฟรมกล้องที่ไม่ได้ประมวลผล (vision/sampler.py รอแบบ idle / run
+  หรือ shadow worker sample / ทิ้งเฟรม) -> replay ไม่นับว่าเป็นเฟรมติดกับ record ก่อนหน้า
+- ไฟล์ version 1 (20 bytes ไม่มี sampled) อ่านได้เป็น sampled = 0 / เขียนต่อวันเดิมจะถูกแปลงเป็น version 2 ก่อน
+- ไฟล์ถูก mmap แล้วเขียนต่อท้าย (append-only) จองพื้นที่เพิ่มทีละ TRACE_GROW_RECORDS
+  ตัวนับใน header อัปเดตหลังเขียน record เสร็จ -> reader เห็นแต่ record ที่สมบูรณ์
+- ปิดวัน (rotate / close) จะตัดไฟล์ให้เหลือเท่าที่ใช้จริง
+- อ่านทั้งวันด้วย np.fromfile ครั้งเดียว (~20 MB/วัน ที่ 30 fps)
+- ไฟล์ที่เก่ากว่า TRACE_RETENTION_DAYS ถูกลบโดย prune_traces() (รวม trace ของโมเดล candidate)
+"""
+import mmap
+import os
+import struct
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..config import DEFAULT_MACHINE_ID
+
+TRACE_DIR = os.getenv("TRACE_DIR", "traces")
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "1") == "1"
+# เก็บ trace ย้อนหลังกี่วัน (0 = ไม่ลบ)
+TRACE_RETENTION_DAYS = int(os.getenv("TRACE_RETENTION_DAYS", 30))
+# จองพื้นที่ไฟล์เพิ่มทีละกี่ record (2^18 record ~ 5 MB ~ 2.4 ชม. ที่ 30 fps)
+TRACE_GROW_RECORDS = int(os.getenv("TRACE_GROW_RECORDS", 1 << 18))
+
+TRACE_DTYPE = np.dtype([
+    ("timestamp", "<f8"),   # epoch seconds ตอนอ่านเฟรมจากกล้อง
+    ("on_conf", "<f4"),     # confidence สูงสุดของ class 'on' (0 = ไม่เจอ)
+    ("off_conf", "<f4"),    # confidence สูงสุดของ class 'off'
+    ("box_count", "<u4"),   # จำนวน box ทั้งหมดในเฟรม
+    ("sampled", "u1"),      # 1 = มีเฟรมที่ข้ามไปก่อนเฟรมนี้
+])
+_RECORD = struct.Struct("<dffIB")
+assert _RECORD.size == TRACE_DTYPE.itemsize
+
+# version -> dtype ของ record
+_DTYPES = {
+    1: np.dtype(TRACE_DTYPE.descr[:-1]),
+    2: TRACE_DTYPE,
+}
+
+_MAGIC = b"SPKTRACE"
+_VERSION = 2
+_HEADER = struct.Struct("<8sIIQQ")  # magic, version, record_size, capacity, count
+_COUNT_OFFSET = 24
+HEADER_SIZE = 64
+
+
+def segment_path(day: date, machine_id: str = DEFAULT_MACHINE_ID, root: str = TRACE_DIR) -> str:
+    return os.path.join(root, machine_id, f"{day.isoformat()}.trc")
+
+
+class TraceWriter:
+    """
+    เขียน trace ของกล้อง 1 ตัว (ใช้จาก thread เดียว คือ vision_loop)
+    """
+    def __init__(self, machine_id: str = DEFAULT_MACHINE_ID, root: str = TRACE_DIR,
+                 grow_records: int = TRACE_GROW_RECORDS):
+        self.machine_id = machine_id
+        self.root = root
+        self.grow_records = grow_records
+        self.day = None
+        self._file = None
+        self._mm = None
+        self._capacity = 0
+        self._count = 0
+
+    def append(self, timestamp: float, on_conf: float, off_conf: float, box_count: int, sampled: bool = False):
+        day = datetime.fromtimestamp(timestamp).date()
+        if day != self.day:
+            self._open(day)
+        if self._count == self._capacity:
+            self._grow()
+        _RECORD.pack_into(self._mm, HEADER_SIZE + self._count * _RECORD.size,
+                          timestamp, on_conf, off_conf, box_count, sampled)
+        self._count += 1
+        struct.pack_into("<Q", self._mm, _COUNT_OFFSET, self._count)
+
+    def flush(self):
+        if self._mm is not None:
+            self._mm.flush()
+
+    def close(self):
+        """ปิดไฟล์ของวันปัจจุบัน และตัดพื้นที่ที่จองไว้แต่ไม่ได้ใช้ทิ้ง"""
+        if self._file is None:
+            return
+        _HEADER.pack_into(self._mm, 0, _MAGIC, _VERSION, _RECORD.size, self._count, self._count)
+        self._mm.flush()
+        self._mm.close()
+        self._file.truncate(HEADER_SIZE + self._count * _RECORD.size)
+        self._file.close()
+        self._file = self._mm = None
+        self.day = None
+
+    def _open(self, day: date):
+        self.close()
+        path = segment_path(day, self.machine_id, self.root)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _upgrade_segment(path)
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE:
+            # restart กลางวัน -> เขียนต่อจากของเดิม
+            self._file = open(path, "r+b")
+            magic, version, record_size, capacity, count = _HEADER.unpack(self._file.read(_HEADER.size))
+            if magic != _MAGIC or record_size != _RECORD.size:
+                raise ValueError(f"Not a trace segment: {path}")
+            self._capacity, self._count = capacity, count
+        else:
+            self._file = open(path, "w+b")
+            self._capacity, self._count = 0, 0
+            self._file.truncate(HEADER_SIZE)
+        self._map()
+        self.day = day
+
+    def _grow(self):
+        self._capacity += self.grow_records
+        self._mm.close()
+        self._file.truncate(HEADER_SIZE + self._capacity * _RECORD.size)
+        self._map()
+
+    def _map(self):
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        _HEADER.pack_into(self._mm, 0, _MAGIC, _VERSION, _RECORD.size, self._capacity, self._count)
+
+
+def read_segment(path: str) -> np.ndarray:
+    """
+    อ่านไฟล์ trace 1 ไฟล์เป็น structured array (TRACE_DTYPE) เฉพาะ record ที่เขียนเสร็จแล้ว
+    """
+    with open(path, "rb") as f:
+        magic, version, record_size, capacity, count = _HEADER.unpack(f.read(_HEADER.size))
+        dtype = _DTYPES.get(version)
+        if magic != _MAGIC or dtype is None or record_size != dtype.itemsize:
+            raise ValueError(f"Not a trace segment: {path}")
+        f.seek(HEADER_SIZE)
+        records = np.fromfile(f, dtype=dtype, count=count)
+    if dtype is TRACE_DTYPE:
+        return records
+    upgraded = np.zeros(len(records), dtype=TRACE_DTYPE)
+    for name in dtype.names:
+        upgraded[name] = records[name]
+    return upgraded
+
+
+def _upgrade_segment(path: str):
+    """ไฟล์ของวันนี้ที่เขียนด้วย version เก่า (restart หลังอัปเดต) -> เขียนใหม่เป็น version ปัจจุบัน"""
+    if not os.path.exists(path) or os.path.getsize(path) < HEADER_SIZE:
+        return
+    with open(path, "rb") as f:
+        magic, version, *_ = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != _MAGIC or version == _VERSION:
+        return
+    records = read_segment(path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, _RECORD.size, len(records), len(records)).ljust(HEADER_SIZE, b"\0"))
+        records.tofile(f)
+    os.replace(tmp_path, path)
+
+
+def load_day(day: date, machine_id: str = DEFAULT_MACHINE_ID, root: str = TRACE_DIR) -> Dict[str, np.ndarray]:
+    """
+    trace ของวันที่ระบุ เป็น dict ของ column (NumPy array ต่อเนื่องใน memory)
+    วันที่ไม่มีไฟล์ -> array ว่าง
+    """
+    path = segment_path(day, machine_id, root)
+    records = read_segment(path) if os.path.exists(path) else np.empty(0, dtype=TRACE_DTYPE)
+    return {name: np.ascontiguousarray(records[name]) for name in TRACE_DTYPE.names}
+
+
+def list_days(machine_id: str = DEFAULT_MACHINE_ID, root: str = TRACE_DIR,
+              start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[date]:
+    """วันที่ที่มีไฟล์ trace (เรียงจากเก่า -> ใหม่)"""
+    folder = os.path.join(root, machine_id)
+    if not os.path.isdir(folder):
+        return []
+    days = []
+    for name in os.listdir(folder):
+        if not name.endswith(".trc"):
+            continue
+        try:
+            day = date.fromisoformat(name[:-4])
+        except ValueError:
+            continue
+        if (start_date is None or day >= start_date) and (end_date is None or day <= end_date):
+            days.append(day)
+    return sorted(days)
+
+
+def prune_traces(retain_days: int = TRACE_RETENTION_DAYS, root: str = TRACE_DIR) -> int:
+    """
+    ลบไฟล์ trace ที่เก่ากว่า retain_days ของทุกเครื่อง (รวม {root}/candidate/...) คืนจำนวนไฟล์ที่ลบ
+    (ไฟล์ของวันนี้ที่ TraceWriter เขียนอยู่ไม่ถูกลบเสมอ เพราะ retain_days >= 1)
+    """
+    if retain_days <= 0 or not os.path.isdir(root):
+        return 0
+    cutoff = date.today() - timedelta(days=retain_days)
+    deleted = 0
+    for folder, _, names in os.walk(root):
+        for name in names:
+            if not name.endswith(".trc"):
+                continue
+            try:
+                day = date.fromisoformat(name[:-4])
+            except ValueError:
+                continue
+            if day < cutoff:
+                os.remove(os.path.join(folder, name))
+                deleted += 1
+    return deleted
@@ -0,0 +1,112 @@
+"""
+เทียบ vision/replay.py (NumPy ทั้งวัน) กับการวนทีละเฟรมตามกฎของ SparkDetector / MachineStateMachine
+บน trace สุ่ม (ข้ามพัก / เลิกงาน / กล้องหลุดกลางเวลางาน)
+"""
+from datetime import date, datetime, time as dtime
+
+import numpy as np
+import pytest
+
+from app.config import is_working_hours
+from app.vision import replay
+
+
+def random_trace(seed: int):
+    """timestamp (epoch) + on_conf ของ 1 วัน เฉพาะในเวลางาน มีช่วงที่ไม่มีเฟรมเป็นระยะ"""
+    rng = np.random.default_rng(seed)
+    t = datetime.combine(date(2024, 3, 4), dtime(7, 55)).timestamp()
+    end = datetime.combine(date(2024, 3, 4), dtime(17, 35)).timestamp()
+    timestamps, on_conf = [], []
+    on = False
+    while t < end:
+        if rng.random() < 0.002:
+            t += rng.uniform(1, 60)  # กล้อง reconnect
+        t += rng.uniform(0.02, 0.6)
+        if rng.random() < 0.01:
+            on = not on
+        if is_working_hours(datetime.fromtimestamp(t).time()):
+            timestamps.append(t)
+            on_conf.append(rng.uniform(0.3, 1.0) if on else rng.uniform(0.0, 0.6))
+    return np.array(timestamps), np.array(on_conf, dtype=np.float32)
+
+
+def reference_sparks(on_conf, conf_threshold, required_frames):
+    """SparkDetector.detect() ทีละเฟรม"""
+    consecutive, sparks = 0, []
+    for conf in on_conf:
+        consecutive = consecutive + 1 if conf >= conf_threshold else 0
+        sparks.append(consecutive >= required_frames)
+    return np.array(sparks)
+
+
+def reference_cycles(timestamps, sparks, stop_threshold):
+    """
+    MachineStateMachine.update_from_vision() ทีละเฟรม
+    ระหว่างไม่มีเฟรม: tick (False) ทุก OFFLINE_TICK_SEC เฉพาะนอกเวลางาน
+    """
+    state, last_spark = "STOP", None
+    starts, stops = [], []
+
+    def tick_until(until):
+        t = last_spark + stop_threshold
+        while True:
+            t += replay.OFFLINE_TICK_SEC
+            if t >= until:
+                return None
+            if not is_working_hours(datetime.fromtimestamp(t).time()):
+                return t
+
+    for ts, spark in zip(timestamps, sparks):
+        if state == "RUN":
+            stopped_at = tick_until(ts)
+            if stopped_at is not None:
+                state = "STOP"
+                stops.append(stopped_at)
+        if spark:
+            last_spark = ts
+            if state == "STOP":
+                state = "RUN"
+                starts.append(ts)
+        elif state == "RUN" and ts - last_spark > stop_threshold:
+            state = "STOP"
+            stops.append(ts)
+    if state == "RUN":
+        stops.append(tick_until(np.inf))
+    return np.array(starts), np.array(stops)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("conf_threshold,required_frames", [(0.5, 1), (0.5, 3), (0.7, 5)])
+def test_confirmed_sparks_matches_frame_loop(seed, conf_threshold, required_frames):
+    _, on_conf = random_trace(seed)
+    expected = reference_sparks(on_conf, conf_threshold, required_frames)
+    assert np.array_equal(replay.confirmed_sparks(on_conf, conf_threshold, required_frames), expected)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("stop_threshold", [2.0, 10.0, 45.0])
+def test_simulate_cycles_matches_frame_loop(seed, stop_threshold):
+    timestamps, on_conf = random_trace(seed)
+    sparks = replay.confirmed_sparks(on_conf, replay.DEFAULT_CONF_THRESHOLD, replay.DEFAULT_REQUIRED_FRAMES)
+    starts, stops = replay.simulate_cycles(timestamps, sparks, stop_threshold)
+    expected_starts, expected_stops = reference_cycles(timestamps, sparks, stop_threshold)
+
+    assert np.array_equal(starts, expected_starts)
+    # tick จริงมาเมื่อไหร่ก็ได้ภายใน OFFLINE_TICK_SEC (reference นับจาก deadline, replay นับจากเวลาเริ่มพัก)
+    assert stops == pytest.approx(expected_stops, abs=replay.OFFLINE_TICK_SEC)
+
+
+def test_no_tick_inside_working_hours():
+    # spark ตอน 09:00 แล้วกล้องหลุด 5 นาที: ยังไม่มี update -> STOP ที่เฟรมถัดไป ไม่ใช่หลัง stop_threshold
+    t0 = datetime.combine(date(2024, 3, 4), dtime(9, 0)).timestamp()
+    timestamps = np.array([t0, t0 + 300.0])
+    starts, stops = replay.simulate_cycles(timestamps, np.array([True, False]), 10.0)
+    assert list(starts) == [t0] and list(stops) == [t0 + 300.0]
+
+    # spark ก่อนพัก 10:00 -> STOP ด้วย tick แรกของช่วงพัก
+    t1 = datetime.combine(date(2024, 3, 4), dtime(9, 59, 55)).timestamp()
+    break_start = datetime.combine(date(2024, 3, 4), dtime(10, 0)).timestamp()
+    starts, stops = replay.simulate_cycles(np.array([t1]), np.array([True]), 10.0)
+    assert list(stops) == [t1 + 10.0 + replay.OFFLINE_TICK_SEC]
+    starts, stops = replay.simulate_cycles(np.array([t1 - 60]), np.array([True]), 10.0)
+    assert list(stops) == [break_start + replay.OFFLINE_TICK_SEC]
@@ -0,0 +1,113 @@
+"""
+จำลอง vision_loop ด้วยเวลาเสมือน (กล้อง 30 fps) เทียบ FrameScheduler กับการประมวลผลทุกเฟรม
+และเทียบ replay ของ trace ที่บันทึกตอนใช้ sampler กับผลจริง
+"""
+import random
+from datetime import date, datetime, time as dtime
+
+import numpy as np
+import pytest
+
+from app.vision import replay, sampler
+
+FPS = 30
+INFERENCE_SEC = 0.02
+STOP_THRESHOLD = 10.0
+START = datetime.combine(date(2024, 3, 4), dtime(8, 5)).timestamp()
+DURATION = 5400.0
+
+
+class Detector:
+    """กติกา confirmation ของ SparkDetector"""
+    required_consecutive_frames = 3
+
+    def __init__(self):
+        self.consecutive_sparks = 0
+
+    def detect(self, on: bool) -> bool:
+        self.consecutive_sparks = self.consecutive_sparks + 1 if on else 0
+        return self.consecutive_sparks >= self.required_consecutive_frames
+
+
+class Brain:
+    """กติกา RUN / STOP ของ MachineStateMachine (ไม่มี DB)"""
+    stop_threshold = STOP_THRESHOLD
+
+    def __init__(self):
+        self.current_state = "STOP"
+        self.last_spark_time = 0.0
+        self.cycles = []
+
+    def update(self, now: float, spark: bool):
+        if spark:
+            self.last_spark_time = now
+            if self.current_state == "STOP":
+                self.current_state = "RUN"
+                self.cycles.append([now, None])
+        elif self.current_state == "RUN" and now - self.last_spark_time > self.stop_threshold:
+            self.current_state = "STOP"
+            self.cycles[-1][1] = now
+
+
+def machine_truth(seed: int):
+    """ช่วงที่เครื่องเดินจริง: เดิน 20-120 วินาที พัก 20-300 วินาที"""
+    rng = random.Random(seed)
+    t, truth = START, []
+    while True:
+        t += rng.uniform(20, 300)
+        length = rng.uniform(20, 120)
+        if t + length + STOP_THRESHOLD + 5 > START + DURATION:
+            return truth
+        truth.append((t, t + length))
+        t += length
+
+
+def run_loop(truth, seed: int, enabled: bool, monkeypatch):
+    """คืน (cycles, trace records [(timestamp, on_conf, sampled)], scheduler)"""
+    monkeypatch.setattr(sampler, "SAMPLER_ENABLED", enabled)
+    # กระพริบ 5% ต่อเฟรมกล้อง (เฟรมเดียวกันได้ผลเดียวกันทั้งสองแบบ)
+    flicker = np.random.default_rng(seed).random(int((DURATION + 60) * FPS)) < 0.05
+    brain, detector = Brain(), Detector()
+    scheduler = sampler.FrameScheduler()
+    scheduler.attach(brain, detector)
+    records = []
+    t = START
+    while t < START + DURATION:
+        frame_no = int((t - START) * FPS) + 1  # เฟรมถัดไปของกล้อง
+        frame_at = START + frame_no / FPS
+        on = any(a <= frame_at < b for a, b in truth) and not flicker[frame_no]
+        records.append((frame_at, 0.9 if on else 0.1, scheduler.sampled))
+        brain.update(frame_at, detector.detect(on))
+        t = frame_at + INFERENCE_SEC + scheduler.next_interval(now=frame_at)
+    return brain.cycles, records, scheduler
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_sampler_keeps_cycles_with_far_fewer_frames(seed, monkeypatch):
+    truth = machine_truth(seed)
+    full_cycles, full_records, _ = run_loop(truth, seed, False, monkeypatch)
+    cycles, records, scheduler = run_loop(truth, seed, True, monkeypatch)
+
+    assert len(full_records) / len(records) > 10
+    assert sum(scheduler.frames.values()) == len(records)
+    assert len(cycles) == len(full_cycles) == len(truth)
+    for (start, stop), (full_start, full_stop) in zip(cycles, full_cycles):
+        # เริ่มช้ากว่า ~1 รอบ idle (+ เฟรมกระพริบตอน burst)
+        assert 0 <= start - full_start <= sampler.SAMPLER_IDLE_INTERVAL_SEC + 1.0
+        # จบเร็วกว่าได้ (spark ล่าสุดที่เห็นเก่ากว่าของจริง) เฟรม sample ที่ตรงกับเฟรมกระพริบเสียไปอีก 1 รอบ run
+        assert -3 * sampler.SAMPLER_RUN_INTERVAL_SEC <= stop - full_stop <= 0.1
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_replay_of_sampled_trace_matches_live(seed, monkeypatch):
+    cycles, records, _ = run_loop(machine_truth(seed), seed, True, monkeypatch)
+    timestamps = np.array([r[0] for r in records])
+    on_conf = np.array([r[1] for r in records], dtype=np.float32)
+    sampled = np.array([r[2] for r in records], dtype=np.uint8)
+    assert sampled.any()
+
+    sparks = replay.confirmed_sparks(on_conf, replay.DEFAULT_CONF_THRESHOLD, Detector.required_consecutive_frames,
+                                     sampled)
+    starts, stops = replay.simulate_cycles(timestamps, sparks, STOP_THRESHOLD, sampled)
+    assert list(starts) == [start for start, _ in cycles]
+    assert list(stops) == [stop for _, stop in cycles]